@@ -1,4 +1,6 @@
 """Typed configuration via pydantic-settings. Reads ARENA_* env vars / .env."""
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,11 +13,79 @@ class Settings(BaseSettings):
     port: int = 7860
     debug: bool = False  # NEVER default-on (audit B: Werkzeug RCE was on by default)
 
+    # One Ollama URL, or several comma-separated (one per GPU box): each model is routed
+    # to a host that has it resident, else the least busy one that has it pulled. Hosts
+    # are polled (`ps` + `tags`) every ollama_poll_s for residency and health.
     ollama_host: str = "http://127.0.0.1:11434"
+    ollama_poll_s: float = 10.0
     history_limit: int = 40
+    # "messages": keep the last history_limit messages. "tokens": keep the system prompt
+    # and the newest messages that fit each model's context (history_context_tokens, or
+    # its entry in history_context_by_model) minus room for the reply.
+    history_mode: Literal["messages", "tokens"] = "messages"
+    history_context_tokens: int = 4096
+    history_context_by_model: dict[str, int] = {}
     max_models: int = 6
     request_timeout_s: int = 120
 
+    # Admission control in front of Ollama. Match per-model to OLLAMA_NUM_PARALLEL and
+    # total to OLLAMA_NUM_PARALLEL x OLLAMA_MAX_LOADED_MODELS. "priority" admits
+    # interactive chat before judge before batch work; "fifo" is arrival order.
+    max_inflight_per_model: int = 4
+    max_inflight_total: int = 12
+    admission_policy: Literal["priority", "fifo"] = "priority"
+
+    # /chat/stream: events buffered per request before generation waits on the client,
+    # and default token coalescing (0 = one event per token).
+    stream_queue_max: int = 1024
+    stream_coalesce_ms: int = 0
+    stream_coalesce_bytes: int = 0
+
+    # On-disk caches (SQLite files) live here.
+    cache_dir: str = ".arena-cache"
+    # Replay deterministic generations (fixed seed, or temperature at/below the
+    # threshold) from disk instead of regenerating them. Off by default.
+    response_cache: bool = False
+    response_cache_max_mb: int = 256
+    response_cache_max_temperature: float = 0.0
+    # Identical deterministic generations (same model, options and messages — as above)
+    # running at the same time share one Ollama call, fanned out to every caller.
+    coalesce_generations: bool = True
+    # Keep judge verdicts on disk, keyed by prompt + candidates + judge + provider.
+    verdict_cache: bool = False
+    verdict_cache_max_mb: int = 64
+    verdict_cache_ttl_s: int = 7 * 24 * 3600
+    # Persist turns, answers + metrics and verdicts server-side for history queries.
+    # Not a cache — keep it out of cache_dir so clearing caches never drops history.
+    result_store: bool = False
+    result_store_path: str = ".arena-data/results.sqlite3"
+    # Bootstrap resamples behind /api/leaderboard confidence intervals (0 = no CIs).
+    leaderboard_bootstrap: int = 200
+
+    # Per-request tracing: spans for chat / stream / judge calls, the last `trace_keep`
+    # served at /api/traces/{id}; with trace_file set, also appended there as JSONL
+    # (rotated at trace_file_max_mb, keeping trace_file_backups old files).
+    tracing: bool = False
+    trace_keep: int = 200
+    trace_file: str = ""
+    trace_file_max_mb: int = 16
+    trace_file_backups: int = 3
+
+    # Server-side benchmark pipeline: prompts generating at once / judge calls at once.
+    benchmark_gen_concurrency: int = 1
+    benchmark_judge_concurrency: int = 1
+    # Models resident at once for schedule="model" runs (≈ OLLAMA_MAX_LOADED_MODELS).
+    benchmark_model_slots: int = 1
+    # Append-only checkpoint log per run (resume after a crash/restart), and where both
+    # those logs and uploaded prompt sets live. Like the result store, not under cache_dir.
+    benchmark_checkpoints: bool = False
+    benchmark_dir: str = ".arena-data/benchmarks"
+    prompt_set_max_mb: int = 256
+    # POST /api/judge/batch: judge calls at once, and per-provider caps within that
+    # (JSON, e.g. {"local": 1, "anthropic": 4}).
+    judge_batch_concurrency: int = 4
+    judge_batch_provider_limits: dict[str, int] = {}
+
     # Optional bearer token; if empty, auth is skipped (local single-user default).
     auth_token: str | None = None
     # Browser dev origin(s) allowed to call the API (Vite).
@@ -31,6 +101,10 @@ class Settings(BaseSettings):
     openai_base_url: str = "https://api.openai.com/v1"
     openrouter_api_key: str | None = None
     openrouter_base_url: str = "https://openrouter.ai/api/v1"
+    # Client-side pacing per cloud endpoint (token bucket) and retries on 429/5xx.
+    cloud_requests_per_min: float = 120
+    cloud_burst: int = 10
+    cloud_max_retries: int = 4
 
 
 settings = Settings()
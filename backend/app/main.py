@@ -1,4 +1,6 @@
 """FastAPI app: CORS for the Vite dev origin, /api routers, optional static SPA serving."""
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request
@@ -7,9 +9,33 @@ from fastapi.staticfiles import StaticFiles
 
 from app import __version__
 from app.config import settings
-from app.routers import chat, judge, models
+from app.routers import (
+    benchmark,
+    chat,
+    judge,
+    leaderboard,
+    metrics,
+    models,
+    results,
+    traces,
+)
+from app.services import cloud, ollama, store, tracing
+from app.services.leaderboard import board
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.result_store:  # rebuild the leaderboard's counts from stored verdicts
+        board.load(await asyncio.to_thread(store.results.pair_outcomes))
+    ollama.pool.start()  # multi-host only: poll residency + health
+    yield
+    await ollama.pool.stop()
+    await cloud.aclose()  # pooled keep-alive judge clients
+    await store.flush()  # queued result-store writes
+    tracing.close()  # flush the trace file writer
+
 
-app = FastAPI(title="Local LLM Arena", version=__version__)
+app = FastAPI(title="Local LLM Arena", version=__version__, lifespan=lifespan)
 
 # Defense-in-depth headers. CSP keeps everything same-origin (the app makes no external
 # calls); 'unsafe-inline' is needed for Vite's injected styles. connect-src stays 'self'
@@ -45,6 +71,11 @@ app.add_middleware(
 app.include_router(models.router, prefix="/api")
 app.include_router(chat.router, prefix="/api")
 app.include_router(judge.router, prefix="/api")
+app.include_router(benchmark.router, prefix="/api")
+app.include_router(results.router, prefix="/api")
+app.include_router(leaderboard.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
+app.include_router(traces.router, prefix="/api")
 
 # In production, serve the built SPA (frontend/dist) so it's one local process.
 _dist = Path(__file__).resolve().parent.parent.parent / "frontend" / "dist"
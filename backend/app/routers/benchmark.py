@@ -0,0 +1,566 @@
+"""Server-side batch benchmark: prompt × model jobs with a generate → judge pipeline.
+
+Jobs run as background tasks and live in memory for the life of the process, so a run
+survives the browser tab closing. Generation and judging are separate worker pools joined
+by a bounded queue: judging prompt N overlaps with generating prompt N+1. With
+schedule="model" generation is ordered by model instead (services/scheduler.py) so
+runs over more models than fit in VRAM load each model once rather than per prompt.
+With `adaptive` set, judging waits for generation and then goes round by round to the
+prompts and model subsets the ranking is least sure of, stopping once the top-k order is
+stable — usually well before every prompt has been judged.
+
+With ARENA_BENCHMARK_CHECKPOINTS every finished answer and verdict is appended to the
+run's checkpoint log (services/checkpoint.py), and /benchmark/{id}/resume restarts a run
+from it after a crash or restart, generating only what is missing. Large prompt files are
+uploaded once as a prompt set (services/promptsets.py) and referenced by id; a run can
+take one prompt-hash range of a set (`shard_index` of `shard_count`) so several server
+processes split the work.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.routers.chat import _generate
+from app.routers.judge import _LETTERS, JudgeError, _record, _verdict
+from app.schemas import BenchmarkRequest, BenchmarkResume, JudgeRequest, ModelInstance
+from app.security import require_auth, same_origin
+from app.services import checkpoint, cloud, leaderboard, ndjson, ollama, promptsets, scheduler
+from app.services.ollama import _as_messages
+from app.services.store import prompt_hash
+
+logger = logging.getLogger("arena.benchmark")
+
+router = APIRouter()
+
+_MAX_JOBS = 32  # finished jobs beyond this are forgotten, oldest first
+
+
+class BenchmarkJob:
+    """One benchmark run: per-prompt results, counters, and a replayable event log."""
+
+    def __init__(self, req: BenchmarkRequest, prompts: list[str], run_id: str | None = None):
+        self.id = run_id or uuid.uuid4().hex[:12]
+        self.req = req
+        self.prompts = prompts
+        # This process's share of the prompts: all of them unless the run is sharded.
+        self.indices = [i for i, p in enumerate(prompts) if req.shard_count == 1
+                        or promptsets.shard_of(p, req.shard_count) == req.shard_index]
+        self.status = "running"
+        self.results: list[dict | None] = [None] * len(prompts)
+        self._budget_left: dict[int, float] = {}  # prompt -> seconds left for its judge
+        self.checkpoint: checkpoint.Checkpoint | None = None
+        self._hashes: dict[int, str] = {}
+        self._restored: dict[int, dict[str, dict]] = {}  # prompt -> answers from a checkpoint
+        self._restored_verdicts: dict[int, dict] = {}
+        self.resumed = 0  # answers taken from the checkpoint instead of generated
+        self.generated = 0
+        self.judged = 0
+        self.completed = 0
+        self.schedule: dict | None = None  # swap report for schedule="model"
+        self.adaptive: dict | None = None  # stop report for adaptive judging
+        self.events: list[dict] = []
+        self.changed = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self._t0 = time.perf_counter()
+        self._t1: float | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self._t1 is not None
+
+    def summary(self) -> dict:
+        elapsed = (self._t1 or time.perf_counter()) - self._t0
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": len(self.indices),
+            "generated": self.generated,
+            "judged": self.judged,
+            "completed": self.completed,
+            "elapsed_s": round(elapsed, 3),
+            "prompts_per_min": round(self.completed / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            **({"schedule": self.schedule} if self.schedule else {}),
+            **({"adaptive": self.adaptive} if self.adaptive else {}),
+            **({"shard": f"{self.req.shard_index}/{self.req.shard_count}"}
+               if self.req.shard_count > 1 else {}),
+            **({"resumed": self.resumed} if self.resumed else {}),
+        }
+
+    def _emit(self, event: dict) -> None:
+        self.events.append(event)
+        # Wake every follower, then hand out a fresh Event for the next change.
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def _complete(self, i: int) -> None:
+        self.completed += 1
+        self._emit({"type": "prompt", "result": self.results[i], "progress": self.summary()})
+
+    def _hash(self, i: int) -> str:
+        if i not in self._hashes:
+            self._hashes[i] = prompt_hash(self.prompts[i])
+        return self._hashes[i]
+
+    async def _save(self, i: int, record: dict) -> None:
+        if self.checkpoint is not None:  # a disk write: off the event loop
+            await asyncio.to_thread(
+                self.checkpoint.append, {**record, "index": i, "hash": self._hash(i)})
+
+    def restore(self, records: list[dict]) -> None:
+        """Take the answers and verdicts a checkpoint replay says are already done."""
+        ids = {inst.id for inst in self.req.model_instances}
+        mine = set(self.indices)
+        for rec in records:
+            i = rec.get("index")
+            if not isinstance(i, int) or not 0 <= i < len(self.prompts) \
+                    or rec.get("hash") != self._hash(i):
+                continue
+            if (rec.get("type") == "answer" and rec.get("instance_id") in ids
+                    and not rec["answer"].get("error") and not rec["answer"].get("timed_out")):
+                self._restored.setdefault(i, {})[rec["instance_id"]] = rec["answer"]
+            elif rec.get("type") == "verdict":
+                self._restored_verdicts[i] = rec.get("judge", {})
+        self.resumed = sum(len(a) for i, a in self._restored.items() if i in mine)
+
+    async def run(self) -> None:
+        req = self.req
+        gen_n = req.gen_concurrency or settings.benchmark_gen_concurrency
+        judge_n = req.judge_concurrency or settings.benchmark_judge_concurrency
+        n_instances = len(req.model_instances)
+        restored = [i for i in self.indices if len(self._restored.get(i, {})) == n_instances]
+        pending = [i for i in self.indices if len(self._restored.get(i, {})) < n_instances]
+        todo: asyncio.Queue[int] = asyncio.Queue()
+        for i in pending:
+            todo.put_nowait(i)
+        # Bounded so generation runs only a little ahead of a slow judge.
+        judged: asyncio.Queue[int | None] = asyncio.Queue(maxsize=gen_n + judge_n)
+        # A local judge is one more model to load: under model scheduling, let it wait
+        # for the last generation instead of swapping with it on every prompt. Adaptive
+        # judging picks among all the answers, so it waits too.
+        held: list[int] | None = (
+            [] if req.judge and (req.adaptive or (req.schedule == "model"
+                                                  and req.judge.provider == "local"))
+            else None
+        )
+
+        async def generated(i: int) -> None:
+            if held is not None:
+                held.append(i)
+            elif req.judge:
+                await judged.put(i)
+            else:
+                self._complete(i)
+
+        async def generator() -> None:
+            while not todo.empty():
+                i = todo.get_nowait()
+                await self._generate(i)
+                await generated(i)
+
+        async def judger() -> None:
+            while (i := await judged.get()) is not None:
+                await self._judge(i)
+                await self._save_verdict(i)
+                self._complete(i)
+
+        judgers = ([asyncio.create_task(judger()) for _ in range(judge_n)]
+                   if req.judge and not req.adaptive else [])
+        try:
+            for i in restored:  # fully generated before a restart: judge (or finish) them
+                self._budget_left[i] = req.timeout_s or settings.request_timeout_s
+                self._generated(i, self._restored[i])
+                if req.judge and i not in self._restored_verdicts:
+                    await generated(i)
+                    continue
+                self.results[i].update(self._restored_verdicts.get(i, {}))
+                self.judged += "verdicts" in self.results[i]
+                self._complete(i)
+            if req.schedule == "model":
+                await self._generate_by_model(pending, gen_n, generated)
+            else:
+                await asyncio.gather(*(generator() for _ in range(gen_n)))
+            if req.adaptive:
+                await self._judge_adaptive(held or [], judge_n)
+            else:
+                for i in held or ():
+                    await judged.put(i)
+            for _ in judgers:
+                await judged.put(None)
+            await asyncio.gather(*judgers)
+            self.status = "done"
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+            raise
+        except Exception:
+            logger.exception("benchmark %s failed", self.id)
+            self.status = "failed"
+        finally:
+            for t in judgers:
+                t.cancel()
+            if self.checkpoint is not None:
+                self.checkpoint.close()
+            self._t1 = time.perf_counter()
+            self._emit({"type": "end", "progress": self.summary()})
+
+    async def _generate(self, i: int) -> None:
+        messages = _as_messages(self.req.system, [], self.prompts[i])
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.req.timeout_s or settings.request_timeout_s)
+        have = self._restored.get(i, {})
+        outs = await asyncio.gather(*(self._answer(i, inst, messages, deadline)
+                                      for inst in self.req.model_instances
+                                      if inst.id not in have))
+        # Time spent queued for a judger isn't charged to the prompt, only generation is.
+        self._budget_left[i] = deadline - loop.time()
+        self._generated(i, {**have, **dict(outs)})
+
+    async def _answer(self, i: int, inst: ModelInstance, messages: list[dict[str, str]],
+                      deadline: float) -> tuple[str, dict]:
+        """One (prompt, instance) generation, checkpointed as soon as it finishes."""
+        o = await _generate(inst, messages, "batch", deadline)
+        answer = {"model": o["model"], "text": o["assistant"], "error": o["error"],
+                  "timed_out": o["timed_out"], "metrics": o["metrics"]}
+        # A failed or deadline-truncated generation is retried on resume, not kept.
+        if not o["error"] and not o["timed_out"]:
+            await self._save(i, {"type": "answer", "instance_id": inst.id, "answer": answer})
+        return inst.id, answer
+
+    def _generated(self, i: int, answers: dict[str, dict]) -> None:
+        self.results[i] = {
+            "index": i,
+            "prompt": self.prompts[i],
+            "answers": {inst.id: answers[inst.id] for inst in self.req.model_instances},
+        }
+        self.generated += 1
+        self._emit({"type": "generated", "index": i, "progress": self.summary()})
+
+    async def _generate_by_model(
+        self, prompts: list[int], per_model: int, generated: Callable[[int], Awaitable[None]]
+    ) -> None:
+        """Every (prompt, instance) job, grouped by model; prompts reassembled as they fill."""
+        req = self.req
+        slots = req.model_slots or settings.benchmark_model_slots
+        budget = req.timeout_s or settings.request_timeout_s
+        loop = asyncio.get_running_loop()
+        try:
+            resident = [m["name"] for m in await ollama.loaded()]
+        except Exception:  # noqa: BLE001 — only an ordering hint
+            resident = []
+        jobs = [(i, inst) for i in prompts for inst in req.model_instances
+                if inst.id not in self._restored.get(i, {})]
+        groups = scheduler.group_by_model(jobs, lambda job: job[1].model, resident)
+        partial: dict[int, dict[str, dict]] = {}
+        longest: dict[int, float] = {}
+
+        async def work(job: tuple[int, ModelInstance]) -> None:
+            i, inst = job
+            start = loop.time()
+            messages = _as_messages(req.system, [], self.prompts[i])
+            iid, answer = await self._answer(i, inst, messages, start + budget)
+            partial.setdefault(i, dict(self._restored.get(i, {})))[iid] = answer
+            # Each job gets the full budget; the judge gets what the slowest one left.
+            longest[i] = max(longest.get(i, 0.0), loop.time() - start)
+            if len(partial[i]) == len(req.model_instances):
+                outs = partial.pop(i)
+                self._budget_left[i] = budget - longest.pop(i)
+                self._generated(i, outs)
+                await generated(i)
+
+        await scheduler.run(groups, work, slots, per_model)
+        self.schedule = self._swap_report(list(groups), len(prompts), slots, resident)
+
+    def _swap_report(self, order: list[str], prompts: int, slots: int,
+                     resident: list[str]) -> dict:
+        """Model loads as scheduled vs. prompt order, and the load time that saved."""
+        req = self.req
+        judge = [req.judge.judge_model] if req.judge and req.judge.provider == "local" else []
+        per_prompt = list(dict.fromkeys(inst.model for inst in req.model_instances))
+        naive = scheduler.swaps([*per_prompt, *judge] * prompts, slots, resident)
+        planned = scheduler.swaps([*order, *judge], slots, resident)
+        # A model's cold-load cost is the longest load Ollama reported for it this run.
+        load_s: dict[str, float] = {}
+        for r in self.results:
+            for a in (r or {}).get("answers", {}).values():
+                if (s := a["metrics"].get("load_s")) is not None:
+                    load_s[a["model"]] = max(load_s.get(a["model"], 0.0), s)
+        saved = sum((naive[m] - planned[m]) * load_s[m] for m in naive if m in load_s)
+        return {
+            "mode": "model", "slots": slots, "order": order,
+            "model_loads": sum(planned.values()), "naive_model_loads": sum(naive.values()),
+            "swaps_saved": sum(naive.values()) - sum(planned.values()),
+            "load_s_saved": round(saved, 3),
+            "load_s_per_model": {m: round(v, 3) for m, v in sorted(load_s.items())},
+        }
+
+    async def _judge_adaptive(self, prompts: list[int], width: int) -> None:
+        """Judge `width` prompts a round until the top-k order is stable, then stop.
+
+        The first `min_calls` judgements compare every model. After that each round's
+        ranking is bootstrapped (leaderboard.rank_stability); if the top-k order holds in
+        `confidence` of resamples the rest are skipped, otherwise the next prompts are
+        judged on just the models in adjacent top-k pairs that still flip too often.
+        """
+        spec = self.req.adaptive
+        judgeable = {i: self._judgeable(i) for i in prompts}
+        todo = [i for i in sorted(prompts) if len(judgeable[i]) >= 2]
+        for i in prompts:
+            if len(judgeable[i]) < 2:
+                self._complete(i)
+        # Prompts judged before a restart count towards the ranking and the calls made.
+        earlier = [i for i in self.indices if i in self._restored_verdicts]
+        judgeable.update({i: self._judgeable(i) for i in earlier})
+        players = {iid for ids in judgeable.values() if len(ids) >= 2 for iid in ids}
+        full = len(todo) + len(earlier)
+        counts = leaderboard.PairCounts()  # by instance id: two instances may share a model
+
+        def fold(i: int) -> None:
+            r = self.results[i]
+            if "verdicts" in r:
+                counts.add_scores({r["mapping"][v["label"]]: v["score"]
+                                   for v in r["verdicts"] if v["label"] in r["mapping"]})
+
+        for i in earlier:
+            fold(i)
+        calls, stable, report = len(earlier), False, None
+        only: set[str] | None = None
+        while todo:
+            if calls >= spec.min_calls and players <= set(counts.models):
+                # A bootstrap refit: off the event loop, generations may still be streaming.
+                # One seed for the whole run, so each round only resamples its new verdicts.
+                report = await asyncio.to_thread(leaderboard.rank_stability, counts, spec.top_k)
+                if stable := report["stability"] >= spec.confidence:
+                    break
+                only = _unsure(report, 1 - spec.confidence)
+            batch = [i for i in todo if only is None or len(only & set(judgeable[i])) >= 2]
+            if not batch:  # no prompt left that both unsure models answered: judge them all
+                only, batch = None, todo
+            batch = batch[:width]
+            for i in batch:
+                todo.remove(i)
+            await asyncio.gather(*(self._judge(i, only) for i in batch))
+            for i in batch:
+                calls += 1
+                fold(i)
+                await self._save_verdict(i)
+                self._complete(i)
+        if not stable and len(counts.models) >= 2:
+            report = await asyncio.to_thread(leaderboard.rank_stability, counts, spec.top_k)
+            stable = report["stability"] >= spec.confidence
+        for i in todo:
+            self.results[i]["judge_skipped"] = True
+            self._complete(i)
+        self.adaptive = {
+            "top_k": spec.top_k, "confidence": spec.confidence,
+            "judge_calls": calls, "full_calls": full, "calls_saved": full - calls,
+            "stability": round(report["stability"], 3) if report else 0.0,
+            "stable": stable, "order": report["order"] if report else [],
+        }
+
+    async def _save_verdict(self, i: int) -> None:
+        # Only a verdict is final: a judge error (rate limit, missing key) is retried on resume.
+        r = self.results[i]
+        if "verdicts" in r:
+            judge = {k: r[k] for k in ("verdicts", "winner", "mapping")}
+            await self._save(i, {"type": "verdict", "judge": judge})
+
+    def _judgeable(self, i: int) -> list[str]:
+        # A truncated answer would just lose on length, so only complete ones are judged.
+        return [iid for iid, a in self.results[i]["answers"].items()
+                if a["text"] and not a["error"] and not a["timed_out"]]
+
+    async def _judge(self, i: int, only: set[str] | None = None) -> None:
+        spec = self.req.judge
+        r = self.results[i]
+        left = self._budget_left.pop(i, 0.0)
+        ids = [iid for iid in self._judgeable(i) if only is None or iid in only]
+        if spec is None or len(ids) < 2:
+            return
+        if left <= 0:
+            r["judge_error"] = "prompt budget exhausted before judging"
+            return
+        mapping = {_LETTERS[k]: iid for k, iid in enumerate(ids)}
+        jreq = JudgeRequest(
+            prompt=r["prompt"],
+            judge_model=spec.judge_model,
+            provider=spec.provider,
+            api_key=spec.api_key,
+            base_url=spec.base_url,
+            candidates=[{"label": lbl, "text": r["answers"][iid]["text"],
+                         "model": r["answers"][iid]["model"]} for lbl, iid in mapping.items()],
+        )
+        try:
+            res = await _verdict(jreq, "batch", asyncio.get_running_loop().time() + left)
+        except (ValueError, JudgeError, cloud.RateLimitError) as e:
+            r["judge_error"] = str(e)
+            return
+        except TimeoutError:
+            r["judge_error"] = "judge timed out"
+            return
+        except Exception:
+            logger.exception("benchmark %s: judge failed on prompt %d", self.id, i)
+            r["judge_error"] = "judge failed — see server logs for details."
+            return
+        _record(jreq, res)  # stored like a /judge verdict: the leaderboard survives restarts
+        r["verdicts"] = [v.model_dump() for v in res.verdicts]
+        r["winner"] = res.winner
+        r["mapping"] = mapping
+        self.judged += 1
+
+
+def _unsure(report: dict, alpha: float) -> set[str]:
+    """Instances in adjacent top-k pairs that flip in more than `alpha` of resamples
+    (or the single shakiest pair, when none does but the order as a whole still does)."""
+    order, flips = report["order"], report["flips"]
+    pairs = [r for r, p in enumerate(flips) if p > alpha] or [flips.index(max(flips))]
+    return {iid for r in pairs for iid in order[r: r + 2]}
+
+
+_jobs: dict[str, BenchmarkJob] = {}
+
+
+def _get(job_id: str) -> BenchmarkJob:
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"unknown benchmark: {job_id}")
+    return job
+
+
+def _launch(job: BenchmarkJob) -> dict:
+    done = [k for k, j in _jobs.items() if j.finished]
+    for k in done[: max(0, len(_jobs) - _MAX_JOBS + 1)]:
+        del _jobs[k]
+    _jobs[job.id] = job
+    job.task = asyncio.create_task(job.run())
+    return job.summary()
+
+
+async def _prompts(req: BenchmarkRequest) -> list[str]:
+    if bool(req.prompts) == (req.prompt_set is not None):
+        raise HTTPException(status_code=400, detail="send either `prompts` or `prompt_set`")
+    if req.shard_index >= req.shard_count:
+        raise HTTPException(status_code=400, detail="shard_index must be below shard_count")
+    if req.prompt_set is None:
+        return req.prompts
+    prompts = await asyncio.to_thread(promptsets.load, req.prompt_set)
+    if prompts is None:
+        raise HTTPException(status_code=404, detail=f"unknown prompt set: {req.prompt_set}")
+    return prompts
+
+
+@router.post("/benchmark", dependencies=[Depends(require_auth), Depends(same_origin)])
+async def start_benchmark(req: BenchmarkRequest) -> dict:
+    if req.adaptive and not req.judge:
+        raise HTTPException(status_code=400, detail="adaptive judging needs a judge")
+    job = BenchmarkJob(req, await _prompts(req))
+    if settings.benchmark_checkpoints:
+        # The API key stays in memory; a resume has to be given it again.
+        job.checkpoint = await asyncio.to_thread(
+            checkpoint.start, job.id, req.model_dump(exclude={"judge": {"api_key"}}))
+    return _launch(job)
+
+
+@router.post(
+    "/benchmark/prompt-sets", dependencies=[Depends(require_auth), Depends(same_origin)]
+)
+async def upload_prompt_set(request: Request, format: promptsets.Format = "jsonl") -> dict:
+    """Store a prompt file (the raw request body) as a deduplicated set to run by id.
+
+    The body is written to disk as it arrives and parsed row by row afterwards, so even
+    a file of tens of thousands of prompts never sits in memory whole.
+    """
+    limit = settings.prompt_set_max_mb * 2**20
+    folder = promptsets.directory()
+    await asyncio.to_thread(folder.mkdir, parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(dir=folder, prefix=".upload-")
+    upload = Path(name)
+    size = 0
+    try:
+        try:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > limit:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"prompt set over {settings.prompt_set_max_mb} MB "
+                               "(ARENA_PROMPT_SET_MAX_MB)")
+                await asyncio.to_thread(os.write, fd, chunk)
+        finally:
+            os.close(fd)
+        return await asyncio.to_thread(promptsets.ingest, upload, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    finally:
+        upload.unlink(missing_ok=True)
+
+
+@router.post(
+    "/benchmark/{job_id}/resume", dependencies=[Depends(require_auth), Depends(same_origin)]
+)
+async def resume_benchmark(job_id: str, body: BenchmarkResume | None = None) -> dict:
+    """Restart a run from its checkpoint log: finished answers and verdicts are reused,
+    only the rest is generated and judged. Cloud judges need their API key again."""
+    if (job := _jobs.get(job_id)) is not None and not job.finished:
+        raise HTTPException(status_code=409, detail=f"benchmark still running: {job_id}")
+    path = checkpoint.path_for(job_id)
+    if not settings.benchmark_checkpoints or path is None:
+        raise HTTPException(status_code=404, detail=f"no checkpoint for benchmark: {job_id}")
+    try:
+        header, records = await asyncio.to_thread(checkpoint.replay, path)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"no checkpoint for benchmark: {job_id}") \
+            from e
+    req = BenchmarkRequest.model_validate(header["request"])
+    if req.judge and body and body.api_key:
+        req.judge.api_key = body.api_key
+    job = BenchmarkJob(req, await _prompts(req), run_id=job_id)
+    job.restore(records)
+    job.checkpoint = checkpoint.Checkpoint(path)
+    return _launch(job)
+
+
+@router.get("/benchmark/{job_id}", dependencies=[Depends(require_auth)])
+async def get_benchmark(job_id: str) -> dict:
+    job = _get(job_id)
+    return {**job.summary(), "results": [r for r in job.results if r is not None]}
+
+
+@router.get("/benchmark/{job_id}/stream", dependencies=[Depends(require_auth)])
+async def stream_benchmark(job_id: str) -> StreamingResponse:
+    """NDJSON progress: replays every event so far, then follows the run to its end."""
+    job = _get(job_id)
+
+    async def follow():
+        sent = 0
+        while True:
+            changed = job.changed
+            while sent < len(job.events):
+                yield ndjson.line(job.events[sent])
+                sent += 1
+            if job.finished:
+                return
+            await changed.wait()
+
+    return StreamingResponse(follow(), media_type="application/x-ndjson")
+
+
+@router.delete(
+    "/benchmark/{job_id}", dependencies=[Depends(require_auth), Depends(same_origin)]
+)
+async def cancel_benchmark(job_id: str) -> dict:
+    job = _get(job_id)
+    if job.task and not job.task.done():
+        job.task.cancel()
+        try:
+            await job.task
+        except asyncio.CancelledError:
+            pass
+    return job.summary()
@@ -1,103 +1,371 @@
 """Chat: parallel non-stream + NDJSON stream. asyncio fan-out, one generation each."""
 import asyncio
-import json
 import time
+import uuid
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.responses import StreamingResponse
 
-from app.schemas import ChatRequest
+from app.config import settings
+from app.schemas import ChatRequest, ModelInstance
 from app.security import require_auth
-from app.services import ollama
+from app.services import history, ndjson, ollama, store, telemetry, tracing
+from app.services.admission import Priority
 from app.services.ollama import _as_messages
 
 router = APIRouter()
 
 
-def _metrics(eval_count: int | None, eval_duration_ns: int | None, first_s: float | None,
-             wall_s: float) -> dict:
-    cnt = eval_count or 0
-    dur = (eval_duration_ns or 0) / 1e9
-    tps = (cnt / dur) if dur > 0 else (cnt / wall_s if wall_s > 0 else 0)
+# A model that needed longer than this to load was not resident (cold start).
+_COLD_LOAD_S = 0.5
+
+
+def _metrics(final: dict | None, first_s: float | None, wall_s: float, streamed: int = 0) -> dict:
+    """Compare metrics from the stream's final chunk (None if it never arrived).
+
+    Ollama's timings separate model load, prefill (prompt_eval) and decode (eval), so a
+    cold load never masquerades as slow prefill: `first_token_warm_s` is TTFT minus load.
+    Without a final chunk (cancelled / timed out) the `streamed` chunk count stands in for
+    the token count, so partial metrics still mean something.
+    """
+    final = final or {}
+    # Time spent waiting for an admission slot is reported on its own, not as latency.
+    queue_s = final.get("queue_wait_s") or 0.0
+    if first_s is not None:
+        first_s = max(0.0, first_s - queue_s)
+    wall_s = max(0.0, wall_s - queue_s)
+    cnt = final.get("eval_count") or streamed
+    dur = (final.get("eval_duration") or 0) / 1e9
+    tps = (cnt / dur) if dur > 0 else (cnt / wall_s if wall_s > 0 else 0)  # decode rate
+    load_s = (final.get("load_duration") or 0) / 1e9
+    prefill_n = final.get("prompt_eval_count") or 0
+    prefill_s = (final.get("prompt_eval_duration") or 0) / 1e9
+    total_s = (final.get("total_duration") or 0) / 1e9
     return {
         "eval_tokens": cnt,
         "duration_s": round(dur or wall_s, 3),
         "first_token_s": round(first_s, 3) if first_s is not None else None,
+        "first_token_warm_s": (
+            round(max(0.0, first_s - load_s), 3) if first_s is not None else None
+        ),
         "tokens_per_sec": round(tps, 2),
+        "load_s": round(load_s, 3),
+        "cold_load": load_s >= _COLD_LOAD_S,
+        "prefill_tokens": prefill_n,
+        "prefill_s": round(prefill_s, 3),
+        "prefill_tokens_per_sec": round(prefill_n / prefill_s, 2) if prefill_s > 0 else None,
+        "total_s": round(total_s or wall_s, 3),
+        "queue_wait_s": round(queue_s, 3),
+        # Replayed from the response cache: tokens_per_sec is the original run's, and
+        # first_token_s says nothing about the model.
+        "cached": bool(final.get("cached")),
+        # Joined an identical deterministic generation already in flight (not re-run).
+        "shared": bool(final.get("shared")),
     }
 
 
-@router.post("/chat", dependencies=[Depends(require_auth)])
-async def chat(req: ChatRequest) -> dict:
-    messages = _as_messages(req.system, req.history, req.message)
+def _fitted(
+    messages: list[dict[str, str]], instances: list[ModelInstance]
+) -> dict[str, tuple[list[dict[str, str]], dict]]:
+    """Per instance: its messages and metrics to add (history cut to its token budget)."""
+    if settings.history_mode != "tokens":
+        return {i.id: (messages, {}) for i in instances}
+    out = {}
+    for inst in instances:
+        kept, n, tokens = history.fit(messages, history.budget(inst))
+        if tokens:
+            telemetry.prefill_saved.inc(inst.model, amount=tokens)
+        out[inst.id] = (kept, {"history_dropped": n, "prefill_tokens_saved": tokens})
+    return out
 
-    async def run(inst):
-        start = time.perf_counter()
-        first = None
-        parts: list[str] = []
-        ec = ed = None
-        try:
-            async for ch in ollama.chat_stream(inst, messages):
+
+def _deadlines(req: ChatRequest) -> dict[str, float]:
+    """Loop-clock deadline per instance: its own timeout_s, capped by the request's budget
+    (ARENA_REQUEST_TIMEOUT_S unless the request sets timeout_s)."""
+    now = asyncio.get_running_loop().time()
+    budget = req.timeout_s or settings.request_timeout_s
+    return {i.id: now + min(budget, i.timeout_s or budget) for i in req.model_instances}
+
+
+async def _generate(
+    inst: ModelInstance,
+    messages: list[dict[str, str]],
+    priority: Priority = "interactive",
+    deadline: float | None = None,
+) -> dict:
+    """Run one instance to completion and return its `/chat` result (never raises).
+
+    At `deadline` the generation is cancelled and whatever text arrived is returned with
+    `timed_out: true` and partial metrics.
+    """
+    start = time.perf_counter()
+    first = None
+    parts: list[str] = []
+    final = None
+    out = {"instance_id": inst.id, "model": inst.model, "assistant": "", "metrics": {},
+           "error": None, "timed_out": False}
+    try:
+        async with asyncio.timeout_at(deadline) as budget:
+            async for ch in ollama.chat_stream(inst, messages, priority):
                 if ch["token"]:
                     if first is None:
                         first = time.perf_counter() - start
                     parts.append(ch["token"])
                 if ch["done"]:
-                    ec, ed = ch["eval_count"], ch["eval_duration"]
-            return inst.id, {
-                "instance_id": inst.id, "model": inst.model, "error": None,
-                "assistant": "".join(parts),
-                "metrics": _metrics(ec, ed, first, time.perf_counter() - start),
-            }
-        except Exception as e:  # noqa: BLE001
-            return inst.id, {"instance_id": inst.id, "model": inst.model,
-                             "assistant": "", "metrics": {}, "error": str(e)}
+                    final = ch
+    except TimeoutError:
+        if not budget.expired():
+            out["error"] = "timed out"
+    except Exception as e:  # noqa: BLE001
+        out["error"] = str(e)
+    if out["error"] is None:
+        out["timed_out"] = final is None
+        out["assistant"] = "".join(parts)
+        out["metrics"] = _metrics(final, first, time.perf_counter() - start, len(parts))
+        if out["timed_out"]:
+            out["metrics"]["timed_out"] = True
+    telemetry.observe_generation(inst.model, _status(out), out["metrics"])
+    return out
+
+
+def _status(result: dict) -> str:
+    return "error" if result["error"] else "timed_out" if result["timed_out"] else "done"
+
+
+def _finish(turn_id: str, inst: ModelInstance, status: str, text: str, error: str | None,
+            metrics: dict) -> None:
+    """Stream bookkeeping for one instance: telemetry + result store."""
+    telemetry.observe_generation(inst.model, status, metrics)
+    _record_answer(turn_id, inst, status, text, error, metrics)
+
+
+def _record_answer(turn_id: str, inst: ModelInstance, status: str, text: str,
+                   error: str | None, metrics: dict) -> None:
+    store.submit(store.results.put_answer, turn_id, inst.id, inst.model, status, text, error,
+                 metrics)
 
-    pairs = await asyncio.gather(*(run(i) for i in req.model_instances))
-    results = {iid: r for iid, r in pairs}
-    errors = {iid: r["error"] for iid, r in pairs if r["error"]}
-    return {"results": results, "errors": errors}
+
+@router.post("/chat", dependencies=[Depends(require_auth)])
+async def chat(req: ChatRequest, response: Response) -> dict:
+    start = time.perf_counter()
+    trace = tracing.start("chat", models=[i.model for i in req.model_instances])
+    if trace:
+        response.headers["X-Trace-Id"] = trace.id
+    deadlines = _deadlines(req)
+    with tracing.span("messages"):
+        messages = _as_messages(req.system, req.history, req.message)
+        fitted = _fitted(messages, req.model_instances)
+    try:
+        outs = await asyncio.gather(*(
+            _generate(i, fitted[i.id][0], deadline=deadlines[i.id]) for i in req.model_instances
+        ))
+    finally:
+        tracing.finish(trace)
+    for inst, r in zip(req.model_instances, outs, strict=True):
+        if r["metrics"]:
+            r["metrics"].update(fitted[inst.id][1])
+    results = {r["instance_id"]: r for r in outs}
+    errors = {r["instance_id"]: r["error"] for r in outs if r["error"]}
+    turn_id = req.turn_id or uuid.uuid4().hex
+    store.submit(store.results.put_turn, turn_id, req.message, req.system, req.session_id)
+    for inst, r in zip(req.model_instances, outs, strict=True):
+        _record_answer(turn_id, inst, _status(r), r["assistant"], r["error"], r["metrics"])
+    budget = req.timeout_s or settings.request_timeout_s
+    return {
+        "results": results,
+        "errors": errors,
+        "timed_out": [r["instance_id"] for r in outs if r["timed_out"]],
+        # What's left of the turn's budget — pass it as the judge's timeout_s.
+        "budget_left_s": round(max(0.0, budget - (time.perf_counter() - start)), 3),
+    }
+
+
+# Live /chat/stream requests: request_id -> {instance_id: generation task}. Cancelling a
+# task unwinds ollama.chat_stream, which closes the HTTP stream so Ollama stops generating.
+_live: dict[str, dict[str, asyncio.Task]] = {}
+_cancels = {"instances": 0, "disconnects": 0}
+
+
+async def _watch_disconnect(request: Request, tasks: dict[str, asyncio.Task]) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(0.5)
+    _cancels["disconnects"] += 1
+    for t in tasks.values():
+        t.cancel()
 
 
 @router.post("/chat/stream", dependencies=[Depends(require_auth)])
-async def chat_stream(req: ChatRequest) -> StreamingResponse:
-    messages = _as_messages(req.system, req.history, req.message)
-    q: asyncio.Queue = asyncio.Queue()
+async def chat_stream(req: ChatRequest, request: Request) -> StreamingResponse:
+    request_id = req.request_id or uuid.uuid4().hex
+    if request_id in _live:
+        raise HTTPException(status_code=409, detail=f"request_id already streaming: {request_id}")
+    # Reserved here, filled once the body starts: a concurrent duplicate gets the 409 too.
+    tasks: dict[str, asyncio.Task] = {}
+    _live[request_id] = tasks
+    turn_id = req.turn_id or request_id
+    store.submit(store.results.put_turn, turn_id, req.message, req.system, req.session_id)
+    trace = tracing.start("chat.stream", request_id,
+                          models=[i.model for i in req.model_instances])
+    with tracing.span("messages"):
+        messages = _as_messages(req.system, req.history, req.message)
+        fitted = _fitted(messages, req.model_instances)
+    deadlines = _deadlines(req)
+    # Bounded: a slow client backs pressure up into the generations instead of memory.
+    q: asyncio.Queue = asyncio.Queue(maxsize=settings.stream_queue_max)
     sentinel = object()
+    window_ms = settings.stream_coalesce_ms if req.coalesce_ms is None else req.coalesce_ms
+    window_s = window_ms / 1000
+    max_bytes = (
+        settings.stream_coalesce_bytes if req.coalesce_bytes is None else req.coalesce_bytes
+    )
 
     async def run(inst):
+        messages, extra = fitted[inst.id]
         start = time.perf_counter()
         first = None
         parts: list[str] = []
-        ec = ed = None
+        final = None
+        timed_out = False
         try:
-            async for ch in ollama.chat_stream(inst, messages):
-                if ch["token"]:
-                    if first is None:
-                        first = time.perf_counter() - start
-                    parts.append(ch["token"])
-                    await q.put({"type": "token", "instance_id": inst.id, "token": ch["token"]})
-                if ch["done"]:
-                    ec, ed = ch["eval_count"], ch["eval_duration"]
-            await q.put({"type": "metrics", "instance_id": inst.id,
-                         "metrics": _metrics(ec, ed, first, time.perf_counter() - start)})
-            await q.put({"type": "done", "instance_id": inst.id, "text": "".join(parts)})
+            try:
+                async with asyncio.timeout_at(deadlines[inst.id]) as budget:
+                    async for ch in ollama.chat_stream(inst, messages):
+                        if ch["token"]:
+                            if first is None:
+                                first = time.perf_counter() - start
+                            parts.append(ch["token"])
+                            await q.put(
+                                {"type": "token", "instance_id": inst.id, "token": ch["token"]}
+                            )
+                        if ch["done"]:
+                            final = ch
+            except TimeoutError:
+                if not budget.expired():
+                    raise
+                timed_out = True  # keep what streamed; the client already has those tokens
+            metrics = {**_metrics(final, first, time.perf_counter() - start, len(parts)),
+                       **extra}
+            if timed_out:
+                metrics["timed_out"] = True
+            _finish(turn_id, inst, "timed_out" if timed_out else "done", "".join(parts), None,
+                    metrics)
+            await q.put({"type": "metrics", "instance_id": inst.id, "metrics": metrics})
+            done = {"type": "done", "instance_id": inst.id}
+            if timed_out:
+                done["timed_out"] = True
+            if req.echo_text:
+                done["text"] = "".join(parts)
+            await q.put(done)
+        except asyncio.CancelledError:
+            _cancels["instances"] += 1
+            metrics = {**_metrics(final, first, time.perf_counter() - start, len(parts)),
+                       **extra, "cancelled": True}
+            _finish(turn_id, inst, "cancelled", "".join(parts), None, metrics)
+            await q.put({"type": "metrics", "instance_id": inst.id, "metrics": metrics})
+            await q.put({"type": "cancelled", "instance_id": inst.id})
         except Exception as e:  # noqa: BLE001
+            _finish(turn_id, inst, "error", "".join(parts), str(e), {})
             await q.put({"type": "error", "instance_id": inst.id, "error": str(e)})
         finally:
             await q.put(sentinel)
 
     async def event_stream():
-        task = asyncio.gather(*(run(i) for i in req.model_instances))
-        remaining = len(req.model_instances)
+        loop = asyncio.get_running_loop()
+        tracing.use(trace)  # the body may be iterated outside the endpoint's context
+        tasks.update({i.id: asyncio.create_task(run(i)) for i in req.model_instances})
+        watcher = asyncio.create_task(_watch_disconnect(request, tasks))
+        remaining = len(tasks)
+        # Coalescing (window_s > 0): tokens are buffered per instance and sent as ONE token
+        # event each when the time window closes, max_bytes are buffered, or any other
+        # event arrives (so tokens always precede their metrics/done).
+        pending: dict[str, list[str]] = {}
+        buffered = 0
+        deadline: float | None = None
+        began = time.perf_counter()
+        encode_s, encoded = 0.0, 0
+
+        def encode(event: dict) -> bytes:
+            nonlocal encode_s, encoded
+            t = time.perf_counter()
+            data = ndjson.line(event)
+            encode_s += time.perf_counter() - t
+            encoded += 1
+            return data
+
+        def flush() -> list[bytes]:
+            nonlocal buffered, deadline
+            lines = [encode({"type": "token", "instance_id": iid, "token": "".join(t)})
+                     for iid, t in pending.items()]
+            pending.clear()
+            buffered, deadline = 0, None
+            return lines
+
         try:
             while remaining:
-                item = await q.get()
-                if item is sentinel:
-                    remaining -= 1
-                    continue
-                yield json.dumps(item) + "\n"
+                out: list[bytes] = []
+                if deadline is not None and loop.time() >= deadline:
+                    out.extend(flush())
+                try:
+                    async with asyncio.timeout_at(deadline):
+                        batch = [await q.get()]
+                except TimeoutError:
+                    batch = []
+                while not q.empty():  # everything already queued goes out in one write
+                    batch.append(q.get_nowait())
+                for item in batch:
+                    if item is sentinel:
+                        remaining -= 1
+                    elif window_s and item["type"] == "token":
+                        pending.setdefault(item["instance_id"], []).append(item["token"])
+                        buffered += len(item["token"])
+                        if deadline is None:
+                            deadline = loop.time() + window_s
+                    else:
+                        out.extend(flush())
+                        out.append(encode(item))
+                if max_bytes and buffered >= max_bytes:
+                    out.extend(flush())
+                if out:
+                    yield b"".join(out)
+            if pending:
+                yield b"".join(flush())
         finally:
-            await task
+            # If the client left early, stop every generation still running, and keep
+            # discarding events so none of them blocks on the full queue while unwinding.
+            watcher.cancel()
+            for t in tasks.values():
+                t.cancel()
+            while not all(t.done() for t in tasks.values()):
+                try:
+                    async with asyncio.timeout(0.1):
+                        await q.get()
+                except TimeoutError:
+                    pass
+            _live.pop(request_id, None)
+            # One span for all serialization: summed time, not wall time, across events.
+            tracing.record("serialize", began, began + encode_s, events=encoded)
+            tracing.finish(trace)
+
+    return StreamingResponse(
+        event_stream(), media_type="application/x-ndjson", headers={"X-Request-Id": request_id}
+    )
+
+
+@router.post("/chat/{request_id}/cancel", dependencies=[Depends(require_auth)])
+async def cancel_chat(request_id: str, instance_id: str | None = None) -> dict:
+    """Stop one instance (or, without `instance_id`, all) of a live /chat/stream request."""
+    tasks = _live.get(request_id)
+    if tasks is None:
+        raise HTTPException(status_code=404, detail=f"no live stream: {request_id}")
+    if instance_id is not None and instance_id not in tasks:
+        raise HTTPException(status_code=404, detail=f"unknown instance: {instance_id}")
+    targets = [instance_id] if instance_id is not None else list(tasks)
+    return {"cancelled": [iid for iid in targets if tasks[iid].cancel()]}
+
 
-    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+@router.get("/chat/active", dependencies=[Depends(require_auth)])
+async def active_chats() -> dict:
+    """Live streams and their still-running instances, plus cancellation totals."""
+    live = {rid: [iid for iid, t in tasks.items() if not t.done()] for rid, tasks in _live.items()}
+    return {"streams": live, "cancelled_instances": _cancels["instances"],
+            "client_disconnects": _cancels["disconnects"]}
@@ -1,18 +1,54 @@
-"""LLM-as-judge: a chosen model scores anonymized answers and picks a winner."""
+"""LLM-as-judge: a chosen model scores anonymized answers and picks a winner.
+
+With `panel` / `samples` several judges vote concurrently; the calls still running are
+cancelled as soon as no outstanding vote could change the winner. `/judge/stream` sends
+each candidate's verdict as soon as the judge has finished writing it, and `/judge/batch`
+re-judges thousands of items (or stored turns) in one resumable NDJSON stream.
+"""
+import asyncio
 import json
 import logging
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable, Iterator
+from pathlib import Path
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
 logger = logging.getLogger("arena.judge")
 
 from app.config import settings
-from app.schemas import JudgeRequest, JudgeResult
+from app.schemas import (
+    Ballot,
+    BenchmarkJudge,
+    JudgeBatchRequest,
+    JudgeRequest,
+    JudgeResult,
+    PanelStats,
+    Verdict,
+)
 from app.security import require_auth
-from app.services import cloud, ollama
+from app.services import cloud, jsonstream, leaderboard, ndjson, ollama, store, telemetry, tracing
+from app.services.admission import Priority
+from app.services.cache import DiskCache, content_key
+from app.services.singleflight import SingleFlight
 
 router = APIRouter()
 
+# Identical judge calls (same prompt, candidates, judge, provider) are answered once:
+# concurrent duplicates share the in-flight call, and with ARENA_VERDICT_CACHE on the
+# verdict is kept on disk for re-ranks and re-requests.
+_verdicts = DiskCache(
+    Path(settings.cache_dir) / "verdicts.sqlite3",
+    settings.verdict_cache_max_mb * 2**20,
+    ttl_s=settings.verdict_cache_ttl_s,
+)
+_flights = SingleFlight()
+
+_LETTERS = "ABCDEF"  # candidate labels, one per JudgeRequest.candidates slot
+
 # Inlined JSON schema (no $ref/$defs — small models follow it far better than
 # Pydantic's nested schema) used as Ollama's structured-output constraint.
 _JUDGE_SCHEMA = {
@@ -99,60 +135,136 @@ def _coerce(data: dict) -> dict:
     return data
 
 
-async def _run_judge(req: JudgeRequest) -> str:
-    """Dispatch to the chosen provider; returns a raw JSON string.
+def _credentials(req: JudgeRequest) -> tuple[str, str]:
+    """(API key, base URL) for a cloud judge: the UI value first, then the env var.
 
-    Resolves the API key per request (UI value first, then matching env var). Raises
-    ValueError (-> 400) when a cloud provider has no key.
+    Raises ValueError (-> 400) when there is no key.
     """
-    user = _build_user_prompt(req)
-
     if req.provider == "anthropic":
         key = req.api_key or settings.anthropic_api_key
         if not key:
             raise ValueError("Anthropic API key required — set it in the UI or ARENA_ANTHROPIC_API_KEY.")
-        return await cloud.anthropic_json(req.judge_model, _SYSTEM, user, key)
+        return key, ""
+    if req.provider == "openrouter":
+        key = req.api_key or settings.openrouter_api_key
+        base = req.base_url or settings.openrouter_base_url
+        env = "ARENA_OPENROUTER_API_KEY"
+    else:
+        key = req.api_key or settings.openai_api_key
+        base = req.base_url or settings.openai_base_url
+        env = "ARENA_OPENAI_API_KEY"
+    if not key:
+        raise ValueError(f"API key required — set it in the UI or {env}.")
+    return key, base
 
-    if req.provider in ("openai", "openrouter"):
-        if req.provider == "openrouter":
-            key = req.api_key or settings.openrouter_api_key
-            base = req.base_url or settings.openrouter_base_url
-            env = "ARENA_OPENROUTER_API_KEY"
-        else:
-            key = req.api_key or settings.openai_api_key
-            base = req.base_url or settings.openai_base_url
-            env = "ARENA_OPENAI_API_KEY"
-        if not key:
-            raise ValueError(f"API key required — set it in the UI or {env}.")
-        return await cloud.openai_compatible_json(req.judge_model, _SYSTEM, user, _JUDGE_SCHEMA, key, base)
 
-    messages = [
+def _local_messages(user: str) -> list[dict[str, str]]:
+    return [
         {"role": "system", "content": _SYSTEM},
         {"role": "user", "content": user},
     ]
-    return await ollama.chat_json(req.judge_model, messages, schema=_JUDGE_SCHEMA)
 
 
-@router.post("/judge", dependencies=[Depends(require_auth)])
-async def judge(req: JudgeRequest) -> JudgeResult:
+async def _run_judge(req: JudgeRequest, priority: Priority = "judge") -> str:
+    """Dispatch to the chosen provider; returns a raw JSON string.
+
+    Raises ValueError (-> 400) when a cloud provider has no key.
+    """
+    user = _build_user_prompt(req)
+    if req.provider == "anthropic":
+        key, _ = _credentials(req)
+        return await cloud.anthropic_json(req.judge_model, _SYSTEM, user, key)
+    if req.provider in ("openai", "openrouter"):
+        key, base = _credentials(req)
+        return await cloud.openai_compatible_json(req.judge_model, _SYSTEM, user, _JUDGE_SCHEMA, key, base)
+    return await ollama.chat_json(req.judge_model, _local_messages(user), _JUDGE_SCHEMA,
+                                  priority, req.seed)
+
+
+def _stream_judge(req: JudgeRequest, priority: Priority = "judge") -> AsyncIterator[str]:
+    """`_run_judge`, streamed: the raw JSON text in pieces as the provider writes it."""
+    user = _build_user_prompt(req)
+    if req.provider == "anthropic":
+        key, _ = _credentials(req)
+        return cloud.anthropic_json_stream(req.judge_model, _SYSTEM, user, key)
+    if req.provider in ("openai", "openrouter"):
+        key, base = _credentials(req)
+        return cloud.openai_compatible_json_stream(req.judge_model, _SYSTEM, user,
+                                                   _JUDGE_SCHEMA, key, base)
+    return ollama.chat_json_stream(req.judge_model, _local_messages(user), _JUDGE_SCHEMA,
+                                   priority, req.seed)
+
+
+class JudgeError(Exception):
+    """The judge ran but its output was unusable. The message is safe to show a client."""
+
+
+async def _verdict(
+    req: JudgeRequest, priority: Priority = "judge", deadline: float | None = None
+) -> JudgeResult:
+    """Judge `req`, served from the verdict cache or a coalesced in-flight call if possible.
+
+    Raises ValueError for user-actionable problems (missing key, unparseable output),
+    JudgeError when the verdicts are unusable and TimeoutError once the budget — `deadline`
+    (loop clock), else req.timeout_s / ARENA_REQUEST_TIMEOUT_S — runs out; anything else is
+    a provider failure.
+    """
+    if deadline is None:
+        deadline = asyncio.get_running_loop().time() + (
+            req.timeout_s or settings.request_timeout_s
+        )
+    async with asyncio.timeout_at(deadline):
+        return await _verdict_within(req, priority)
+
+
+def _cache_key(req: JudgeRequest) -> str:
+    with tracing.span("judge.prompt"):
+        seeded = [req.seed] if req.seed is not None else []  # unseeded keys predate seeds
+        return content_key(_SYSTEM, _build_user_prompt(req), req.provider, req.judge_model,
+                           req.base_url, *seeded)
+
+
+async def _cached(key: str) -> JudgeResult | None:
+    if settings.verdict_cache and (hit := await asyncio.to_thread(_verdicts.get, key)):
+        return JudgeResult.model_validate({**hit, "cached": True})
+    return None
+
+
+async def _verdict_within(req: JudgeRequest, priority: Priority) -> JudgeResult:
+    key = _cache_key(req)
+    if (hit := await _cached(key)) is not None:
+        return hit
+    # The key never reaches disk, but callers with different credentials must not share
+    # a call (one's missing key would fail the other).
+    flight = content_key(key, req.api_key or "")
+    result = await _flights.do(flight, lambda: _judge_once(req, key, priority))
+    return result.model_copy(deep=True)  # shared between callers — hand each its own
+
+
+async def _judge_once(req: JudgeRequest, key: str, priority: Priority) -> JudgeResult:
+    """Run the judge, parse + repair its JSON, and guarantee a valid `winner`."""
+    t0 = time.perf_counter()
     try:
-        raw = await _run_judge(req)
+        raw = await _run_judge(req, priority)
+    except Exception:
+        telemetry.judge_failures.inc(req.provider, req.judge_model)
+        raise
+    t1 = time.perf_counter()
+    telemetry.judge_latency.observe(t1 - t0, req.provider, req.judge_model)
+    tracing.record("judge.call", t0, t1, provider=req.provider, model=req.judge_model)
+    result = _result(req, raw)
+    if settings.verdict_cache:
+        await asyncio.to_thread(_verdicts.put, key, result.model_dump())
+    return result
+
+
+def _result(req: JudgeRequest, raw: str) -> JudgeResult:
+    """Parse + repair the judge's JSON, and guarantee a valid `winner`."""
+    with tracing.span("judge.parse"):
         result = JudgeResult.model_validate(_coerce(json.loads(raw)))
-    except ValueError as e:  # missing API key etc. — safe, user-actionable message
-        raise HTTPException(status_code=400, detail=str(e)) from e
-    except Exception as e:  # noqa: BLE001
-        # Full error (may carry provider URLs / internals) goes to the server log only;
-        # the client gets a generic message so nothing sensitive leaks over the wire.
-        logger.exception("judge failed (provider=%s, model=%s)", req.provider, req.judge_model)
-        raise HTTPException(
-            status_code=502, detail="judge failed — see server logs for details."
-        ) from e
 
     if not result.verdicts:
-        raise HTTPException(
-            status_code=502,
-            detail="judge produced no usable verdicts — try a more capable judge model.",
-        )
+        raise JudgeError("judge produced no usable verdicts — try a more capable judge model.")
 
     valid = {c.label for c in req.candidates}
     if result.winner not in valid:
@@ -163,6 +275,335 @@ async def judge(req: JudgeRequest) -> JudgeResult:
             reverse=True,
         )
         if not ranked:
-            raise HTTPException(status_code=502, detail="judge returned no valid verdicts")
+            raise JudgeError("judge returned no valid verdicts")
         result.winner = ranked[0].label
     return result
+
+
+def _ballots(req: JudgeRequest) -> list[JudgeRequest]:
+    """One single-judge request per panel vote: `samples` seeds of each judge.
+
+    Samples are numbered per distinct judge, so a judge listed twice (or in both the
+    request and the panel) gets fresh seeds rather than a second copy of one call, which
+    singleflight and the verdict cache would answer with the same verdict.
+    """
+    base = req.seed or 0
+    drawn: Counter[tuple[str, str, str | None]] = Counter()
+    subs = []
+    for j in [req, *req.panel]:
+        for _ in range(j.samples):
+            n = drawn[j.provider, j.judge_model, j.base_url]
+            drawn[j.provider, j.judge_model, j.base_url] += 1
+            subs.append(req.model_copy(update={
+                "judge_model": j.judge_model, "provider": j.provider, "api_key": j.api_key,
+                "base_url": j.base_url, "samples": 1, "panel": [],
+                # The first vote of each judge is the plain call, shared with the cache.
+                "seed": req.seed if n == 0 else base + n,
+            }))
+    return subs
+
+
+def _locked(votes: Counter[str], remaining: int) -> bool:
+    """True when `remaining` votes can't overtake or tie the current leader."""
+    top = votes.most_common(2)
+    if not top:
+        return False
+    runner_up = top[1][1] if len(top) > 1 else 0
+    return top[0][1] - runner_up > remaining
+
+
+def _http_error(e: BaseException, req: JudgeRequest) -> HTTPException:
+    """What a judge failure looks like to the client."""
+    if isinstance(e, ValueError):  # missing API key etc. — safe, user-actionable message
+        return HTTPException(status_code=400, detail=str(e))
+    if isinstance(e, JudgeError):
+        return HTTPException(status_code=502, detail=str(e))
+    if isinstance(e, cloud.RateLimitError):
+        headers = {"Retry-After": str(round(e.retry_after))} if e.retry_after else None
+        return HTTPException(status_code=429, detail=str(e), headers=headers)
+    if isinstance(e, TimeoutError):
+        return HTTPException(status_code=504, detail="judge timed out")
+    # Full error (may carry provider URLs / internals) goes to the server log only;
+    # the client gets a generic message so nothing sensitive leaks over the wire.
+    logger.error("judge failed (provider=%s, model=%s)", req.provider, req.judge_model,
+                 exc_info=e)
+    return HTTPException(status_code=502, detail="judge failed — see server logs for details.")
+
+
+async def _panel_verdict(req: JudgeRequest, priority: Priority = "judge") -> JudgeResult:
+    """Every panel vote at once under one shared budget, stopping once the winner is locked.
+
+    Ballots count one vote each for their judge's winner; a failed ballot abstains. The
+    merged verdicts average each label's score over completed ballots, and the winner is
+    the most-voted label (mean score breaks ties). If every ballot fails, the first
+    error is raised as a single judge's would be.
+    """
+    subs = _ballots(req)
+    deadline = asyncio.get_running_loop().time() + (req.timeout_s or settings.request_timeout_s)
+    tasks = {asyncio.create_task(_verdict(sub, priority, deadline)): k
+             for k, sub in enumerate(subs)}
+    ballots = [Ballot(judge_model=s.judge_model, provider=s.provider, seed=s.seed) for s in subs]
+    results: dict[int, JudgeResult] = {}
+    errors: list[BaseException] = []
+    votes: Counter[str] = Counter()
+    pending = set(tasks)
+    try:
+        while pending and not _locked(votes, len(pending)):
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in sorted(done, key=tasks.__getitem__):
+                k = tasks[t]
+                if (e := t.exception()) is not None:
+                    errors.append(e)
+                    ballots[k].error = _http_error(e, subs[k]).detail
+                    continue
+                results[k] = r = t.result()
+                ballots[k].winner, ballots[k].cached = r.winner, r.cached
+                votes[r.winner] += 1
+        for t in pending:
+            ballots[tasks[t]].skipped = True
+            telemetry.judge_skipped.inc(subs[tasks[t]].provider, subs[tasks[t]].judge_model)
+    finally:
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    if not results:
+        raise errors[0]
+
+    scores: dict[str, list[float]] = {}
+    reasons: dict[str, str] = {}
+    for k in sorted(results):
+        for v in results[k].verdicts:
+            scores.setdefault(v.label, []).append(v.score)
+            reasons.setdefault(v.label, v.reason)
+    mean = {label: sum(s) / len(s) for label, s in scores.items()}
+    winner = max(votes, key=lambda label: (votes[label], mean.get(label, 0.0)))
+    return JudgeResult(
+        verdicts=[Verdict(label=c.label, score=round(mean[c.label], 2), reason=reasons[c.label])
+                  for c in req.candidates if c.label in mean],
+        winner=winner,
+        cached=all(r.cached for r in results.values()),
+        panel=PanelStats(
+            judges=len(subs), completed=len(results), failed=len(errors),
+            skipped=len(pending), votes=dict(votes),
+            agreement=round(votes[winner] / len(results), 3),
+            unanimous=len(votes) == 1, ballots=ballots,
+        ),
+    )
+
+
+def _record(req: JudgeRequest, result: JudgeResult) -> None:
+    """Store the verdict and fold it into the leaderboard."""
+    models = {c.label: c.model for c in req.candidates}
+    scores = [{**v.model_dump(), "model": models.get(v.label)} for v in result.verdicts]
+    store.submit(store.results.put_verdict, req.turn_id, req.prompt, req.provider,
+                 req.judge_model, result.winner, result.cached, scores)
+    if not result.cached:  # a replayed verdict is a comparison already counted
+        leaderboard.board.add_scores(leaderboard.verdict_scores(scores))
+
+
+def _judged(req: JudgeRequest, priority: Priority = "judge") -> Awaitable[JudgeResult]:
+    """A single judge's verdict, or the panel's when the request asks for several votes."""
+    if req.panel or req.samples > 1:
+        return _panel_verdict(req, priority)
+    return _verdict(req, priority)
+
+
+@router.post("/judge", dependencies=[Depends(require_auth)])
+async def judge(req: JudgeRequest, response: Response) -> JudgeResult:
+    trace = tracing.start("judge", provider=req.provider, judge_model=req.judge_model)
+    if trace:
+        response.headers["X-Trace-Id"] = trace.id
+    try:
+        result = await _judged(req)
+    except Exception as e:  # noqa: BLE001
+        raise _http_error(e, req) from e
+    finally:
+        tracing.finish(trace)
+    _record(req, result)
+    return result
+
+
+def _verdict_event(item: object, labels: set[str]) -> dict | None:
+    """A `verdict` event for one streamed element of the verdicts array, if it is usable."""
+    fixed = _coerce({"verdicts": [item]})["verdicts"]
+    try:
+        v = Verdict.model_validate(fixed[0]) if fixed else None
+    except ValidationError:
+        return None
+    return {"type": "verdict", **v.model_dump()} if v and v.label in labels else None
+
+
+@router.post("/judge/stream", dependencies=[Depends(require_auth)])
+async def judge_stream(req: JudgeRequest) -> StreamingResponse:
+    """NDJSON: a `verdict` event per candidate as soon as the judge has scored it, then
+    `result` (exactly what /judge returns) or `error` ({status, error}).
+
+    The final verdicts come from parsing the whole document as /judge does, so they may
+    repair or add to what was previewed. Judge panels aren't streamed.
+    """
+    if req.panel or req.samples > 1:
+        raise HTTPException(status_code=400,
+                            detail="judge panels aren't streamed — use /api/judge")
+    if req.provider != "local":
+        try:
+            _credentials(req)  # a missing key is a 400 before the stream starts
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+    labels = {c.label for c in req.candidates}
+    trace = tracing.start("judge.stream", provider=req.provider, judge_model=req.judge_model)
+    # At most one event per candidate, so unbounded is fine — and a slow reader then
+    # never holds up the judge call or eats into its deadline.
+    q: asyncio.Queue = asyncio.Queue()
+    sentinel = object()
+
+    async def call() -> str:
+        """The judge call, under its deadline; verdict events go to `q` as they parse."""
+        items = jsonstream.Items("verdicts")
+        parts: list[str] = []
+        t0 = time.perf_counter()
+        try:
+            async with asyncio.timeout(req.timeout_s or settings.request_timeout_s):
+                async for piece in _stream_judge(req):
+                    parts.append(piece)
+                    for item in items.feed(piece):
+                        if (event := _verdict_event(item, labels)) is not None:
+                            q.put_nowait(event)
+        except Exception:
+            telemetry.judge_failures.inc(req.provider, req.judge_model)
+            raise
+        finally:
+            q.put_nowait(sentinel)
+        t1 = time.perf_counter()
+        telemetry.judge_latency.observe(t1 - t0, req.provider, req.judge_model)
+        tracing.record("judge.call", t0, t1, provider=req.provider, model=req.judge_model)
+        return "".join(parts)
+
+    async def events():
+        tracing.use(trace)  # the body may be iterated outside the endpoint's context
+        task: asyncio.Task | None = None
+        try:
+            key = _cache_key(req)
+            result = await _cached(key)
+            if result is not None:
+                for v in result.verdicts:
+                    yield ndjson.line({"type": "verdict", **v.model_dump()})
+            else:
+                task = asyncio.create_task(call())
+                while (event := await q.get()) is not sentinel:
+                    yield ndjson.line(event)
+                result = _result(req, await task or "{}")
+                if settings.verdict_cache:
+                    await asyncio.to_thread(_verdicts.put, key, result.model_dump())
+            _record(req, result)
+            yield ndjson.line({"type": "result", **result.model_dump()})
+        except Exception as e:  # noqa: BLE001 — the 200 is already sent; report in-band
+            err = _http_error(e, req)
+            yield ndjson.line({"type": "error", "status": err.status_code, "error": err.detail})
+        finally:
+            if task is not None:
+                task.cancel()  # the client went away mid-stream
+            tracing.finish(trace)
+
+    headers = {"X-Trace-Id": trace.id} if trace else None
+    return StreamingResponse(events(), media_type="application/x-ndjson", headers=headers)
+
+
+def _stored_item(
+    turn: dict, judge: BenchmarkJudge, timeout_s: float | None
+) -> JudgeRequest | str:
+    """A stored turn as a judge request, or why it can't be judged."""
+    answers = [a for a in turn["answers"] if a["status"] == "done" and a["text"]][:len(_LETTERS)]
+    if len(answers) < 2:
+        return "fewer than two finished answers"
+    return JudgeRequest(
+        prompt=turn["prompt"], judge_model=judge.judge_model, provider=judge.provider,
+        api_key=judge.api_key, base_url=judge.base_url, timeout_s=timeout_s,
+        turn_id=turn["id"],
+        candidates=[{"label": _LETTERS[k], "text": a["text"], "model": a["model"]}
+                    for k, a in enumerate(answers)],
+    )
+
+
+@router.post("/judge/batch", dependencies=[Depends(require_auth)])
+async def judge_batch(body: JudgeBatchRequest) -> StreamingResponse:
+    """NDJSON: an `item` event per item as it finishes ({index, result} or {index, error,
+    status} or {index, skipped}), then `end` with the counts.
+
+    Up to `concurrency` judge calls run at once, and at most ARENA_JUDGE_BATCH_PROVIDER_LIMITS
+    of those per provider, so a slow cloud judge can't crowd out local ones. Every event
+    carries `resume_offset` — all items below it are done — so a client that loses the
+    stream re-sends the same body with `offset` set to the last one it saw.
+    """
+    if bool(body.items) == (body.stored is not None):
+        raise HTTPException(status_code=400, detail="send either `items` or `stored`")
+    jobs: list[tuple[int, JudgeRequest | str]]
+    if body.stored is not None:
+        if body.judge is None:
+            raise HTTPException(status_code=400, detail="`stored` needs a `judge`")
+        if not settings.result_store:
+            raise HTTPException(status_code=404, detail="result store is off (ARENA_RESULT_STORE)")
+        turns = await asyncio.to_thread(store.results.batch_turns, **body.stored.model_dump(),
+                                        offset=body.offset)
+        jobs = [(body.offset + k, _stored_item(t, body.judge, body.timeout_s))
+                for k, t in enumerate(turns)]
+        total = body.offset + len(turns)
+    else:
+        jobs = list(enumerate(body.items))[body.offset:]
+        total = len(body.items)
+    width = body.concurrency or settings.judge_batch_concurrency
+
+    # One lane per provider (and one for skipped items), each worked by as many tasks as
+    # the provider may have calls in flight: tasks stay proportional to `concurrency`,
+    # not to the batch, and a capped provider never holds a worker another could use.
+    lanes: dict[str | None, list[tuple[int, JudgeRequest | str]]] = {}
+    for index, item in jobs:
+        lanes.setdefault(None if isinstance(item, str) else item.provider, []).append(
+            (index, item))
+    limits = settings.judge_batch_provider_limits
+
+    async def events():
+        done: asyncio.Queue[dict] = asyncio.Queue(maxsize=width)
+        slots = asyncio.Semaphore(width)
+
+        async def worker(lane: Iterator[tuple[int, JudgeRequest | str]]) -> None:
+            for index, item in lane:  # shared with the lane's other workers
+                event: dict = {"type": "item", "index": index}
+                if isinstance(item, str):
+                    event["skipped"] = item
+                else:
+                    try:
+                        async with slots:
+                            result = await _judged(item, "batch")
+                        _record(item, result)
+                        event["result"] = result.model_dump()
+                    except Exception as e:  # noqa: BLE001 — reported per item; the rest go on
+                        err = _http_error(e, item)
+                        event.update(error=err.detail, status=err.status_code)
+                await done.put(event)
+
+        tasks = []
+        for provider, items in lanes.items():
+            lane = iter(items)
+            n = 1 if provider is None else min(width, limits.get(provider, width), len(items))
+            tasks += [asyncio.create_task(worker(lane)) for _ in range(n)]
+        finished: set[int] = set()
+        low = body.offset
+        counts = {"judged": 0, "failed": 0, "skipped": 0}
+        try:
+            for _ in jobs:
+                event = await done.get()
+                finished.add(event["index"])
+                while low in finished:
+                    finished.discard(low)
+                    low += 1
+                outcome = ("judged" if "result" in event
+                           else "failed" if "error" in event else "skipped")
+                counts[outcome] += 1
+                yield ndjson.line({**event, "resume_offset": low})
+            yield ndjson.line({"type": "end", "total": total, **counts, "resume_offset": low})
+        finally:
+            for t in tasks:  # the client went away: stop what's still queued or running
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
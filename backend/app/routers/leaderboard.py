@@ -0,0 +1,28 @@
+"""Leaderboard: Bradley-Terry ratings with bootstrap CIs over every judged comparison."""
+import asyncio
+
+from fastapi import APIRouter, Depends, Query
+
+from app.config import settings
+from app.security import require_auth
+from app.services import leaderboard
+
+router = APIRouter()
+
+# The last fit, reused until a new verdict arrives: (version, bootstrap, ci) -> board.
+_last: dict[tuple[int, int, float], dict] = {}
+
+
+@router.get("/leaderboard", dependencies=[Depends(require_auth)])
+async def get_leaderboard(
+    bootstrap: int | None = Query(None, ge=0, le=5000),
+    ci: float = Query(0.95, gt=0.5, lt=1.0),
+) -> dict:
+    """Models best first; `ci_low`/`ci_high` bound each rating at the `ci` level."""
+    resamples = settings.leaderboard_bootstrap if bootstrap is None else bootstrap
+    key = (leaderboard.board.version, resamples, ci)
+    if key not in _last:
+        result = await asyncio.to_thread(leaderboard.ratings, leaderboard.board, resamples, ci)
+        _last.clear()
+        _last[key] = result
+    return _last[key]
@@ -0,0 +1,26 @@
+"""Prometheus text exposition of the in-process telemetry registry."""
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.routers.chat import _live
+from app.security import require_auth
+from app.services import telemetry
+from app.services.admission import admission
+
+router = APIRouter()
+
+telemetry.registry.add(telemetry.Gauge(
+    "arena_active_streams", "Live /chat/stream requests.", lambda: {(): len(_live)}))
+telemetry.registry.add(telemetry.Gauge(
+    "arena_queue_depth", "Generations waiting for an admission slot.",
+    lambda: {(m,): n for m, n in admission.waiting_by_model().items()}, ("model",)))
+telemetry.registry.add(telemetry.Gauge(
+    "arena_inflight", "Generations holding an admission slot.",
+    lambda: {(m,): n for m, n in admission.inflight_by_model().items()}, ("model",)))
+
+
+@router.get("/metrics", dependencies=[Depends(require_auth)])
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        telemetry.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
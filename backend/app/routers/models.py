@@ -1,9 +1,9 @@
-"""Model management: list / pull / delete + health."""
+"""Model management: list / pull / delete / warm / unload + health."""
 import asyncio
 
 from fastapi import APIRouter, Depends, HTTPException
 
-from app.schemas import PullRequest
+from app.schemas import ModelsRequest, PullRequest, WarmRequest
 from app.security import require_auth, same_origin
 from app.services import ollama
 
@@ -13,7 +13,10 @@ router = APIRouter()
 @router.get("/health")
 async def health() -> dict:
     ok = await ollama.reachable()
-    return {"status": "healthy", "ollama_reachable": ok}
+    out: dict = {"status": "healthy", "ollama_reachable": ok}
+    if ollama.pool.multi:
+        out["ollama_hosts"] = [h.status() for h in ollama.pool.hosts]
+    return out
 
 
 @router.get("/models", dependencies=[Depends(require_auth)])
@@ -24,6 +27,39 @@ async def list_models() -> dict:
         raise HTTPException(status_code=502, detail=f"ollama unreachable: {e}") from e
 
 
+@router.get("/models/loaded", dependencies=[Depends(require_auth)])
+async def loaded_models() -> dict:
+    try:
+        return {"models": await ollama.loaded()}
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"ollama unreachable: {e}") from e
+
+
+@router.post(
+    "/models/warm", dependencies=[Depends(require_auth), Depends(same_origin)]
+)
+async def warm_models(req: WarmRequest) -> dict:
+    """Preload models in parallel so the first compare turn doesn't pay load time."""
+
+    async def one(name: str) -> dict:
+        try:
+            return {**await ollama.warm(name, req.keep_alive), "error": None}
+        except Exception as e:  # noqa: BLE001
+            return {"model": name, "load_s": None, "error": str(e)}
+
+    return {"models": await asyncio.gather(*(one(m) for m in req.models))}
+
+
+@router.post(
+    "/models/unload", dependencies=[Depends(require_auth), Depends(same_origin)]
+)
+async def unload_models(req: ModelsRequest) -> dict:
+    """Evict models from memory (keep_alive=0) to free VRAM."""
+    res = await asyncio.gather(*(ollama.unload(m) for m in req.models), return_exceptions=True)
+    return {"unloaded": [m for m, r in zip(req.models, res) if not isinstance(r, Exception)],
+            "errors": {m: str(r) for m, r in zip(req.models, res) if isinstance(r, Exception)}}
+
+
 @router.post(
     "/models/pull", dependencies=[Depends(require_auth), Depends(same_origin)]
 )
@@ -0,0 +1,79 @@
+"""History queries over the server-side result store (ARENA_RESULT_STORE).
+
+Every list endpoint is newest-first and paginated: pass `next_cursor` back as `cursor`.
+"""
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.config import settings
+from app.security import require_auth
+from app.services import store
+
+router = APIRouter()
+
+_Limit = Query(50, ge=1, le=200)
+
+
+def _enabled() -> None:
+    if not settings.result_store:
+        raise HTTPException(status_code=404, detail="result store is off (ARENA_RESULT_STORE)")
+
+
+_deps = [Depends(require_auth), Depends(_enabled)]
+
+
+@router.get("/results/turns", dependencies=_deps)
+async def list_turns(
+    model: str | None = None,
+    session_id: str | None = None,
+    prompt_hash: str | None = None,
+    since: float | None = None,
+    until: float | None = None,
+    cursor: int | None = None,
+    limit: int = _Limit,
+) -> dict:
+    return await asyncio.to_thread(
+        store.results.turns, model=model, session_id=session_id, prompt_hash=prompt_hash,
+        since=since, until=until, cursor=cursor, limit=limit,
+    )
+
+
+@router.get("/results/turns/{turn_id}", dependencies=_deps)
+async def get_turn(turn_id: str) -> dict:
+    turn = await asyncio.to_thread(store.results.turn, turn_id)
+    if turn is None:
+        raise HTTPException(status_code=404, detail=f"unknown turn: {turn_id}")
+    return turn
+
+
+@router.get("/results/answers", dependencies=_deps)
+async def list_answers(
+    model: str | None = None,
+    status: str | None = None,
+    since: float | None = None,
+    until: float | None = None,
+    cursor: int | None = None,
+    limit: int = _Limit,
+) -> dict:
+    return await asyncio.to_thread(
+        store.results.answers, model=model, status=status, since=since, until=until,
+        cursor=cursor, limit=limit,
+    )
+
+
+@router.get("/results/verdicts", dependencies=_deps)
+async def list_verdicts(
+    model: str | None = None,
+    judge_model: str | None = None,
+    turn_id: str | None = None,
+    prompt_hash: str | None = None,
+    since: float | None = None,
+    until: float | None = None,
+    cursor: int | None = None,
+    limit: int = _Limit,
+) -> dict:
+    return await asyncio.to_thread(
+        store.results.verdicts, model=model, judge_model=judge_model, turn_id=turn_id,
+        prompt_hash=prompt_hash, since=since, until=until, cursor=cursor, limit=limit,
+    )
@@ -0,0 +1,22 @@
+"""Recent request traces (ARENA_TRACING): span timelines for a single slow turn."""
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.security import require_auth
+from app.services import tracing
+
+router = APIRouter()
+
+
+@router.get("/traces", dependencies=[Depends(require_auth)])
+async def list_traces() -> dict:
+    """Newest first: id, name, start and duration of each kept trace."""
+    return {"traces": tracing.recent()}
+
+
+@router.get("/traces/{trace_id}", dependencies=[Depends(require_auth)])
+async def get_trace(trace_id: str) -> dict:
+    """One trace; the id is the stream's X-Request-Id, or X-Trace-Id on /chat and /judge."""
+    trace = tracing.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"unknown trace: {trace_id}")
+    return trace
@@ -3,6 +3,11 @@ from typing import Literal
 
 from pydantic import BaseModel, ConfigDict, Field
 
+# Ollama keep_alive: a duration ("10m", "1h", "30s") or bare seconds ("300"; "-1" keeps the
+# model loaded indefinitely, "0" unloads it right after the request).
+_KEEP_ALIVE = r"^-?\d+(\.\d+)?(ms|s|m|h)?$"
+_ID = r"^[A-Za-z0-9_-]+$"
+
 
 class ModelInstance(BaseModel):
     # `model`/`model_instances` collide with pydantic's protected namespace — disable it.
@@ -16,6 +21,8 @@ class ModelInstance(BaseModel):
     repeat_penalty: float | None = Field(default=None, ge=1.0, le=2.0)
     num_predict: int | None = Field(default=None, ge=-1, le=4096)
     seed: int | None = Field(default=None, ge=0)
+    keep_alive: str | None = Field(default=None, max_length=16, pattern=_KEEP_ALIVE)
+    timeout_s: float | None = Field(default=None, gt=0, le=3600)  # capped by the request's
 
 
 class Message(BaseModel):
@@ -30,6 +37,20 @@ class ChatRequest(BaseModel):
     history: list[Message] = []
     system: str = "You are a helpful assistant."
     model_instances: list[ModelInstance] = Field(min_length=1, max_length=6)
+    # /chat/stream framing (None -> ARENA_STREAM_* defaults). coalesce_ms > 0 merges each
+    # instance's tokens over that window into one event; coalesce_bytes flushes early.
+    coalesce_ms: int | None = Field(default=None, ge=0, le=1000)
+    coalesce_bytes: int | None = Field(default=None, ge=0, le=65536)
+    echo_text: bool = True  # False: the `done` event omits the full text
+    # Name for POST /chat/{request_id}/cancel; generated (X-Request-Id header) if omitted.
+    request_id: str | None = Field(default=None, max_length=64, pattern=_ID)
+    # Result store grouping: requests sharing a turn_id (one per model) form one turn;
+    # defaults to the request_id.
+    turn_id: str | None = Field(default=None, max_length=64, pattern=_ID)
+    session_id: str | None = Field(default=None, max_length=64, pattern=_ID)
+    # Turn budget (None -> ARENA_REQUEST_TIMEOUT_S). Instances still running at the deadline
+    # are cancelled and return their partial text with `timed_out: true`.
+    timeout_s: float | None = Field(default=None, gt=0, le=3600)
 
 
 class PullRequest(BaseModel):
@@ -37,10 +58,28 @@ class PullRequest(BaseModel):
     model: str = Field(min_length=1, max_length=200)
 
 
+class ModelsRequest(BaseModel):
+    models: list[str] = Field(min_length=1, max_length=12)
+
+
+class WarmRequest(ModelsRequest):
+    keep_alive: str | None = Field(default=None, max_length=16, pattern=_KEEP_ALIVE)
+
+
 # ---- LLM-as-judge (automated evaluation) ----
 class Candidate(BaseModel):
     label: str  # anonymized: "A", "B", ... (the judge never sees model names)
     text: str
+    model: str | None = None  # for the result store only; never sent to the judge
+
+
+class PanelJudge(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+    judge_model: str
+    provider: Literal["local", "anthropic", "openai", "openrouter"] = "local"
+    api_key: str | None = None
+    base_url: str | None = None
+    samples: int = Field(default=1, ge=1, le=9)
 
 
 class JudgeRequest(BaseModel):
@@ -52,6 +91,14 @@ class JudgeRequest(BaseModel):
     provider: Literal["local", "anthropic", "openai", "openrouter"] = "local"
     api_key: str | None = None  # cloud only; never stored or logged
     base_url: str | None = None  # override for OpenAI-compatible endpoints
+    # Verdict budget (None -> ARENA_REQUEST_TIMEOUT_S); pass /chat's budget_left_s here.
+    timeout_s: float | None = Field(default=None, gt=0, le=3600)
+    turn_id: str | None = Field(default=None, max_length=64, pattern=_ID)  # result store
+    seed: int | None = Field(default=None, ge=0)  # local judge sampling seed; in the cache key
+    # Voting: this judge `samples` times plus every `panel` judge, all at once; the calls
+    # still running are cancelled as soon as the winner can no longer change.
+    samples: int = Field(default=1, ge=1, le=9)
+    panel: list[PanelJudge] = Field(default_factory=list, max_length=8)
 
 
 class Verdict(BaseModel):
@@ -60,6 +107,95 @@ class Verdict(BaseModel):
     reason: str = ""
 
 
+class Ballot(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+    judge_model: str
+    provider: str
+    seed: int | None = Field(default=None, ge=0)
+    winner: str = ""
+    cached: bool = False
+    error: str | None = None
+    skipped: bool = False  # cancelled once the winner was locked in
+
+
+class PanelStats(BaseModel):
+    judges: int  # calls planned
+    completed: int
+    failed: int
+    skipped: int  # judge calls saved by stopping early
+    votes: dict[str, int]
+    agreement: float  # share of completed ballots for the winner
+    unanimous: bool
+    ballots: list[Ballot]
+
+
 class JudgeResult(BaseModel):
     verdicts: list[Verdict]
     winner: str = ""  # derived from the top score if the judge omits it
+    cached: bool = False  # served from the verdict cache, no judge call made
+    panel: PanelStats | None = None  # set when several judges voted
+
+
+# ---- Server-side batch benchmark ----
+class BenchmarkJudge(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+    judge_model: str
+    provider: Literal["local", "anthropic", "openai", "openrouter"] = "local"
+    api_key: str | None = None  # held in memory for the run only; never returned
+    base_url: str | None = None
+
+
+class StoredTurns(BaseModel):
+    # Turns from the result store, filtered as GET /api/results/turns but oldest first so
+    # an item's index stays put while newer turns arrive.
+    model: str | None = None
+    session_id: str | None = None
+    since: float | None = None
+    until: float | None = None
+    limit: int = Field(default=1000, ge=1, le=20000)  # turns per batch, counted from `offset`
+
+
+class JudgeBatchRequest(BaseModel):
+    items: list[JudgeRequest] = Field(default_factory=list, max_length=20000)
+    stored: StoredTurns | None = None  # instead of `items`: re-judge stored answers
+    judge: BenchmarkJudge | None = None  # the judge for `stored` (items name their own)
+    timeout_s: float | None = Field(default=None, gt=0, le=3600)  # per stored item
+    concurrency: int | None = Field(default=None, ge=1, le=64)  # None -> ARENA_JUDGE_BATCH_*
+    offset: int = Field(default=0, ge=0)  # resume: skip items below this index
+
+
+class BenchmarkAdaptive(BaseModel):
+    # Judge only until the top `top_k` order survives `confidence` of bootstrap resamples,
+    # choosing which prompts and models to judge next by where the ranking is unsure.
+    top_k: int = Field(default=3, ge=1, le=6)
+    confidence: float = Field(default=0.95, ge=0.5, lt=1)
+    min_calls: int = Field(default=4, ge=1)  # judge calls before the first stop check
+
+
+class BenchmarkResume(BaseModel):
+    api_key: str | None = None  # a cloud judge's key: never written to the checkpoint
+
+
+class BenchmarkRequest(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
+    prompts: list[str] = Field(default_factory=list, max_length=20000)
+    prompt_set: str | None = None  # instead of `prompts`: an uploaded set's id
+    system: str = "You are a helpful assistant."
+    model_instances: list[ModelInstance] = Field(min_length=1, max_length=6)
+    judge: BenchmarkJudge | None = None  # omit to only generate
+    # Run only the prompts whose hash falls in range `shard_index` of `shard_count`, so
+    # one set can be split across server processes.
+    shard_index: int = Field(default=0, ge=0)
+    shard_count: int = Field(default=1, ge=1, le=256)
+    # Pipeline widths (None -> ARENA_BENCHMARK_* defaults).
+    gen_concurrency: int | None = Field(default=None, ge=1, le=16)
+    judge_concurrency: int | None = Field(default=None, ge=1, le=16)
+    # Per-prompt budget for generation + judging (None -> ARENA_REQUEST_TIMEOUT_S).
+    timeout_s: float | None = Field(default=None, gt=0, le=3600)
+    # "prompt": each prompt on every model at once. "model": run each model's prompts
+    # back to back while it's resident, `model_slots` models at a time (None ->
+    # ARENA_BENCHMARK_MODEL_SLOTS) — for runs over more models than fit in VRAM.
+    schedule: Literal["prompt", "model"] = "prompt"
+    model_slots: int | None = Field(default=None, ge=1, le=16)
+    adaptive: BenchmarkAdaptive | None = None  # needs `judge`; omit to judge every prompt
@@ -0,0 +1,105 @@
+"""Admission control in front of Ollama: in-flight caps per model and overall.
+
+Ollama serves OLLAMA_NUM_PARALLEL requests per loaded model and keeps at most
+OLLAMA_MAX_LOADED_MODELS resident; anything beyond that queues inside Ollama where we
+can't see or order it. Here every generation first takes a slot. Waiters are admitted
+by priority class (interactive chat before judge before batch work), FIFO within a
+class — or strictly FIFO when ARENA_ADMISSION_POLICY=fifo. A waiter whose model is at
+its cap never blocks waiters for other models.
+"""
+import asyncio
+import itertools
+import time
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Literal
+
+from app.config import settings
+
+Priority = Literal["interactive", "judge", "batch"]
+
+_RANK = {"interactive": 0, "judge": 1, "batch": 2}
+
+
+class Admission:
+    def __init__(self, per_model: int, total: int, policy: str = "priority"):
+        self.per_model = per_model
+        self.total = total
+        self.policy = policy
+        self._inflight: dict[str, int] = defaultdict(int)
+        self._running = 0
+        self._waiters: list[tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for *_, fut in self._waiters if not fut.done())
+
+    def inflight(self, model: str | None = None) -> int:
+        return self._running if model is None else self._inflight.get(model, 0)
+
+    def waiting_by_model(self) -> dict[str, int]:
+        out: dict[str, int] = defaultdict(int)
+        for _, _, model, fut in self._waiters:
+            if not fut.done():
+                out[model] += 1
+        return dict(out)
+
+    def inflight_by_model(self) -> dict[str, int]:
+        return dict(self._inflight)
+
+    def _fits(self, model: str) -> bool:
+        return self._running < self.total and self._inflight[model] < self.per_model
+
+    def _take(self, model: str) -> None:
+        self._inflight[model] += 1
+        self._running += 1
+
+    def _dispatch(self) -> None:
+        keep = []
+        for w in sorted(self._waiters):  # (rank, seq, ...) — seq is unique, so futures never compare
+            fut = w[3]
+            if fut.done():  # waiter was cancelled
+                continue
+            if self._fits(w[2]):
+                self._take(w[2])
+                fut.set_result(None)
+            else:
+                keep.append(w)
+        self._waiters = keep
+
+    async def acquire(self, model: str, priority: Priority = "interactive") -> float:
+        """Wait for a slot; returns the seconds spent queued."""
+        t0 = time.perf_counter()
+        fut = asyncio.get_running_loop().create_future()
+        rank = _RANK[priority] if self.policy == "priority" else 0
+        self._waiters.append((rank, next(self._seq), model, fut))
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():  # admitted, but the caller gave up
+                self.release(model)
+            raise
+        return time.perf_counter() - t0
+
+    def release(self, model: str) -> None:
+        self._inflight[model] -= 1
+        if not self._inflight[model]:
+            del self._inflight[model]
+        self._running -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: Priority = "interactive") -> AsyncIterator[float]:
+        waited = await self.acquire(model, priority)
+        try:
+            yield waited
+        finally:
+            self.release(model)
+
+
+admission = Admission(
+    settings.max_inflight_per_model, settings.max_inflight_total, settings.admission_policy
+)
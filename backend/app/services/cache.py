@@ -0,0 +1,101 @@
+"""Small persistent key → JSON cache on SQLite with size-bounded LRU eviction and TTL.
+
+Stdlib only. Each cache is one SQLite file under ARENA_CACHE_DIR, opened lazily on first
+use so nothing touches the disk unless a cache is actually enabled. Methods are blocking
+(microseconds to low milliseconds) — call them via `asyncio.to_thread` from handlers.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+
+def content_key(*parts: Any) -> str:
+    """Stable SHA-256 of JSON-serializable parts (dict key order doesn't matter)."""
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class DiskCache:
+    def __init__(self, path: str | Path, max_bytes: int, ttl_s: float | None = None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._db: sqlite3.Connection | None = None
+        self._bytes = 0  # running SUM(size), so a put doesn't rescan the table
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            (self._bytes,) = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+            self._db = db
+        return self._db
+
+    def get(self, key: str) -> Any | None:
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            row = db.execute(
+                "SELECT value, created, size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_s is not None and now - row[1] > self.ttl_s:
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._bytes -= row[2]
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        blob = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+        size = len(blob.encode())
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            old = db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, blob, size, now, now),
+            )
+            self._bytes += size - (old[0] if old else 0)
+            if self._bytes > self.max_bytes:
+                self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        doomed = []
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            doomed.append((key,))
+            self._bytes -= size
+            if self._bytes <= self.max_bytes:
+                break
+        db.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn().execute("DELETE FROM entries")
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            n, total = self._conn().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"entries": n, "bytes": total, "hits": self.hits, "misses": self.misses}
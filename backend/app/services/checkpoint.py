@@ -0,0 +1,84 @@
+"""Append-only checkpoint log for benchmark runs, so a crash or restart loses nothing.
+
+One JSONL file per run under ARENA_BENCHMARK_DIR: a `run` header (the request, API key
+removed), then an `answer` record as each (prompt, instance) generation finishes and a
+`verdict` record as each prompt is judged. Nothing is ever rewritten; replaying the file
+rebuilds exactly what was done, and a torn last line from a crash mid-write is ignored.
+Records carry the prompt's hash next to its index so a log is never applied to a
+different prompt list.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from app.config import settings
+
+logger = logging.getLogger("arena.checkpoint")
+
+_ID = re.compile(r"^[0-9a-f]{12}$")
+
+
+def path_for(run_id: str) -> Path | None:
+    if not _ID.match(run_id):
+        return None
+    return Path(settings.benchmark_dir) / f"{run_id}.jsonl"
+
+
+class Checkpoint:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file: Any = None
+
+    def append(self, record: dict) -> None:
+        """Write one record and flush it to the OS (a crash of this process keeps it)."""
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a+b")  # noqa: SIM115
+                if self._file.tell() and _torn(self._file):
+                    self._file.write(b"\n")  # don't glue onto a line a crash cut short
+            self._file.write(line.encode())
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _torn(f: Any) -> bool:
+    f.seek(-1, 2)
+    return f.read(1) != b"\n"
+
+
+def start(run_id: str, request: dict) -> Checkpoint:
+    cp = Checkpoint(path_for(run_id))
+    cp.append({"type": "run", "id": run_id, "created": time.time(), "request": request})
+    return cp
+
+
+def replay(path: Path) -> tuple[dict, list[dict]]:
+    """(header, records) from a log; raises FileNotFoundError / ValueError if unusable."""
+    header: dict | None = None
+    records: list[dict] = []
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f):
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                logger.warning("%s: skipping unreadable line %d", path.name, n + 1)
+                continue
+            if rec.get("type") == "run":
+                header = rec
+            else:
+                records.append(rec)
+    if header is None:
+        raise ValueError(f"{path.name} has no run header")
+    return header, records
@@ -3,33 +3,210 @@
 API keys are resolved by the router (per-request UI value, else env fallback) and passed
 in here already resolved. They are never stored on disk or written to logs. Each function
 returns a raw JSON string that the judge router parses + validates.
+
+Clients are long-lived and pooled per (provider, base_url) so verdicts reuse warm
+keep-alive connections (HTTP/2 when `h2` is installed). Every call goes through a token
+bucket per provider endpoint and is retried with jittered backoff on 429 / 5xx /
+connection errors, honouring the provider's Retry-After. The `*_stream` variants yield
+the same text in pieces; only opening the stream is retried, not a stream cut midway.
 """
-from typing import Any
+import asyncio
+import hashlib
+import importlib.util
+import itertools
+import json
+import logging
+import random
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, TypeVar
 
 import httpx
 
+from app.config import settings
+from app.services.ratelimit import TokenBucket
+
+logger = logging.getLogger("arena.cloud")
+
+T = TypeVar("T")
+
+_HTTP2 = importlib.util.find_spec("h2") is not None
+_ANTHROPIC_BASE = "https://api.anthropic.com"
+_MAX_ANTHROPIC_CLIENTS = 8  # one per distinct API key; a local app sees one or two
+
+_http: dict[tuple[str, str], httpx.AsyncClient] = {}
+_anthropic: dict[str, Any] = {}  # key hash -> client, least recently used first
+_anthropic_calls: Counter[Any] = Counter()  # client -> calls in flight on it
+_retired: set[Any] = set()  # evicted while in use: closed when its last call ends
+_buckets: dict[tuple[str, str], TokenBucket] = {}
+
+
+class RateLimitError(Exception):
+    """The provider kept answering 429 after every retry."""
+
+    def __init__(self, retry_after: float | None):
+        super().__init__("judge provider rate limit reached — retry later.")
+        self.retry_after = retry_after
+
+
+def _http_client(provider: str, base_url: str) -> httpx.AsyncClient:
+    client = _http.get((provider, base_url))
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=120,
+            http2=_HTTP2,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16,
+                                keepalive_expiry=90),
+        )
+        _http[(provider, base_url)] = client
+    return client
+
+
+@asynccontextmanager
+async def _anthropic_client(api_key: str) -> AsyncIterator[Any]:
+    """The pooled client for `api_key`, held for one call.
+
+    Past _MAX_ANTHROPIC_CLIENTS keys the least recently used client is evicted and
+    closed with its connection pool — right away if idle, else when its last call ends.
+    """
+    from anthropic import AsyncAnthropic  # core dep, imported lazily
+
+    tag = hashlib.sha256(api_key.encode()).hexdigest()
+    client = _anthropic.pop(tag, None)
+    if client is None:
+        if len(_anthropic) >= _MAX_ANTHROPIC_CLIENTS:
+            old = _anthropic.pop(next(iter(_anthropic)))
+            if _anthropic_calls[old]:
+                _retired.add(old)
+            else:
+                await old.close()
+        # Retries are ours (rate-limit aware), not the SDK's.
+        client = AsyncAnthropic(api_key=api_key, max_retries=0, timeout=120)
+    _anthropic[tag] = client  # (re)inserted last: dict order is recency
+    _anthropic_calls[client] += 1
+    try:
+        yield client
+    finally:
+        _anthropic_calls[client] -= 1
+        if not _anthropic_calls[client]:
+            del _anthropic_calls[client]
+            if client in _retired:
+                _retired.discard(client)
+                await client.close()
+
+
+def _bucket(provider: str, base_url: str) -> TokenBucket:
+    bucket = _buckets.get((provider, base_url))
+    if bucket is None:
+        bucket = TokenBucket(settings.cloud_requests_per_min / 60, settings.cloud_burst)
+        _buckets[(provider, base_url)] = bucket
+    return bucket
+
+
+def _retry_after(headers: Any) -> float | None:
+    if not headers:
+        return None
+    if (ms := headers.get("retry-after-ms")) is not None:
+        try:
+            return max(0.0, float(ms) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def _classify(e: Exception) -> tuple[int | None, float | None, bool]:
+    """(status, retry_after, retryable) for an httpx or Anthropic SDK error."""
+    if isinstance(e, httpx.TransportError):
+        return None, None, True
+    if type(e).__name__ in ("APIConnectionError", "APITimeoutError"):  # Anthropic SDK
+        return None, None, True
+    resp = getattr(e, "response", None)
+    status = getattr(resp, "status_code", None)
+    if status is None:
+        return None, None, False
+    return status, _retry_after(getattr(resp, "headers", None)), status == 429 or status >= 500
+
+
+async def _call(provider: str, base_url: str, fn: Callable[[], Awaitable[T]]) -> T:
+    """Run `fn` under the endpoint's rate limit, retrying transient failures."""
+    bucket = _bucket(provider, base_url)
+    for attempt in itertools.count():
+        await bucket.acquire()
+        try:
+            return await fn()
+        except Exception as e:
+            status, retry_after, retryable = _classify(e)
+            if not retryable or attempt >= settings.cloud_max_retries:
+                if status == 429:
+                    raise RateLimitError(retry_after) from e
+                raise
+            if retry_after is not None:
+                bucket.pause(retry_after)  # everyone on this endpoint waits, not just us
+                delay = retry_after + random.uniform(0, 0.25)
+            else:  # full jitter
+                delay = random.uniform(0, min(30.0, 0.5 * 2**attempt))
+            logger.warning("%s judge call failed (status=%s); retry %d in %.1fs",
+                           provider, status, attempt + 1, delay)
+            await asyncio.sleep(delay)
+
 
 async def anthropic_json(model: str, system: str, user: str, api_key: str) -> str:
     """Judge via Anthropic (Claude), official SDK. JSON is prompt-driven so it works
     across SDK versions — Claude reliably returns valid JSON for this task."""
-    from anthropic import AsyncAnthropic  # core dep, imported lazily
+    async with _anthropic_client(api_key) as client:
 
-    client = AsyncAnthropic(api_key=api_key)
-    resp = await client.messages.create(
-        model=model,
-        max_tokens=2048,
-        system=system,
-        messages=[{"role": "user", "content": user}],
-    )
+        async def send() -> Any:
+            return await client.messages.create(
+                model=model,
+                max_tokens=2048,
+                system=system,
+                messages=[{"role": "user", "content": user}],
+            )
+
+        resp = await _call("anthropic", _ANTHROPIC_BASE, send)
     return "".join(b.text for b in resp.content if getattr(b, "type", None) == "text") or "{}"
 
 
-async def openai_compatible_json(
-    model: str, system: str, user: str, schema: dict[str, Any], api_key: str, base_url: str
-) -> str:
-    """Judge via any OpenAI-compatible endpoint (OpenAI, OpenRouter, Groq, Together, …)
-    using native structured outputs (response_format json_schema)."""
-    url = base_url.rstrip("/") + "/chat/completions"
+async def anthropic_json_stream(
+    model: str, system: str, user: str, api_key: str
+) -> AsyncIterator[str]:
+    async with _anthropic_client(api_key) as client:
+
+        async def send() -> Any:
+            return await client.messages.create(
+                model=model,
+                max_tokens=2048,
+                system=system,
+                messages=[{"role": "user", "content": user}],
+                stream=True,
+            )
+
+        events = await _call("anthropic", _ANTHROPIC_BASE, send)
+        try:
+            async for event in events:
+                delta = getattr(event, "delta", None)
+                if (event.type == "content_block_delta"
+                        and getattr(delta, "type", None) == "text_delta"):
+                    yield delta.text
+        finally:
+            await events.close()
+
+
+def _openai_request(
+    model: str, system: str, user: str, schema: dict[str, Any], api_key: str
+) -> tuple[dict[str, Any], dict[str, str]]:
     body = {
         "model": model,
         "max_tokens": 2048,  # hard cap — a judge verdict is small; bounds cost/runaway output
@@ -48,7 +225,67 @@ async def openai_compatible_json(
         "HTTP-Referer": "http://localhost:7860",
         "X-Title": "Local LLM Arena",
     }
-    async with httpx.AsyncClient(timeout=120) as client:
-        r = await client.post(url, headers=headers, json=body)
-    r.raise_for_status()
+    return body, headers
+
+
+async def openai_compatible_json(
+    model: str, system: str, user: str, schema: dict[str, Any], api_key: str, base_url: str
+) -> str:
+    """Judge via any OpenAI-compatible endpoint (OpenAI, OpenRouter, Groq, Together, …)
+    using native structured outputs (response_format json_schema)."""
+    base = base_url.rstrip("/")
+    body, headers = _openai_request(model, system, user, schema, api_key)
+    client = _http_client("openai", base)
+
+    async def send() -> httpx.Response:
+        r = await client.post(base + "/chat/completions", headers=headers, json=body)
+        r.raise_for_status()
+        return r
+
+    r = await _call("openai", base, send)
     return r.json()["choices"][0]["message"]["content"]
+
+
+async def openai_compatible_json_stream(
+    model: str, system: str, user: str, schema: dict[str, Any], api_key: str, base_url: str
+) -> AsyncIterator[str]:
+    """`openai_compatible_json` as server-sent events: yields each content delta."""
+    base = base_url.rstrip("/")
+    body, headers = _openai_request(model, system, user, schema, api_key)
+    client = _http_client("openai", base)
+    request = client.build_request("POST", base + "/chat/completions", headers=headers,
+                                   json={**body, "stream": True})
+
+    async def send() -> httpx.Response:
+        r = await client.send(request, stream=True)
+        if r.is_error:
+            await r.aread()
+            await r.aclose()
+            r.raise_for_status()
+        return r
+
+    r = await _call("openai", base, send)
+    try:
+        async for line in r.aiter_lines():
+            if not line.startswith("data:"):
+                continue  # blank separators and ": keep-alive" comments
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or []
+            if choices and (text := (choices[0].get("delta") or {}).get("content")):
+                yield text
+    finally:
+        await r.aclose()
+
+
+async def aclose() -> None:
+    """Close pooled clients (app shutdown)."""
+    http, sdk = list(_http.values()), [*_anthropic.values(), *_retired]
+    _http.clear()
+    _anthropic.clear()
+    _retired.clear()
+    _anthropic_calls.clear()
+    await asyncio.gather(
+        *(c.aclose() for c in http), *(c.close() for c in sdk), return_exceptions=True
+    )
@@ -0,0 +1,59 @@
+"""Token-budget history: keep the system prompt and the newest turns that fit the context.
+
+Counting messages (ARENA_HISTORY_LIMIT) treats a pasted 40k-token log and "thanks!" the
+same. With ARENA_HISTORY_MODE=tokens each instance's history is cut to its model's
+context budget instead. Token counts are an estimate — no tokenizer per model, just
+~4 ASCII characters per token and one per other character, which errs high for code
+and CJK — memoized per message content, so a long session's older turns cost a dict
+lookup on every new turn rather than a re-count.
+"""
+import functools
+import math
+
+from app.config import settings
+from app.schemas import ModelInstance
+
+_PER_MESSAGE = 4  # role + chat-template framing
+_MEMO_MAX = 65536
+_REPLY_RESERVE = 512  # room left for the answer when num_predict isn't set
+
+def _count(text: str) -> int:
+    if text.isascii():
+        return math.ceil(len(text) / 4)
+    ascii_n = len(text.encode("ascii", "ignore"))
+    return math.ceil(ascii_n / 4) + len(text) - ascii_n
+
+
+@functools.lru_cache(maxsize=_MEMO_MAX)
+def estimate(text: str) -> int:
+    """Estimated tokens for one message's content (memoized by content, LRU-bounded)."""
+    return _count(text) + _PER_MESSAGE
+
+
+def budget(inst: ModelInstance) -> int:
+    """Prompt tokens `inst` may use: its model's context minus room for the reply."""
+    context = settings.history_context_by_model.get(inst.model, settings.history_context_tokens)
+    reply = inst.num_predict if inst.num_predict and inst.num_predict > 0 else _REPLY_RESERVE
+    return max(0, context - reply)
+
+
+def fit(messages: list[dict[str, str]], limit: int) -> tuple[list[dict[str, str]], int, int]:
+    """(kept, messages dropped, tokens dropped): system + newest messages within `limit`.
+
+    The first (system) and last (the new user message) are always kept, even alone over
+    the limit; older messages go oldest first, and a kept history never opens with an
+    assistant reply whose question was dropped.
+    """
+    if len(messages) <= 2:
+        return messages, 0, 0
+    used = estimate(messages[0]["content"]) + estimate(messages[-1]["content"])
+    start = len(messages) - 1
+    while start > 1 and used + (n := estimate(messages[start - 1]["content"])) <= limit:
+        start -= 1
+        used += n
+    while start < len(messages) - 1 and messages[start]["role"] == "assistant":
+        start += 1
+    if start == 1:
+        return messages, 0, 0
+    dropped = sum(estimate(m["content"]) for m in messages[1:start])
+    return [messages[0], *messages[start:]], start - 1, dropped
@@ -0,0 +1,113 @@
+"""Several Ollama hosts behind one arena: model-aware routing with failover.
+
+Each host is polled (`tags` + `ps`) every ARENA_OLLAMA_POLL_S, which tells us what it
+has pulled, what it has resident and whether it answers at all. A request for a model
+goes to a healthy host that has it resident (no load), else one that has it pulled,
+breaking ties by fewest requests outstanding from this process; a host that refuses a
+connection is marked down until the next successful poll and the request moves on to
+the next candidate. With a single host none of this runs — calls go straight to it.
+"""
+import asyncio
+import logging
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import httpx
+from ollama import ResponseError
+
+from app.config import settings
+
+log = logging.getLogger(__name__)
+
+# Worth trying the next host: it is unreachable, or its catalog changed under us.
+UNREACHABLE: tuple[type[Exception], ...] = (ConnectionError, httpx.TransportError)
+
+
+def should_fail_over(e: Exception) -> bool:
+    return isinstance(e, UNREACHABLE) or (isinstance(e, ResponseError) and e.status_code == 404)
+
+
+class Host:
+    def __init__(self, url: str, client: Any):
+        self.url = url
+        self.client = client
+        self.healthy = True
+        self.error: str | None = None
+        self.pulled: dict[str, Any] = {}  # name -> `tags` entry
+        self.resident: set[str] = set()
+        self.outstanding = 0
+        self.polled_at: float | None = None
+
+    def status(self) -> dict[str, Any]:
+        return {"url": self.url, "healthy": self.healthy, "error": self.error,
+                "models": len(self.pulled), "resident": sorted(self.resident),
+                "outstanding": self.outstanding}
+
+
+class HostPool:
+    def __init__(self, urls: list[str], client_factory: Callable[[str], Any]):
+        self.hosts = [Host(u, client_factory(u)) for u in urls]
+        self._poller: asyncio.Task | None = None
+
+    @property
+    def multi(self) -> bool:
+        return len(self.hosts) > 1
+
+    def candidates(self, model: str) -> list[Host]:
+        """Hosts to try for `model`, best first (down hosts last, as a final resort)."""
+        known = any(h.polled_at is not None for h in self.hosts)
+        pulled = [h for h in self.hosts if model in h.pulled]
+        pool = pulled if known and pulled else self.hosts  # unknown model: let Ollama say
+        ranked = sorted(pool, key=lambda h: (not h.healthy, model not in h.resident,
+                                             h.outstanding))
+        return ranked + [h for h in self.hosts if h not in ranked]
+
+    @contextmanager
+    def use(self, host: Host, model: str) -> Iterator[None]:
+        host.outstanding += 1
+        try:
+            yield
+        finally:
+            host.outstanding -= 1
+        host.resident.add(model)  # Ollama keeps it loaded after serving; polls correct it
+
+    def mark_down(self, host: Host, e: Exception) -> None:
+        if isinstance(e, UNREACHABLE):
+            host.healthy = False
+            host.error = str(e) or type(e).__name__
+            log.warning("ollama host %s is down: %s", host.url, host.error)
+
+    async def _poll(self, host: Host) -> None:
+        try:
+            async with asyncio.timeout(max(2.0, min(10.0, settings.ollama_poll_s))):
+                tags, ps = await asyncio.gather(host.client.list(), host.client.ps())
+        except Exception as e:  # noqa: BLE001 — any failure means "don't route here"
+            host.healthy, host.error = False, str(e) or type(e).__name__
+            return
+        host.pulled = {m.model: m for m in tags.models}
+        host.resident = {m.model for m in ps.models}
+        host.healthy, host.error, host.polled_at = True, None, time.monotonic()
+
+    async def refresh(self) -> None:
+        await asyncio.gather(*(self._poll(h) for h in self.hosts))
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(settings.ollama_poll_s)
+
+    def start(self) -> None:
+        if self.multi and self._poller is None:
+            self._poller = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+
+
+def parse_hosts(value: str) -> list[str]:
+    return [h.strip().rstrip("/") for h in value.split(",") if h.strip()]
@@ -0,0 +1,69 @@
+"""Pull finished items out of a JSON document while it is still being generated.
+
+A judge writes `{"verdicts": [{...}, {...}], "winner": "A"}` token by token. `Items`
+is fed those tokens and returns each element of the named top-level array as soon as its
+closing bracket arrives, so a candidate's score can be shown long before the whole
+document is done. It only tracks strings, escapes and nesting — one pass over each
+character, nothing re-parsed — and ignores any prose before the opening brace. The
+complete text is still parsed normally at the end; this is just the early preview.
+"""
+import json
+from typing import Any
+
+
+class Items:
+    def __init__(self, key: str):
+        self.key = key
+        self._depth = 0
+        self._array: int | None = None  # depth of the `key` array's elements, once open
+        self._closed = False
+        self._item: list[str] = []  # text of the element being read
+        self._in_string = False
+        self._escaped = False
+        self._string: list[str] = []
+        self._last_string: str | None = None  # the object key, when a value follows
+
+    def feed(self, chunk: str) -> list[Any]:
+        """Elements of the `key` array completed by `chunk` (malformed ones skipped)."""
+        done: list[Any] = []
+        for ch in chunk:
+            if self._depth == 0 and ch != "{":
+                continue  # preamble (or trailing text) outside the document
+            inside = self._array is not None and not self._closed and self._depth > self._array
+            if inside:
+                self._item.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = "".join(self._string)
+                elif not inside:
+                    self._string.append(ch)
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string = []
+            elif ch in "{[":
+                if (ch == "[" and self._depth == 1 and self._array is None
+                        and self._last_string == self.key):
+                    self._array = 2
+                elif self._depth == self._array and not self._closed:
+                    self._item = [ch]  # an element starts
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._array is None or self._closed:
+                    continue
+                if self._depth == self._array:
+                    try:
+                        done.append(json.loads("".join(self._item)))
+                    except ValueError:
+                        pass
+                elif self._depth < self._array:
+                    self._closed = True  # the array ended; nothing more to extract
+            elif ch == ",":
+                self._last_string = None
+        return done
@@ -0,0 +1,244 @@
+"""Cross-session model leaderboard: Bradley-Terry ratings with bootstrap confidence intervals.
+
+Verdicts are folded into pairwise count matrices as they arrive (wins[i, j] = times model
+i outscored model j; ties[i, j] symmetric), so a fit costs O(models²) no matter how many
+comparisons are behind it — 1M verdicts and 50 models is a 50×50 problem.
+
+The point estimate is the Bradley-Terry MLE (Hunter's MM iteration). Confidence intervals
+come from a Poisson bootstrap — each pair's outcome counts redrawn as Poisson(count), the
+large-N equivalent of resampling comparisons with replacement — with every resample
+refit in the same array ops. The resampled counts are kept between fits and only topped
+up with the outcomes added since, so a refit after one more verdict draws almost nothing.
+Ratings are on the Elo scale (400 points = 10:1 odds), centred on 1000.
+"""
+import math
+import threading
+import time
+from typing import Any
+
+import numpy as np
+
+_ELO = 400 / math.log(10)
+_PRIOR = 0.5  # pseudo-tie per compared pair: keeps an unbeaten model's rating finite
+
+
+class PairCounts:
+    def __init__(self) -> None:
+        self.models: list[str] = []
+        self._index: dict[str, int] = {}
+        self.wins = np.zeros((0, 0), dtype=np.int64)
+        self.ties = np.zeros((0, 0), dtype=np.int64)
+        self.version = 0  # bumped on every change; fits are cached against it
+        self._lock = threading.Lock()
+        self._draws: tuple | None = None  # bootstrap resamples of the last fit (resampled)
+        self._draws_lock = threading.Lock()
+
+    def _slot(self, model: str) -> int:
+        i = self._index.get(model)
+        if i is None:
+            i = self._index[model] = len(self.models)
+            self.models.append(model)
+            if i >= len(self.wins):  # grow geometrically, copy once per doubling
+                cap = max(8, 2 * len(self.wins))
+                for name in ("wins", "ties"):
+                    old = getattr(self, name)
+                    grown = np.zeros((cap, cap), dtype=np.int64)
+                    grown[: len(old), : len(old)] = old
+                    setattr(self, name, grown)
+        return i
+
+    def add(self, a: str, b: str, wins: int = 0, losses: int = 0, ties: int = 0) -> None:
+        """Fold in outcomes of `a` vs `b` (wins/losses from a's side)."""
+        if a == b:
+            return
+        with self._lock:
+            i, j = self._slot(a), self._slot(b)
+            self.wins[i, j] += wins
+            self.wins[j, i] += losses
+            self.ties[i, j] += ties
+            self.ties[j, i] += ties
+            self.version += 1
+
+    def add_scores(self, scores: dict[str, float]) -> None:
+        """One judged turn: every pair of distinct models is a comparison by score."""
+        items = list(scores.items())
+        for k, (ma, sa) in enumerate(items):
+            for mb, sb in items[k + 1:]:
+                self.add(ma, mb, wins=int(sa > sb), losses=int(sa < sb), ties=int(sa == sb))
+
+    def load(self, rows: list[tuple[str, str, int, int, int]]) -> None:
+        """Seed from stored history: (model_a, model_b, a_wins, a_losses, ties) rows."""
+        for a, b, w, lost, t in rows:
+            self.add(a, b, wins=w, losses=lost, ties=t)
+
+    def snapshot(self) -> tuple[list[str], np.ndarray, np.ndarray, int]:
+        with self._lock:
+            n = len(self.models)
+            return (list(self.models), self.wins[:n, :n].copy(), self.ties[:n, :n].copy(),
+                    self.version)
+
+    def resampled(self, wins: np.ndarray, ties: np.ndarray, resamples: int,
+                  seed: int) -> tuple[np.ndarray, np.ndarray]:
+        """(resamples, n, n) Poisson redraws of `wins` and `ties` (a `snapshot()`).
+
+        Counts only grow and Poisson(a + b) = Poisson(a) + Poisson(b), so the last fit's
+        resamples topped up with Poisson(new - old) are exactly as good as fresh ones: a
+        refit after one more verdict draws a few values per resample, not one per pair.
+        The arrays returned are kept for the next call — read them, don't write them.
+        """
+        n = len(wins)
+        with self._draws_lock:
+            last = self._draws
+            if last is None or last[0] != (resamples, seed) or len(last[2]) > n:
+                empty = np.zeros((resamples, 0, 0), dtype=np.int32)
+                last = ((resamples, seed), np.random.default_rng(seed),
+                        np.zeros((0, 0), dtype=np.int64), np.zeros((0, 0), dtype=np.int64),
+                        empty, empty)
+            key, rng, old_wins, old_ties, rw, rt = last
+            m = len(old_wins)
+            # New arrays, never in place: a fit in another thread may still be reading
+            # these. Models added since the last fit get rows and columns of zeros.
+            rw, rt = (np.pad(a, ((0, 0), (0, n - m), (0, n - m))) for a in (rw, rt))
+            new_wins = wins.copy()
+            new_wins[:m, :m] -= old_wins
+            new_ties = np.triu(ties, 1)  # ties are symmetric: draw each pair once
+            new_ties[:m, :m] -= np.triu(old_ties, 1)
+            for delta, boot in ((new_wins, rw), (new_ties, rt)):
+                idx = np.flatnonzero(delta)
+                if not len(idx):
+                    continue
+                drawn = rng.poisson(delta.ravel()[idx], size=(resamples, len(idx)))
+                flat = boot.reshape(resamples, n * n)  # a view: writes land in `boot`
+                flat[:, idx] += drawn
+                if boot is rt:
+                    row, col = np.divmod(idx, n)
+                    flat[:, col * n + row] += drawn
+            self._draws = (key, rng, wins, ties, rw, rt)
+        return rw, rt
+
+
+def verdict_scores(scores: list[dict]) -> dict[str, float]:
+    """What the board counts of one verdict's score rows ({label, model, score}): a model
+    entered under several labels counts once, with its last label's score. Replays of
+    stored verdicts (store.pair_outcomes) follow the same rule."""
+    return {s["model"]: s["score"] for s in sorted(scores, key=lambda s: s["label"])
+            if s.get("model")}
+
+
+def fit(w: np.ndarray, tol: float = 1e-8, max_iter: int = 1000) -> np.ndarray:
+    """Bradley-Terry strengths (log scale, mean 0) from an n×n win matrix.
+
+    `w[i, j]` counts i beating j, ties already split as half a win each way. Every model
+    must have played at least one game.
+    """
+    games = w + w.T
+    won = w.sum(1)
+    p = np.ones(len(w))
+    for _ in range(max_iter):
+        nxt = won / (games / (p[:, None] + p[None, :])).sum(1)
+        nxt /= np.exp(np.log(nxt).mean())
+        done = np.abs(np.log(nxt) - np.log(p)).max() < tol
+        p = nxt
+        if done:
+            break
+    return np.log(p)
+
+
+def _bootstrap(theta: np.ndarray, wins: np.ndarray, ties: np.ndarray, boot_wins: np.ndarray,
+               boot_ties: np.ndarray, steps: int = 2) -> np.ndarray:
+    """(resamples, n) strengths for resampled counts (`PairCounts.resampled`), all at once.
+
+    Works on the list of compared pairs rather than n×n: each resample takes a few
+    Newton steps from `theta` with the full-data Hessian (a resample sits close to the
+    original fit, so the Hessian barely moves). The per-model score is one
+    (resamples × pairs) @ (pairs × n) product.
+    """
+    n = len(theta)
+    i, j = np.triu_indices(n, 1)
+    keep = (wins[i, j] + wins[j, i] + ties[i, j]) > 0
+    i, j = i[keep], j[keep]
+    prior = 0.5 * _PRIOR
+    wij = boot_wins[:, i, j] + prior
+    wji = boot_wins[:, j, i] + prior
+    tij = boot_ties[:, i, j].astype(float)
+    games = wij + wji + tij
+    scored = wij + 0.5 * tij  # i's share, ties as half a win
+    incidence = np.zeros((len(i), n))
+    incidence[np.arange(len(i)), i] = 1.0
+    incidence[np.arange(len(i)), j] = -1.0
+    # Fisher information of the full-data fit: a weighted graph Laplacian. Its null space
+    # is the common offset, which the pseudo-inverse drops (ratings stay mean-centred).
+    s = 1 / (1 + np.exp(theta[j] - theta[i]))
+    full = wins[i, j] + wins[j, i] + ties[i, j] + 2 * prior
+    info = incidence.T @ ((full * s * (1 - s))[:, None] * incidence)
+    step = np.linalg.pinv(info)
+    # Every resample starts at theta, so the first step's win chances are `s` for all.
+    boot = theta + ((scored - games * s) @ incidence) @ step
+    for _ in range(steps - 1):
+        d = boot[:, i] - boot[:, j]
+        grad = (scored - games / (1 + np.exp(-d))) @ incidence
+        boot += grad @ step
+    return boot
+
+
+def ratings(counts: PairCounts, bootstrap: int = 200, ci: float = 0.95,
+            seed: int = 0) -> dict[str, Any]:
+    """Leaderboard rows (best first) with `ci`-level percentile bootstrap intervals."""
+    t0 = time.perf_counter()
+    models, wins, ties, version = counts.snapshot()
+    n = len(models)
+    if n == 0:
+        return {"models": [], "comparisons": 0, "bootstrap": 0, "version": version,
+                "elapsed_ms": 0.0}
+    played = (wins + wins.T + ties) > 0
+    theta = fit(wins + 0.5 * ties + 0.5 * _PRIOR * played)
+    lo = hi = None
+    if bootstrap and n > 1:
+        boot = _bootstrap(theta, wins, ties, *counts.resampled(wins, ties, bootstrap, seed))
+        alpha = (1 - ci) / 2
+        lo, hi = np.quantile(boot, [alpha, 1 - alpha], axis=0)
+    order = np.argsort(-theta, kind="stable")
+    won, lost, tied = wins.sum(1), wins.sum(0), ties.sum(1)
+    rows = []
+    for rank, k in enumerate(order, start=1):
+        row = {
+            "rank": rank,
+            "model": models[k],
+            "rating": round(1000 + _ELO * float(theta[k]), 1),
+            "wins": int(won[k]),
+            "losses": int(lost[k]),
+            "ties": int(tied[k]),
+            "matches": int(won[k] + lost[k] + tied[k]),
+        }
+        if lo is not None:
+            row["ci_low"] = round(1000 + _ELO * float(lo[k]), 1)
+            row["ci_high"] = round(1000 + _ELO * float(hi[k]), 1)
+        rows.append(row)
+    return {
+        "models": rows,
+        "comparisons": int(wins.sum() + ties.sum() // 2),
+        "bootstrap": bootstrap if lo is not None else 0,
+        "version": version,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+
+def rank_stability(counts: PairCounts, k: int, resamples: int = 200,
+                   seed: int = 0) -> dict[str, Any]:
+    """How settled the top-`k` order is: the share of bootstrap resamples reproducing it
+    exactly, and for each adjacent pair down to rank k+1 the share that flips it."""
+    models, wins, ties, _ = counts.snapshot()
+    n = len(models)
+    played = (wins + wins.T + ties) > 0
+    theta = fit(wins + 0.5 * ties + 0.5 * _PRIOR * played)
+    order = np.argsort(-theta, kind="stable")
+    k = min(k, n)
+    boot = _bootstrap(theta, wins, ties, *counts.resampled(wins, ties, resamples, seed))
+    top = np.argsort(-boot, axis=1, kind="stable")[:, :k]
+    stability = float((top == order[:k]).all(axis=1).mean())
+    flips = [float((boot[:, order[r]] <= boot[:, order[r + 1]]).mean())
+             for r in range(min(k, n - 1))]
+    return {"order": [models[m] for m in order], "stability": stability, "flips": flips}
+
+
+board = PairCounts()
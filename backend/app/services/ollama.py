@@ -2,15 +2,81 @@
 
 Uses the async ollama client — no subprocess, no thread-per-model, no double generation.
 """
-from collections.abc import AsyncIterator
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import nullcontext
+from pathlib import Path
 from typing import Any
 
+import httpx
 from ollama import AsyncClient
 
 from app.config import settings
 from app.schemas import Message, ModelInstance
+from app.services import telemetry, tracing
+from app.services.admission import Priority, admission
+from app.services.cache import DiskCache, content_key
+from app.services.hosts import Host, HostPool, parse_hosts, should_fail_over
+from app.services.singleflight import StreamFlight
 
-_client = AsyncClient(host=settings.ollama_host)
+
+# Request -> response-headers time for every Ollama call, as an `ollama.connect` span.
+async def _on_request(request: httpx.Request) -> None:
+    request.extensions["arena_t0"] = time.perf_counter()
+
+
+async def _on_response(response: httpx.Response) -> None:
+    if (t0 := response.request.extensions.get("arena_t0")) is not None:
+        tracing.record("ollama.connect", t0, time.perf_counter(),
+                       path=response.request.url.path)
+
+
+def _new_client(host: str) -> AsyncClient:
+    return AsyncClient(host=host, event_hooks={"request": [_on_request], "response": [_on_response]})
+
+
+pool = HostPool(parse_hosts(settings.ollama_host), _new_client)
+_client = pool.hosts[0].client  # the only host, unless ARENA_OLLAMA_HOST lists several
+
+
+def _route(model: str) -> list[Host | None]:
+    """Hosts to try for `model`, best first; [None] means "just use `_client`"."""
+    return pool.candidates(model) if pool.multi else [None]
+
+
+def _using(host: Host | None, model: str):
+    return pool.use(host, model) if host is not None else nullcontext()
+
+
+async def _on_host(model: str, call: Callable[[Any], Awaitable[Any]]) -> Any:
+    """`call(client)` on the best host for `model`, failing over while hosts remain."""
+    hosts = _route(model)
+    for n, host in enumerate(hosts):
+        try:
+            with _using(host, model):
+                return await call(host.client if host else _client)
+        except Exception as e:
+            if host is None or n == len(hosts) - 1 or not should_fail_over(e):
+                raise
+            pool.mark_down(host, e)
+
+
+async def _each_host(call: Callable[[Any], Awaitable[Any]]) -> list[Any]:
+    """`call(client)` on every host at once; results (or exceptions) in host order."""
+    if not pool.multi:
+        return [await call(_client)]
+    return await asyncio.gather(*(call(h.client) for h in pool.hosts), return_exceptions=True)
+
+# Deterministic generations (fixed seed) are replayed from disk when ARENA_RESPONSE_CACHE
+# is on. Keys include the model *digest*, so re-pulling a tag never serves stale output.
+_responses = DiskCache(
+    Path(settings.cache_dir) / "responses.sqlite3", settings.response_cache_max_mb * 2**20
+)
+_digests: dict[str, str] = {}
+# Identical deterministic generations in flight at once share one upstream stream.
+_flights = StreamFlight()
+_digests_at = 0.0
 
 
 def build_options(inst: ModelInstance) -> dict[str, Any]:
@@ -31,6 +97,13 @@ def build_options(inst: ModelInstance) -> dict[str, Any]:
     return opts
 
 
+def keep_alive_value(value: str | None) -> float | str | None:
+    """Ollama reads a unitless keep_alive *string* as an invalid duration — send a number."""
+    if value is None or value[-1].isalpha():
+        return value
+    return float(value)
+
+
 def _as_messages(system: str, history: list[Message], message: str) -> list[dict[str, str]]:
     msgs = [m.model_dump() for m in history]
     if not msgs or msgs[0].get("role") != "system":
@@ -38,15 +111,29 @@ def _as_messages(system: str, history: list[Message], message: str) -> list[dict
     if message:
         if not (msgs and msgs[-1]["role"] == "user" and msgs[-1]["content"] == message):
             msgs.append({"role": "user", "content": message})
-    if len(msgs) > settings.history_limit:
+    # Token mode trims per instance instead (services/history.py).
+    if settings.history_mode == "messages" and len(msgs) > settings.history_limit:
         msgs = [msgs[0], *msgs[-(settings.history_limit - 1):]]
     return msgs
 
 
+async def _catalog() -> list[tuple[Any, list[str]]]:
+    """(`tags` entry, host URLs that have it) for every pulled model, across hosts."""
+    if not pool.multi:
+        return [(m, []) for m in (await _client.list()).models]
+    await pool.refresh()
+    if not any(h.healthy for h in pool.hosts):
+        raise ConnectionError("; ".join(f"{h.url}: {h.error}" for h in pool.hosts))
+    merged: dict[str, tuple[Any, list[str]]] = {}
+    for h in pool.hosts:
+        for name, m in h.pulled.items():
+            merged.setdefault(name, (m, []))[1].append(h.url)
+    return list(merged.values())
+
+
 async def list_models() -> list[dict[str, Any]]:
-    resp = await _client.list()
     out: list[dict[str, Any]] = []
-    for m in resp.models:
+    for m, hosts in await _catalog():
         details = getattr(m, "details", None)
         out.append(
             {
@@ -56,29 +143,143 @@ async def list_models() -> list[dict[str, Any]]:
                 "params": getattr(details, "parameter_size", None) if details else None,
             }
         )
+        if pool.multi:
+            out[-1]["hosts"] = hosts
     return out
 
 
+def _deterministic(inst: ModelInstance) -> bool:
+    if inst.seed:  # None / 0 = random
+        return True
+    return (
+        inst.temperature is not None
+        and inst.temperature <= settings.response_cache_max_temperature
+    )
+
+
+async def _digest(model: str) -> str | None:
+    global _digests_at
+    if model not in _digests or time.monotonic() - _digests_at > 60:
+        _digests.clear()
+        _digests.update({m.model: m.digest for m, _ in await _catalog() if m.digest})
+        _digests_at = time.monotonic()
+    return _digests.get(model)
+
+
+async def _cache_key(
+    inst: ModelInstance, opts: dict[str, Any], messages: list[dict[str, str]]
+) -> str | None:
+    """Content address for a cacheable generation, or None when it must run live."""
+    if not settings.response_cache or not _deterministic(inst):
+        return None
+    try:
+        digest = await _digest(inst.model)
+    except Exception:  # noqa: BLE001 — no digest, no cache; the live call reports errors
+        return None
+    return content_key(inst.model, digest, opts, messages) if digest else None
+
+
+# Timing fields Ollama reports on the final chunk (durations in ns).
+_STATS = ("eval_count", "eval_duration", "load_duration", "prompt_eval_count",
+          "prompt_eval_duration", "total_duration")
+
+
+def _chunk(token: str, done: bool = False, **stats: Any) -> dict[str, Any]:
+    return {
+        "token": token,
+        "done": done,
+        **{k: stats.get(k) for k in _STATS},
+        "queue_wait_s": stats.get("queue_wait_s", 0.0),
+        "cached": stats.get("cached", False),
+        "shared": False,
+    }
+
+
 async def chat_stream(
-    inst: ModelInstance, messages: list[dict[str, str]]
+    inst: ModelInstance, messages: list[dict[str, str]], priority: Priority = "interactive"
 ) -> AsyncIterator[dict[str, Any]]:
-    """Yield {token, done, eval_count, eval_duration}. ONE generation per model."""
+    """Yield {token, done, <Ollama timings>, queue_wait_s, cached}. ONE generation per model.
+
+    The final chunk carries Ollama's load / prefill (prompt_eval) / decode (eval) / total
+    timings. Cache hits replay the stored tokens at full speed without touching Ollama;
+    misses hold an admission slot for the model for the whole stream. A deterministic
+    generation identical to one already in flight joins it instead of running again
+    (its final chunk says `shared`).
+    """
     opts = build_options(inst)
-    stream = await _client.chat(
-        model=inst.model, messages=messages, stream=True, options=opts or None
-    )
-    async for chunk in stream:
-        content = chunk.message.content if chunk.message else ""
-        yield {
-            "token": content or "",
-            "done": bool(chunk.done),
-            "eval_count": getattr(chunk, "eval_count", None),
-            "eval_duration": getattr(chunk, "eval_duration", None),
-        }
+    key = await _cache_key(inst, opts, messages)
+    if key and (hit := await asyncio.to_thread(_responses.get, key)) is not None:
+        for token in hit["tokens"]:
+            yield _chunk(token)
+        yield _chunk("", True, **hit["stats"], cached=True)
+        return
+    if not (settings.coalesce_generations and _deterministic(inst)):
+        async for chunk in _live(inst, opts, messages, key, priority):
+            yield chunk
+        return
+
+    flight = content_key(inst.model, opts, messages)
+    joined = _flights.inflight(flight)
+    async for chunk in _flights.stream(
+        flight, lambda: _live(inst, opts, messages, key, priority)
+    ):
+        if joined and chunk["done"]:
+            chunk = {**chunk, "shared": True}
+            telemetry.coalesced.inc(inst.model)
+            telemetry.coalesced_tokens.inc(inst.model, amount=chunk["eval_count"] or 0)
+        yield chunk
+
+
+async def _live(
+    inst: ModelInstance, opts: dict[str, Any], messages: list[dict[str, str]],
+    key: str | None, priority: Priority,
+) -> AsyncIterator[dict[str, Any]]:
+    """One generation on Ollama (under an admission slot), storing it when `key` is set."""
+    tokens: list[str] = []
+    async with admission.slot(inst.model, priority) as waited:
+        sent = time.perf_counter()
+        tracing.record("queue_wait", sent - waited, sent, model=inst.model, instance=inst.id)
+        first = None
+        hosts = _route(inst.model)
+        for n, host in enumerate(hosts):
+            try:
+                with _using(host, inst.model):
+                    stream = await (host.client if host else _client).chat(
+                        model=inst.model, messages=messages, stream=True,
+                        options=opts or None, keep_alive=keep_alive_value(inst.keep_alive),
+                    )
+                    async for chunk in stream:
+                        if first is None:
+                            first = time.perf_counter()
+                            tracing.record("ollama.first_chunk", sent, first, model=inst.model,
+                                           instance=inst.id)
+                        if chunk.done:
+                            tracing.record("ollama.last_chunk", first, time.perf_counter(),
+                                           model=inst.model, instance=inst.id)
+                        content = (chunk.message.content if chunk.message else "") or ""
+                        stats = {k: getattr(chunk, k, None) for k in _STATS}
+                        if key:
+                            if content:
+                                tokens.append(content)
+                            if chunk.done:
+                                entry = {"tokens": tokens, "stats": stats}
+                                await asyncio.to_thread(_responses.put, key, entry)
+                        yield _chunk(content, bool(chunk.done), **stats, queue_wait_s=waited)
+                return
+            except Exception as e:
+                # Fail over only before the first chunk: a half-streamed answer can't move.
+                if first is not None or host is None or n == len(hosts) - 1 \
+                        or not should_fail_over(e):
+                    raise
+                pool.mark_down(host, e)
 
 
 async def chat_json(
-    model: str, messages: list[dict[str, str]], schema: dict[str, Any] | None = None
+    model: str,
+    messages: list[dict[str, str]],
+    schema: dict[str, Any] | None = None,
+    priority: Priority = "judge",
+    seed: int | None = None,
 ) -> str:
     """Non-streaming chat with structured output.
 
@@ -87,21 +288,97 @@ async def chat_json(
     JSON mode otherwise.
     """
     fmt: Any = schema if schema is not None else "json"
-    resp = await _client.chat(model=model, messages=messages, format=fmt, stream=False)
+    extra: dict[str, Any] = {"options": {"seed": seed}} if seed is not None else {}
+    async with admission.slot(model, priority) as waited:
+        now = time.perf_counter()
+        tracing.record("queue_wait", now - waited, now, model=model)
+        resp = await _on_host(model, lambda c: c.chat(
+            model=model, messages=messages, format=fmt, stream=False, **extra))
     return (resp.message.content if resp.message else "") or "{}"
 
 
+async def chat_json_stream(
+    model: str,
+    messages: list[dict[str, str]],
+    schema: dict[str, Any] | None = None,
+    priority: Priority = "judge",
+    seed: int | None = None,
+) -> AsyncIterator[str]:
+    """`chat_json`, streamed: the JSON text in pieces as the model writes it."""
+    fmt: Any = schema if schema is not None else "json"
+    extra: dict[str, Any] = {"options": {"seed": seed}} if seed is not None else {}
+    async with admission.slot(model, priority) as waited:
+        now = time.perf_counter()
+        tracing.record("queue_wait", now - waited, now, model=model)
+        hosts = _route(model)
+        for n, host in enumerate(hosts):
+            started = False
+            try:
+                with _using(host, model):
+                    stream = await (host.client if host else _client).chat(
+                        model=model, messages=messages, format=fmt, stream=True, **extra)
+                    async for chunk in stream:
+                        if content := (chunk.message.content if chunk.message else ""):
+                            started = True
+                            yield content
+                return
+            except Exception as e:
+                if started or host is None or n == len(hosts) - 1 or not should_fail_over(e):
+                    raise
+                pool.mark_down(host, e)
+
+
+async def warm(model: str, keep_alive: str | None = None) -> dict[str, Any]:
+    """Load `model` with a zero-token generation (empty prompt) and keep it resident."""
+    resp = await _on_host(model, lambda c: c.generate(
+        model=model, prompt="", keep_alive=keep_alive_value(keep_alive)))
+    return {"model": model, "load_s": round((resp.load_duration or 0) / 1e9, 3)}
+
+
+def _first_error(results: list[Any]) -> None:
+    """Raise if every host failed (a model missing on some hosts is normal)."""
+    if results and all(isinstance(r, Exception) for r in results):
+        raise results[0]
+
+
+async def unload(model: str) -> None:
+    _first_error(await _each_host(lambda c: c.generate(model=model, prompt="", keep_alive=0)))
+    for h in pool.hosts:
+        h.resident.discard(model)
+
+
+async def loaded() -> list[dict[str, Any]]:
+    """Models resident in Ollama right now (`ollama ps`), on every host."""
+    results = await _each_host(lambda c: c.ps())
+    _first_error(results)
+    out = []
+    for host, resp in zip(pool.hosts, results, strict=False):
+        if isinstance(resp, Exception):
+            continue
+        for m in resp.models:
+            out.append({
+                "name": m.model,
+                "size": m.size,
+                "size_vram": m.size_vram,
+                "expires_at": m.expires_at.isoformat() if m.expires_at else None,
+            })
+            if pool.multi:
+                out[-1]["host"] = host.url
+    return out
+
+
 async def pull(name: str) -> None:
-    await _client.pull(name)
+    """Pull onto every host, so any of them can serve the model."""
+    _first_error(await _each_host(lambda c: c.pull(name)))
 
 
 async def delete(name: str) -> None:
-    await _client.delete(name)
+    _first_error(await _each_host(lambda c: c.delete(name)))
 
 
 async def reachable() -> bool:
     try:
-        await _client.list()
+        _first_error(await _each_host(lambda c: c.list()))
         return True
     except Exception:
         return False
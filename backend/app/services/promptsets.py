@@ -0,0 +1,111 @@
+"""Prompt sets: large prompt files uploaded once, deduplicated, and run by reference.
+
+An upload is spooled to disk as it arrives, then read back one row at a time — the
+whole file is never held in memory — with the same rules as the browser's parser:
+`.jsonl` rows are a string or an object's `prompt` / `question` / `input`, `.csv` rows
+take the `prompt` column (or the first), `.txt` is one prompt per non-blank line.
+Repeated prompts are dropped by content hash. The set's id is a hash of its prompts, so
+every server process that ingests the same file gets the same id — which is what lets
+a run be split across processes by prompt-hash range (`shard`).
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Literal
+
+from app.config import settings
+from app.services.store import prompt_hash
+
+Format = Literal["jsonl", "csv", "txt"]
+
+_ID = re.compile(r"^[0-9a-f]{16}$")
+_FIELDS = ("prompt", "question", "input")
+
+
+def directory() -> Path:
+    return Path(settings.benchmark_dir) / "prompt-sets"
+
+
+def _rows(path: Path, fmt: Format) -> Iterator[str]:
+    with open(path, encoding="utf-8", errors="replace", newline="") as f:
+        if fmt == "csv":
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            names = [h.strip().lower() for h in header]
+            col = next((names.index(n) for n in _FIELDS if n in names), None)
+            if col is None:  # no header row: the first line is a prompt too
+                col = 0
+                yield header[0] if header else ""
+            for row in reader:
+                yield row[col] if len(row) > col else ""
+            return
+        for line in f:
+            line = line.strip()
+            if fmt == "txt" or not line:
+                yield line
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield ""
+                continue
+            if isinstance(row, dict):
+                row = next((row[k] for k in _FIELDS if row.get(k)), "")
+            yield row if isinstance(row, str) else ""
+
+
+def ingest(upload: Path, fmt: Format) -> dict:
+    """Parse `upload` row by row into a deduplicated prompt set (the upload is removed).
+
+    Raises ValueError when no row holds a prompt.
+    """
+    out = directory()
+    out.mkdir(parents=True, exist_ok=True)
+    seen: set[str] = set()
+    ids = hashlib.sha256()
+    rows = duplicates = empty = 0
+    part = out / f".{upload.name}.part"
+    try:
+        with open(part, "w", encoding="utf-8") as f:
+            for prompt in _rows(upload, fmt):
+                rows += 1
+                prompt = prompt.strip()
+                if not prompt:
+                    empty += 1
+                    continue
+                h = prompt_hash(prompt)
+                if h in seen:
+                    duplicates += 1
+                    continue
+                seen.add(h)
+                ids.update(h.encode())
+                f.write(json.dumps({"prompt": prompt}, ensure_ascii=False) + "\n")
+        if not seen:
+            raise ValueError("no prompts found in the upload")
+        set_id = ids.hexdigest()[:16]
+        os.replace(part, out / f"{set_id}.jsonl")
+    finally:
+        part.unlink(missing_ok=True)
+        upload.unlink(missing_ok=True)
+    return {"id": set_id, "prompts": len(seen), "rows": rows, "duplicates": duplicates,
+            "empty": empty}
+
+
+def load(set_id: str) -> list[str] | None:
+    """The prompts of a set, in upload order (None if there is no such set)."""
+    path = directory() / f"{set_id}.jsonl"
+    if not _ID.match(set_id) or not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["prompt"] for line in f]
+
+
+def shard_of(prompt: str, count: int) -> int:
+    """Which of `count` equal prompt-hash ranges `prompt` falls in."""
+    return int(prompt_hash(prompt)[:8], 16) * count >> 32
@@ -0,0 +1,39 @@
+"""Async token bucket: smooths request rate and can be paused by a server's Retry-After."""
+import asyncio
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate_per_s: float, burst: int):
+        self.rate = rate_per_s
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._t = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()  # waiters are served in arrival order
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._t) * self.rate)
+        self._t = now
+
+    async def acquire(self) -> float:
+        """Take one token, sleeping as needed; returns the seconds waited."""
+        t0 = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return time.monotonic() - t0
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every acquirer for `seconds` (the provider said so) and drop the burst:
+        one request goes out when the pause ends, the rest follow at the steady rate."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 1.0
+        self._t = self._paused_until
@@ -0,0 +1,57 @@
+"""Model-affinity ordering for batch work: drain one model's jobs while it is resident.
+
+A benchmark over more models than fit in VRAM, run prompt by prompt, makes Ollama evict
+and reload models on every prompt — and a load costs far more than the generation. Here
+(prompt, instance) jobs are grouped by model and each of `slots` lanes (≈
+OLLAMA_MAX_LOADED_MODELS) takes one model at a time and runs all of its jobs before
+moving on, so each model loads once. `swaps()` replays both orders through an LRU of
+the same size to report how many loads the grouping avoided.
+"""
+import asyncio
+from collections import Counter, OrderedDict, deque
+from collections.abc import Awaitable, Callable, Iterable
+from typing import TypeVar
+
+Job = TypeVar("Job")
+
+
+def group_by_model(jobs: Iterable[Job], model_of: Callable[[Job], str],
+                   resident: Iterable[str] = ()) -> dict[str, list[Job]]:
+    """Jobs per model, models already resident first, then in order of first appearance."""
+    groups: dict[str, list[Job]] = {}
+    for job in jobs:
+        groups.setdefault(model_of(job), []).append(job)
+    warm = [m for m in resident if m in groups]
+    return {m: groups[m] for m in [*warm, *(m for m in groups if m not in warm)]}
+
+
+async def run(groups: dict[str, list[Job]], work: Callable[[Job], Awaitable[None]],
+              slots: int, per_model: int = 1) -> None:
+    """Drain `groups` with `slots` models in flight, `per_model` jobs at once on each."""
+    models = deque(groups)
+
+    async def drain(queue: deque[Job]) -> None:
+        while queue:
+            await work(queue.popleft())
+
+    async def lane() -> None:
+        while models:
+            queue = deque(groups[models.popleft()])
+            await asyncio.gather(*(drain(queue) for _ in range(per_model)))
+
+    await asyncio.gather(*(lane() for _ in range(max(1, min(slots, len(models))))))
+
+
+def swaps(sequence: Iterable[str], slots: int, resident: Iterable[str] = ()) -> Counter[str]:
+    """Loads per model when `sequence` is served by an LRU of `slots` resident models."""
+    cache: OrderedDict[str, None] = OrderedDict((m, None) for m in list(resident)[-slots:])
+    loads: Counter[str] = Counter()
+    for model in sequence:
+        if model in cache:
+            cache.move_to_end(model)
+            continue
+        loads[model] += 1
+        cache[model] = None
+        if len(cache) > slots:
+            cache.popitem(last=False)
+    return loads
@@ -0,0 +1,110 @@
+"""In-flight call coalescing: concurrent callers with the same key share one execution.
+
+The shared call runs as its own task, so one caller disconnecting (cancellation) doesn't
+cancel the work for everyone else waiting on it. When the last waiter gives up, the call
+itself is cancelled rather than left running for nobody. `StreamFlight` does the same for
+async iterators: every subscriber gets every item, late joiners replay from the start.
+"""
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+from typing import Any
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+        self.shared = 0  # calls served by someone else's in-flight execution
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.shared += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller has gone away
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.items: list[Any] = []
+        self.error: BaseException | None = None
+        self.done = False
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.task: asyncio.Task | None = None
+
+    def _wake(self) -> None:
+        # Wake every subscriber, then hand out a fresh Event for the next item.
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class StreamFlight:
+    def __init__(self) -> None:
+        self._flights: dict[str, _Flight] = {}
+        self.started = 0  # upstream iterations actually run
+        self.joined = 0  # subscribers served by someone else's iteration
+
+    def inflight(self, key: str) -> bool:
+        return key in self._flights
+
+    async def stream(
+        self, key: str, fn: Callable[[], AsyncGenerator[Any, None]]
+    ) -> AsyncIterator[Any]:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.ensure_future(self._pump(key, flight, fn()))
+            self.started += 1
+        else:
+            self.joined += 1
+        flight.subscribers += 1
+        sent = 0
+        try:
+            while True:
+                changed = flight.changed
+                while sent < len(flight.items):
+                    yield flight.items[sent]
+                    sent += 1
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if not flight.subscribers and flight.task and not flight.task.done():
+                flight.task.cancel()
+
+    async def _pump(self, key: str, flight: _Flight, it: AsyncGenerator[Any, None]) -> None:
+        try:
+            async for item in it:
+                flight.items.append(item)
+                flight._wake()
+        except Exception as e:  # noqa: BLE001 — re-raised in every subscriber
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight._wake()
+            await it.aclose()
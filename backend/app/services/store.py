@@ -0,0 +1,355 @@
+"""Server-side result store: turns, per-instance answers + metrics, and judge verdicts.
+
+One SQLite file in WAL mode (readers never block the writer), indexed on model, time and
+prompt hash so history queries stay cheap as months of runs pile up. Like the caches it is
+opt-in (ARENA_RESULT_STORE) and opened lazily. Writes go through `submit`, which runs them
+on a worker thread in the background — a slow disk never delays a token or a verdict.
+
+Pagination is keyset on rowid (newest first): `cursor` is the last row's `seq`, so a page
+costs the same at row 10 as at row 10 million.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from app.config import settings
+from app.services.cache import content_key
+
+logger = logging.getLogger("arena.store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id TEXT PRIMARY KEY, session_id TEXT, created REAL NOT NULL,
+    prompt_hash TEXT NOT NULL, prompt TEXT NOT NULL, system TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS turns_created ON turns (created);
+CREATE INDEX IF NOT EXISTS turns_prompt ON turns (prompt_hash);
+CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id);
+CREATE TABLE IF NOT EXISTS answers (
+    turn_id TEXT NOT NULL, instance_id TEXT NOT NULL, model TEXT NOT NULL,
+    created REAL NOT NULL, status TEXT NOT NULL, text TEXT NOT NULL, error TEXT,
+    metrics TEXT NOT NULL, PRIMARY KEY (turn_id, instance_id)
+);
+CREATE INDEX IF NOT EXISTS answers_model ON answers (model, created);
+CREATE INDEX IF NOT EXISTS answers_created ON answers (created);
+CREATE TABLE IF NOT EXISTS verdicts (
+    id INTEGER PRIMARY KEY, turn_id TEXT, created REAL NOT NULL, prompt_hash TEXT NOT NULL,
+    provider TEXT NOT NULL, judge_model TEXT NOT NULL, winner TEXT NOT NULL,
+    cached INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS verdicts_created ON verdicts (created);
+CREATE INDEX IF NOT EXISTS verdicts_prompt ON verdicts (prompt_hash);
+CREATE INDEX IF NOT EXISTS verdicts_turn ON verdicts (turn_id);
+CREATE TABLE IF NOT EXISTS scores (
+    verdict_id INTEGER NOT NULL, label TEXT NOT NULL, model TEXT, score REAL NOT NULL,
+    reason TEXT NOT NULL, PRIMARY KEY (verdict_id, label)
+);
+CREATE INDEX IF NOT EXISTS scores_model ON scores (model);
+"""
+
+
+def prompt_hash(prompt: str) -> str:
+    return content_key(prompt)
+
+
+class ResultStore:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")  # WAL keeps this crash-safe
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    # ---- writes ----
+    def put_turn(
+        self, turn_id: str, prompt: str, system: str, session_id: str | None = None
+    ) -> None:
+        """Record a turn once; later requests for the same turn (one per model) are no-ops."""
+        with self._lock:
+            self._conn().execute(
+                "INSERT OR IGNORE INTO turns VALUES (?, ?, ?, ?, ?, ?)",
+                (turn_id, session_id, time.time(), prompt_hash(prompt), prompt, system),
+            )
+
+    def put_answer(
+        self, turn_id: str, instance_id: str, model: str, status: str, text: str,
+        error: str | None, metrics: dict,
+    ) -> None:
+        """Record one model's answer; a regenerate replaces the earlier one."""
+        with self._lock:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (turn_id, instance_id, model, time.time(), status, text, error,
+                 json.dumps(metrics, separators=(",", ":"))),
+            )
+
+    def put_verdict(
+        self, turn_id: str | None, prompt: str, provider: str, judge_model: str,
+        winner: str, cached: bool, scores: list[dict],
+    ) -> int:
+        """Record a verdict; each score row is {label, model (if known), score, reason}."""
+        with self._lock:
+            db = self._conn()
+            db.execute("BEGIN")
+            try:
+                cur = db.execute(
+                    "INSERT INTO verdicts (turn_id, created, prompt_hash, provider, judge_model,"
+                    " winner, cached) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (turn_id, time.time(), prompt_hash(prompt), provider, judge_model, winner,
+                     int(cached)),
+                )
+                vid = cur.lastrowid
+                db.executemany(
+                    "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)",
+                    [(vid, s["label"], s.get("model"), s["score"], s.get("reason", ""))
+                     for s in scores],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return vid
+
+    def pair_outcomes(self) -> list[tuple[str, str, int, int, int]]:
+        """Per model pair: (a, b, a_wins, a_losses, ties) over every fresh (uncached)
+        verdict with known models — seeds the leaderboard at startup.
+
+        Counted as the live board counts (leaderboard.verdict_scores): one score per
+        model per verdict, its highest label's — SQLite takes the bare `score` column
+        from the row MAX(label) picks.
+        """
+        with self._lock:
+            return self._conn().execute(
+                "WITH s AS (SELECT verdict_id, model, score, MAX(label) FROM scores"
+                " WHERE model IS NOT NULL GROUP BY verdict_id, model)"
+                " SELECT a.model, b.model, SUM(a.score > b.score), SUM(a.score < b.score),"
+                " SUM(a.score = b.score) FROM s a"
+                " JOIN s b ON b.verdict_id = a.verdict_id AND a.model < b.model"
+                " JOIN verdicts v ON v.id = a.verdict_id"
+                " WHERE v.cached = 0 GROUP BY a.model, b.model"
+            ).fetchall()
+
+    # ---- queries (newest first, keyset-paginated) ----
+    def _page(self, sql: str, where: list[str], args: list[Any], cursor: int | None,
+              limit: int, row: Callable[[sqlite3.Row], dict]) -> dict:
+        if cursor is not None:
+            where.append("t.rowid < ?")
+            args.append(cursor)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            db = self._conn()
+            db.row_factory = sqlite3.Row
+            try:
+                rows = db.execute(
+                    f"{sql}{clause} ORDER BY t.rowid DESC LIMIT ?", (*args, limit + 1)
+                ).fetchall()
+            finally:
+                db.row_factory = None
+        items = [row(r) for r in rows[:limit]]
+        return {"items": items,
+                "next_cursor": rows[limit - 1]["seq"] if len(rows) > limit else None}
+
+    @staticmethod
+    def _window(where: list[str], args: list[Any], since: float | None,
+                until: float | None) -> None:
+        if since is not None:
+            where.append("t.created >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("t.created < ?")
+            args.append(until)
+
+    def turns(self, *, model: str | None = None, session_id: str | None = None,
+              prompt_hash: str | None = None, since: float | None = None,
+              until: float | None = None, cursor: int | None = None,
+              limit: int = 50) -> dict:
+        where: list[str] = []
+        args: list[Any] = []
+        if model is not None:
+            where.append("t.id IN (SELECT turn_id FROM answers WHERE model = ?)")
+            args.append(model)
+        if session_id is not None:
+            where.append("t.session_id = ?")
+            args.append(session_id)
+        if prompt_hash is not None:
+            where.append("t.prompt_hash = ?")
+            args.append(prompt_hash)
+        self._window(where, args, since, until)
+        page = self._page("SELECT t.rowid AS seq, t.* FROM turns t", where, args, cursor,
+                          limit, dict)
+        ids = [t["id"] for t in page["items"]]
+        answers: dict[str, list[dict]] = {i: [] for i in ids}
+        if ids:
+            marks = ",".join("?" * len(ids))
+            with self._lock:
+                rows = self._conn().execute(
+                    "SELECT turn_id, instance_id, model, created, status, text, error, metrics"
+                    f" FROM answers WHERE turn_id IN ({marks}) ORDER BY rowid", ids
+                ).fetchall()
+            for r in rows:
+                answers[r[0]].append(_answer(r))
+        for t in page["items"]:
+            t["answers"] = answers[t["id"]]
+        return page
+
+    def batch_turns(self, *, model: str | None = None, session_id: str | None = None,
+                    since: float | None = None, until: float | None = None,
+                    offset: int = 0, limit: int = 1000) -> list[dict]:
+        """Up to `limit` turns from `offset` on, with their answers, oldest first: a
+        numbering that stays put as new turns arrive, for resumable bulk re-judging."""
+        where: list[str] = []
+        args: list[Any] = []
+        if model is not None:
+            where.append("t.id IN (SELECT turn_id FROM answers WHERE model = ?)")
+            args.append(model)
+        if session_id is not None:
+            where.append("t.session_id = ?")
+            args.append(session_id)
+        self._window(where, args, since, until)
+        sql = "SELECT t.id, t.prompt FROM turns t"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY t.rowid LIMIT ? OFFSET ?"
+        with self._lock:
+            db = self._conn()
+            turns = [{"id": i, "prompt": p, "answers": []} for i, p in
+                     db.execute(sql, [*args, limit, offset]).fetchall()]
+            by_id = {t["id"]: t for t in turns}
+            ids = list(by_id)
+            for k in range(0, len(ids), 500):  # stay under SQLite's bound-parameter limit
+                chunk = ids[k:k + 500]
+                rows = db.execute(
+                    "SELECT turn_id, instance_id, model, created, status, text, error, metrics"
+                    f" FROM answers WHERE turn_id IN ({','.join('?' * len(chunk))})"
+                    " ORDER BY rowid", chunk
+                ).fetchall()
+                for r in rows:
+                    by_id[r[0]]["answers"].append(_answer(r))
+        return turns
+
+    def turn(self, turn_id: str) -> dict | None:
+        with self._lock:
+            db = self._conn()
+            row = db.execute(
+                "SELECT rowid, id, session_id, created, prompt_hash, prompt, system FROM turns"
+                " WHERE id = ?", (turn_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            answers = db.execute(
+                "SELECT turn_id, instance_id, model, created, status, text, error, metrics"
+                " FROM answers WHERE turn_id = ? ORDER BY rowid", (turn_id,)
+            ).fetchall()
+            verdicts = db.execute(
+                "SELECT id FROM verdicts WHERE turn_id = ? ORDER BY id", (turn_id,)
+            ).fetchall()
+        keys = ("seq", "id", "session_id", "created", "prompt_hash", "prompt", "system")
+        return {**dict(zip(keys, row, strict=True)),
+                "answers": [_answer(a) for a in answers],
+                "verdicts": [self._verdict(v[0]) for v in verdicts]}
+
+    def answers(self, *, model: str | None = None, status: str | None = None,
+                since: float | None = None, until: float | None = None,
+                cursor: int | None = None, limit: int = 50) -> dict:
+        where: list[str] = []
+        args: list[Any] = []
+        if model is not None:
+            where.append("t.model = ?")
+            args.append(model)
+        if status is not None:
+            where.append("t.status = ?")
+            args.append(status)
+        self._window(where, args, since, until)
+        return self._page(
+            "SELECT t.rowid AS seq, t.turn_id, t.instance_id, t.model, t.created, t.status,"
+            " t.text, t.error, t.metrics FROM answers t", where, args, cursor, limit,
+            lambda r: {"seq": r["seq"], **_answer(tuple(r)[1:])},
+        )
+
+    def verdicts(self, *, model: str | None = None, judge_model: str | None = None,
+                 turn_id: str | None = None, prompt_hash: str | None = None,
+                 since: float | None = None, until: float | None = None,
+                 cursor: int | None = None, limit: int = 50) -> dict:
+        where: list[str] = []
+        args: list[Any] = []
+        if model is not None:
+            where.append("t.id IN (SELECT verdict_id FROM scores WHERE model = ?)")
+            args.append(model)
+        for col, value in (("judge_model", judge_model), ("turn_id", turn_id),
+                           ("prompt_hash", prompt_hash)):
+            if value is not None:
+                where.append(f"t.{col} = ?")
+                args.append(value)
+        self._window(where, args, since, until)
+        page = self._page("SELECT t.id AS seq FROM verdicts t", where, args, cursor, limit,
+                          lambda r: {"seq": r["seq"]})
+        page["items"] = [self._verdict(v["seq"]) for v in page["items"]]
+        return page
+
+    def _verdict(self, vid: int) -> dict:
+        with self._lock:
+            db = self._conn()
+            v = db.execute(
+                "SELECT id, turn_id, created, prompt_hash, provider, judge_model, winner, cached"
+                " FROM verdicts WHERE id = ?", (vid,)
+            ).fetchone()
+            scores = db.execute(
+                "SELECT label, model, score, reason FROM scores WHERE verdict_id = ?"
+                " ORDER BY label", (vid,)
+            ).fetchall()
+        keys = ("seq", "turn_id", "created", "prompt_hash", "provider", "judge_model",
+                "winner", "cached")
+        out = dict(zip(keys, v, strict=True))
+        out["cached"] = bool(out["cached"])
+        out["scores"] = [dict(zip(("label", "model", "score", "reason"), s, strict=True))
+                         for s in scores]
+        return out
+
+
+def _answer(r: Any) -> dict:
+    turn_id, instance_id, model, created, status, text, error, metrics = r
+    return {"turn_id": turn_id, "instance_id": instance_id, "model": model,
+            "created": created, "status": status, "text": text, "error": error,
+            "metrics": json.loads(metrics)}
+
+
+results = ResultStore(settings.result_store_path)
+_pending: set[asyncio.Future] = set()
+
+
+def submit(fn: Callable[..., Any], *args: Any) -> None:
+    """Run a store write in the background (no-op unless ARENA_RESULT_STORE is on).
+
+    Failures are logged, never raised: losing a history row must not fail a chat.
+    """
+    if not settings.result_store:
+        return
+    fut = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+    _pending.add(fut)
+    fut.add_done_callback(_written)
+
+
+def _written(fut: asyncio.Future) -> None:
+    _pending.discard(fut)
+    if not fut.cancelled() and (e := fut.exception()) is not None:
+        logger.error("result store write failed", exc_info=e)
+
+
+async def flush() -> None:
+    """Wait for queued writes (app shutdown, tests)."""
+    while _pending:
+        await asyncio.gather(*list(_pending), return_exceptions=True)
@@ -0,0 +1,185 @@
+"""In-process counters, gauges and fixed-bucket histograms, rendered as Prometheus text.
+
+No client library and no outside service: `/api/metrics` renders the registry on scrape.
+A histogram observation is a bisect into a fixed bucket list plus two adds, so recording
+on every finished generation costs next to nothing. Everything runs on the event loop
+thread, so there is no locking.
+"""
+import bisect
+import math
+from collections.abc import Callable, Iterable
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(x: float) -> str:
+    if math.isinf(x):
+        return "+Inf" if x > 0 else "-Inf"
+    return repr(float(x)) if x != int(x) else str(int(x))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}",
+                *self.samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Labels = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        for lv, v in sorted(self._values.items()):
+            yield f"{self.name}{_fmt_labels(self.labels, lv)} {_num(v)}"
+
+
+class Gauge(_Metric):
+    """Read at scrape time from `read()`, which returns {label values: value}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], dict[Labels, float]],
+                 labels: Labels = ()):
+        super().__init__(name, help, labels)
+        self.read = read
+
+    def samples(self) -> Iterable[str]:
+        for lv, v in sorted(self.read().items()):
+            yield f"{self.name}{_fmt_labels(self.labels, lv)} {_num(v)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float], labels: Labels = ()):
+        super().__init__(name, help, labels)
+        self.buckets = sorted(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        s = self._series.get(labels)
+        if s is None:
+            s = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        s[0][bisect.bisect_left(self.buckets, value)] += 1
+        s[1] += value
+        s[2] += 1
+
+    def count(self, *labels: str) -> int:
+        s = self._series.get(labels)
+        return s[2] if s else 0
+
+    def samples(self) -> Iterable[str]:
+        for lv, (counts, total, n) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, c in zip([*self.buckets, math.inf], counts, strict=True):
+                cumulative += c
+                le = _fmt_labels(self.labels, lv, f'le="{_num(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_fmt_labels(self.labels, lv)} {_num(total)}"
+            yield f"{self.name}_count{_fmt_labels(self.labels, lv)} {n}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def add(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for m in self._metrics for line in m.render()) + "\n"
+
+
+registry = Registry()
+
+_SECONDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_RATE = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 400)
+
+ttft = registry.add(Histogram(
+    "arena_ttft_seconds", "Time to first token per generation (queue wait excluded).",
+    _SECONDS, ("model",)))
+decode_rate = registry.add(Histogram(
+    "arena_decode_tokens_per_second", "Decode throughput per generation.", _RATE, ("model",)))
+chat_latency = registry.add(Histogram(
+    "arena_chat_latency_seconds", "End-to-end generation time (queue wait excluded).",
+    _SECONDS, ("model",)))
+queue_wait = registry.add(Histogram(
+    "arena_queue_wait_seconds", "Time waiting for an admission slot before Ollama.",
+    _SECONDS, ("model",)))
+model_load = registry.add(Histogram(
+    "arena_model_load_seconds", "Ollama model load time reported per generation.",
+    _SECONDS, ("model",)))
+generations = registry.add(Counter(
+    "arena_generations_total", "Finished generations by outcome.", ("model", "status")))
+ollama_errors = registry.add(Counter(
+    "arena_ollama_errors_total", "Generations that failed with an Ollama error.", ("model",)))
+coalesced = registry.add(Counter(
+    "arena_coalesced_generations_total",
+    "Generations served by joining an identical in-flight one.", ("model",)))
+coalesced_tokens = registry.add(Counter(
+    "arena_coalesced_tokens_total", "Decode tokens those joins did not generate again.",
+    ("model",)))
+prefill_saved = registry.add(Counter(
+    "arena_prefill_tokens_saved_total",
+    "Estimated history tokens not sent under ARENA_HISTORY_MODE=tokens.", ("model",)))
+judge_latency = registry.add(Histogram(
+    "arena_judge_latency_seconds", "Judge call latency (cache hits and shared calls excluded).",
+    _SECONDS, ("provider", "model")))
+judge_failures = registry.add(Counter(
+    "arena_judge_failures_total", "Judge calls that raised.", ("provider", "model")))
+judge_skipped = registry.add(Counter(
+    "arena_judge_calls_skipped_total",
+    "Panel judge calls cancelled once the winner was locked in.", ("provider", "model")))
+
+
+def observe_generation(model: str, status: str, m: dict) -> None:
+    """Fold one finished generation's `/chat` metrics in (cache replays and joins only count)."""
+    generations.inc(model, status)
+    if status == "error":
+        ollama_errors.inc(model)
+    if not m or m.get("cached") or m.get("shared"):
+        return
+    if m.get("queue_wait_s") is not None:
+        queue_wait.observe(m["queue_wait_s"], model)
+    if status != "done":
+        return  # partial runs would skew latency and throughput low
+    if m.get("first_token_s") is not None:
+        ttft.observe(m["first_token_s"], model)
+    if m.get("tokens_per_sec"):
+        decode_rate.observe(m["tokens_per_sec"], model)
+    if m.get("duration_s") is not None:
+        chat_latency.observe(m["duration_s"], model)
+    if m.get("load_s") is not None:
+        model_load.observe(m["load_s"], model)
@@ -0,0 +1,145 @@
+"""Per-request tracing: timed spans for one /chat, /chat/stream or /judge call.
+
+A trace lives in a context variable, so tasks spawned by the request (one per model)
+add their spans to it without any plumbing; code running outside a trace (benchmark
+jobs, warm-ups) pays one ContextVar lookup per span and records nothing. Finished traces
+are kept in memory for `/api/traces/{id}` and, with ARENA_TRACE_FILE set, appended as
+JSON lines to a size-rotated file by a background thread (logging's QueueListener), so
+the event loop never waits on the disk.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from app.config import settings
+
+
+class Trace:
+    def __init__(self, name: str, trace_id: str | None = None, **attrs: Any):
+        self.id = trace_id or uuid.uuid4().hex
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.spans: list[dict[str, Any]] = []
+        self.duration_ms: float | None = None
+
+    def record(self, name: str, start: float, end: float, **attrs: Any) -> None:
+        """Add a span from two perf_counter() readings."""
+        self.spans.append({
+            "name": name,
+            "start_ms": round((start - self.t0) * 1000, 3),
+            "duration_ms": round((end - start) * 1000, 3),
+            **attrs,
+        })
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"id": self.id, "name": self.name, "start": self.started,
+                "duration_ms": self.duration_ms, **self.attrs,
+                "spans": sorted(self.spans, key=lambda s: s["start_ms"])}
+
+
+_current: ContextVar[Trace | None] = ContextVar("arena_trace", default=None)
+_recent: OrderedDict[str, dict[str, Any]] = OrderedDict()
+_exporter: logging.Logger | None = None
+_listener: logging.handlers.QueueListener | None = None
+
+
+def current() -> Trace | None:
+    return _current.get()
+
+
+def use(trace: Trace | None) -> None:
+    """Make `trace` current in this context (e.g. inside a streaming response body)."""
+    _current.set(trace)
+
+
+def start(name: str, trace_id: str | None = None, **attrs: Any) -> Trace | None:
+    """Begin a trace for this request (None when ARENA_TRACING is off)."""
+    if not settings.tracing:
+        return None
+    trace = Trace(name, trace_id, **attrs)
+    _current.set(trace)
+    return trace
+
+
+def finish(trace: Trace | None) -> None:
+    if trace is None or trace.duration_ms is not None:
+        return
+    if _current.get() is trace:
+        _current.set(None)
+    trace.duration_ms = round((time.perf_counter() - trace.t0) * 1000, 3)
+    data = trace.as_dict()
+    _recent[trace.id] = data
+    while len(_recent) > settings.trace_keep:
+        _recent.popitem(last=False)
+    if settings.trace_file:
+        _file_logger().info(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+
+def get(trace_id: str) -> dict[str, Any] | None:
+    return _recent.get(trace_id)
+
+
+def recent() -> list[dict[str, Any]]:
+    return [{"id": t["id"], "name": t["name"], "start": t["start"],
+             "duration_ms": t["duration_ms"]} for t in reversed(_recent.values())]
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.record(name, t, time.perf_counter(), **attrs)
+
+
+def record(name: str, start: float, end: float, **attrs: Any) -> None:
+    """Span from perf_counter() readings taken by the caller (no-op outside a trace)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.record(name, start, end, **attrs)
+
+
+def _file_logger() -> logging.Logger:
+    global _exporter, _listener
+    if _exporter is None:
+        handler = logging.handlers.RotatingFileHandler(
+            settings.trace_file, maxBytes=settings.trace_file_max_mb * 1024 * 1024,
+            backupCount=settings.trace_file_backups, encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        q: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(q, handler)
+        _listener.start()
+        log = logging.getLogger("arena.traces")
+        log.addHandler(logging.handlers.QueueHandler(q))
+        log.setLevel(logging.INFO)
+        log.propagate = False  # traces are data, not log lines
+        _exporter = log
+    return _exporter
+
+
+def close() -> None:
+    """Flush the exporter thread (app shutdown)."""
+    global _exporter, _listener
+    if _listener is not None:
+        _listener.stop()
+        for h in _listener.handlers:
+            h.close()
+    if _exporter is not None:
+        _exporter.handlers.clear()
+    _exporter = _listener = None
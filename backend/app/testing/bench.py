@@ -0,0 +1,105 @@
+"""Microbenchmarks for the backend's per-request CPU work.
+
+Times the pure functions every turn or verdict goes through — history assembly, judge
+prompt building, verdict repair and NDJSON event framing — with no I/O, so numbers are
+stable enough to compare across commits:
+
+    python -m app.testing.bench --out bench.json
+    python -m app.testing.report before.json bench.json
+
+Each case is run `--repeat` times over `--number` calls; the best run is reported (the
+least disturbed by the rest of the machine) next to the median.
+"""
+import argparse
+import copy
+import statistics
+import time
+from collections.abc import Callable
+from typing import Any
+
+from app.routers.judge import _build_user_prompt, _coerce
+from app.schemas import Candidate, JudgeRequest, Message
+from app.services import history, ndjson
+from app.services.ollama import _as_messages
+from app.testing import report
+
+_TEXT = "The quick brown fox jumps over the lazy dog. " * 8  # ~360 chars per message
+
+
+def _history(n: int) -> list[Message]:
+    return [Message(role="user" if i % 2 == 0 else "assistant", content=f"{i} {_TEXT}")
+            for i in range(n)]
+
+
+def _judge_request(n: int, size: int) -> JudgeRequest:
+    body = (_TEXT * (size // len(_TEXT) + 1))[:size]
+    return JudgeRequest(prompt="Explain quicksort.", judge_model="j", candidates=[
+        Candidate(label=chr(65 + i), text=body) for i in range(n)])
+
+
+_MALFORMED = {
+    "verdicts": [[chr(65 + i), 8 - i, "solid answer", "but long"] for i in range(4)]
+    + [{"label": "E", "score": "7.5"}, {"label": "F", "score": None}],
+    "winner": "A",
+}
+
+
+def cases() -> dict[str, tuple[Callable[..., Any], Callable[[], tuple]]]:
+    """name -> (function, make_args); make_args runs outside the timed loop."""
+    short, long = _history(20), _history(2000)
+    long_msgs = [{"role": "system", "content": "Be brief."}, *(m.model_dump() for m in long),
+                 {"role": "user", "content": "next?"}]
+    req_small, req_big = _judge_request(2, 2_000), _judge_request(6, 50_000)
+    token = {"type": "token", "instance_id": "a1b2", "token": " the"}
+    metrics = {"type": "metrics", "instance_id": "a1b2", "metrics": {
+        "first_token_s": 0.231, "duration_s": 4.812, "eval_tokens": 512,
+        "tokens_per_sec": 48.2, "load_s": 0.0, "prompt_eval_tokens": 640,
+        "prefill_tokens_per_sec": 2210.5, "queue_wait_s": 0.0, "cached": False}}
+    return {
+        "as_messages.history_20": (_as_messages, lambda: ("Be brief.", short, "next?")),
+        "as_messages.history_2000": (_as_messages, lambda: ("Be brief.", long, "next?")),
+        # Token-budget trim of a long session; estimates are memoized after the first run.
+        "history_fit.history_2000": (history.fit, lambda: (long_msgs, 4096)),
+        "build_user_prompt.2x2KB": (_build_user_prompt, lambda: (req_small,)),
+        "build_user_prompt.6x50KB": (_build_user_prompt, lambda: (req_big,)),
+        # _coerce repairs in place, so every call gets its own copy
+        "coerce.malformed_6": (_coerce, lambda: (copy.deepcopy(_MALFORMED),)),
+        "ndjson.token_event": (ndjson.line, lambda: (token,)),
+        "ndjson.metrics_event": (ndjson.line, lambda: (metrics,)),
+    }
+
+
+def measure(fn: Callable[..., Any], make_args: Callable[[], tuple], number: int,
+            repeat: int) -> dict[str, float]:
+    runs = []
+    for _ in range(repeat):
+        args = [make_args() for _ in range(number)]
+        t = time.perf_counter()
+        for a in args:
+            fn(*a)
+        runs.append((time.perf_counter() - t) / number)
+    best = min(runs)
+    return {"best_us": round(best * 1e6, 3), "median_us": round(statistics.median(runs) * 1e6, 3),
+            "ops_per_s": round(1 / best) if best else None}
+
+
+def run(number: int = 2000, repeat: int = 5, only: str = "") -> dict[str, dict[str, float]]:
+    return {name: measure(fn, make_args, number, repeat)
+            for name, (fn, make_args) in cases().items() if only in name}
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--number", type=int, default=2000, help="calls per run")
+    p.add_argument("--repeat", type=int, default=5, help="runs per case")
+    p.add_argument("-k", dest="only", default="", help="only cases whose name contains this")
+    p.add_argument("--out", help="write the JSON result here too")
+    args = p.parse_args()
+    results = run(args.number, args.repeat, args.only)
+    config = {"number": args.number, "repeat": args.repeat, "only": args.only,
+              "ndjson": "orjson" if ndjson.orjson is not None else "json"}
+    report.write(report.document("bench", config, results), args.out)
+
+
+if __name__ == "__main__":
+    main()
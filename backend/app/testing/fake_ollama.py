@@ -0,0 +1,374 @@
+"""Deterministic stand-in for an Ollama server, for measuring the arena without a GPU.
+
+Speaks the parts of the Ollama HTTP API the arena uses — /api/chat (streamed or not),
+/api/generate (warm / unload), /api/tags, /api/ps and /api/pull — and models the costs
+that matter for scheduling: a cold load per model, prefill and decode rates, a number
+of parallel slots per model (OLLAMA_NUM_PARALLEL) and a cap on resident models
+(OLLAMA_MAX_LOADED_MODELS) with least-recently-used eviction of idle models. Output is a
+pure function of model, messages and seed, so runs are reproducible.
+
+Run it and point the arena at it:
+
+    python -m app.testing.fake_ollama --port 11435 --decode-tps 40 --max-loaded 2
+    ARENA_OLLAMA_HOST=http://127.0.0.1:11435 arena
+
+or use the `fake_ollama` pytest fixture (tests/conftest.py), which serves it on a free
+port and points the app's Ollama client at it.
+"""
+import argparse
+import asyncio
+import dataclasses
+import hashlib
+import json
+import socket
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_WORDS = ("the", "model", "answer", "is", "a", "local", "token", "stream", "of", "arena",
+          "quick", "test", "and", "so", "on", "with", "fake", "output")
+
+
+@dataclasses.dataclass
+class SimConfig:
+    models: tuple[str, ...] = ("llama3.2:1b", "qwen2.5:0.5b", "gemma3:1b")
+    load_s: float = 1.0  # cold load, per model
+    prefill_tps: float = 2000.0  # prompt tokens / s
+    decode_tps: float = 50.0  # output tokens / s, per request
+    parallel: int = 1  # concurrent requests per loaded model
+    max_loaded: int = 1  # resident models; the least recently used idle one is evicted
+    output_tokens: int = 32  # when the request sets no num_predict
+    pull_s: float = 0.5
+    time_scale: float = 1.0  # multiply every delay (e.g. 0.01 in tests)
+
+
+@dataclasses.dataclass
+class _Resident:
+    ready: asyncio.Event
+    active: int = 0
+    expires_at: datetime | None = None
+
+
+class FakeOllama:
+    def __init__(self, config: SimConfig | None = None):
+        self.config = config or SimConfig()
+        self.pulled: set[str] = set(self.config.models)
+        self.stats = {"requests": 0, "loads": 0, "evictions": 0, "load_s": 0.0}
+        self._loaded: OrderedDict[str, _Resident] = OrderedDict()
+        self._slots: dict[str, asyncio.Semaphore] = {}
+        self._cond: asyncio.Condition | None = None
+        self._loading: set[asyncio.Task] = set()  # loads in flight (kept referenced)
+        self.url = ""
+        self.app = self._build_app()
+
+    # ---- latency model ----
+    async def _sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            await asyncio.sleep(seconds * self.config.time_scale)
+
+    def _evict_idle(self) -> bool:
+        for name, r in self._loaded.items():  # oldest use first
+            if r.active == 0 and r.ready.is_set():
+                del self._loaded[name]
+                self.stats["evictions"] += 1
+                return True
+        return False
+
+    async def _acquire(self, model: str) -> float:
+        """Take a slot on `model`, loading it (and evicting) as needed; returns load secs.
+
+        A request cancelled while queued or loading gives back what it took — the load
+        itself carries on, as Ollama's does when a client hangs up.
+        """
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        slot = self._slots.setdefault(model, asyncio.Semaphore(self.config.parallel))
+        await slot.acquire()
+        counted = False
+        try:
+            async with self._cond:
+                while True:
+                    r = self._loaded.get(model)
+                    if r is not None:
+                        break
+                    if len(self._loaded) < self.config.max_loaded or self._evict_idle():
+                        r = self._loaded[model] = _Resident(asyncio.Event())
+                        self._loading.add(asyncio.create_task(self._load(r)))
+                        break
+                    await self._cond.wait()  # every resident model is busy: queue like Ollama
+                r.active += 1
+                counted = True
+                self._loaded.move_to_end(model)
+            t = time.perf_counter()
+            await r.ready.wait()  # loading, by this request or a concurrent one
+            return time.perf_counter() - t
+        except BaseException:
+            if counted:
+                await self._release(model, None)  # frees the slot too
+            else:
+                slot.release()
+            raise
+
+    async def _load(self, r: _Resident) -> None:
+        t = time.perf_counter()
+        await self._sleep(self.config.load_s)
+        self.stats["loads"] += 1
+        self.stats["load_s"] += time.perf_counter() - t
+        r.ready.set()
+        self._loading.discard(asyncio.current_task())
+
+    async def _release(self, model: str, keep_alive: Any) -> None:
+        # Shielded: a request cancelled mid-release still gives its slot back.
+        await asyncio.shield(self._give_back(model, keep_alive))
+
+    async def _give_back(self, model: str, keep_alive: Any) -> None:
+        assert self._cond is not None
+        async with self._cond:
+            r = self._loaded.get(model)
+            if r is not None:
+                r.active -= 1
+                if r.active == 0 and _seconds(keep_alive) == 0:
+                    del self._loaded[model]
+                elif r.active == 0:
+                    ttl = _seconds(keep_alive)
+                    r.expires_at = (datetime.now(UTC) + timedelta(seconds=ttl)
+                                    if ttl and ttl > 0 else None)
+            self._cond.notify_all()
+        self._slots[model].release()
+
+    # ---- output ----
+    def _tokens(self, model: str, messages: list[dict], options: dict) -> list[str]:
+        n = options.get("num_predict") or self.config.output_tokens
+        n = self.config.output_tokens if n < 0 else n
+        seed = json.dumps([model, messages, options.get("seed")], sort_keys=True)
+        digest = hashlib.sha256(seed.encode()).digest()
+        return [_WORDS[digest[i % len(digest)] % len(_WORDS)] + " " for i in range(n)]
+
+    def _structured(self, schema: Any) -> Any:
+        """A schema-shaped instance: strings "A", numbers 5, one array item."""
+        if not isinstance(schema, dict):
+            return {}
+        kind = schema.get("type")
+        if kind == "object":
+            return {k: self._structured(v) for k, v in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [self._structured(schema.get("items", {}))]
+        if kind in ("number", "integer"):
+            return 5
+        if kind == "boolean":
+            return True
+        return "A"
+
+    # ---- HTTP ----
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="fake-ollama")
+        sim = self
+
+        @app.get("/")
+        async def root() -> Any:
+            return JSONResponse("Ollama is running")
+
+        @app.get("/api/tags")
+        async def tags() -> dict:
+            return {"models": [_model_info(m) for m in sorted(sim.pulled)]}
+
+        @app.get("/api/ps")
+        async def ps() -> dict:
+            return {"models": [
+                {**_model_info(m), "size_vram": _size(m),
+                 "expires_at": (r.expires_at or datetime.now(UTC) + timedelta(minutes=5))
+                 .isoformat()}
+                for m, r in sim._loaded.items() if r.ready.is_set()
+            ]}
+
+        @app.get("/sim/stats")
+        async def stats() -> dict:
+            return {**sim.stats, "loaded": list(sim._loaded)}
+
+        @app.post("/api/pull")
+        async def pull(request: Request) -> Any:
+            body = await request.json()
+            name = body.get("model") or body.get("name") or ""
+            await sim._sleep(sim.config.pull_s)
+            sim.pulled.add(name)
+            steps = [{"status": "pulling manifest"}, {"status": "verifying sha256 digest"},
+                     {"status": "success"}]
+            if body.get("stream") is False:
+                return steps[-1]
+            return StreamingResponse((json.dumps(s) + "\n" for s in steps),
+                                     media_type="application/x-ndjson")
+
+        @app.delete("/api/delete")
+        async def delete(request: Request) -> Any:
+            name = (await request.json()).get("model", "")
+            if name not in sim.pulled:
+                return _not_found(name)
+            sim.pulled.discard(name)
+            return {"status": "success"}
+
+        @app.post("/api/generate")
+        async def generate(request: Request) -> Any:
+            body = await request.json()
+            model = body.get("model", "")
+            if model not in sim.pulled:
+                return _not_found(model)
+            unload = _seconds(body.get("keep_alive")) == 0
+            load = 0.0
+            if not unload or model in sim._loaded:  # unloading never loads first
+                acquired = False
+                try:
+                    load = await sim._acquire(model)  # gives back its own slot if cancelled
+                    acquired = True
+                finally:
+                    if acquired:
+                        await sim._release(model, body.get("keep_alive"))
+            return {"model": model, "created_at": _now(), "response": "", "done": True,
+                    "done_reason": "unload" if unload else "load",
+                    "load_duration": int(load * 1e9)}
+
+        @app.post("/api/chat")
+        async def chat(request: Request) -> Any:
+            body = await request.json()
+            model = body.get("model", "")
+            if model not in sim.pulled:
+                return _not_found(model)
+            sim.stats["requests"] += 1
+            if body.get("stream", True):
+                return StreamingResponse(sim._chat_stream(body), media_type="application/x-ndjson")
+            chunks = [json.loads(c) async for c in sim._chat_stream(body)]
+            final = chunks[-1]
+            final["message"]["content"] = "".join(c["message"]["content"] for c in chunks)
+            return final
+
+        return app
+
+    async def _chat_stream(self, body: dict) -> AsyncIterator[str]:
+        model = body["model"]
+        messages = body.get("messages") or []
+        options = body.get("options") or {}
+        t0 = time.perf_counter()
+        load: float | None = None
+        try:
+            load = await self._acquire(model)  # gives back its own slot if cancelled
+            prompt_tokens = max(1, sum(len(m.get("content", "")) for m in messages) // 4)
+            prefill = prompt_tokens / self.config.prefill_tps
+            await self._sleep(prefill)
+            if body.get("format") is not None:
+                text = json.dumps(self._structured(body["format"])
+                                  if isinstance(body["format"], dict) else {})
+                tokens = [text]
+            else:
+                tokens = self._tokens(model, messages, options)
+            t_decode = time.perf_counter()
+            for tok in tokens:
+                await self._sleep(1 / self.config.decode_tps)
+                yield json.dumps({"model": model, "created_at": _now(), "done": False,
+                                  "message": {"role": "assistant", "content": tok}}) + "\n"
+            decode = time.perf_counter() - t_decode
+            yield json.dumps({
+                "model": model, "created_at": _now(), "done": True, "done_reason": "stop",
+                "message": {"role": "assistant", "content": ""},
+                "total_duration": int((time.perf_counter() - t0) * 1e9),
+                "load_duration": int(load * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(prefill * self.config.time_scale * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int(decode * 1e9),
+            }) + "\n"
+        finally:
+            if load is not None:
+                await self._release(model, body.get("keep_alive"))
+
+    @contextmanager
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> Iterator["FakeOllama"]:
+        """Serve on a background thread (port 0 = any free port) for the `with` block."""
+        with serve_app(self.app, host, port) as url:
+            self.url = url
+            yield self
+
+
+@contextmanager
+def serve_app(app: Any, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """Run an ASGI app under uvicorn on a background thread; yields its base URL."""
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind((host, port))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://{host}:{sock.getsockname()[1]}"
+    finally:
+        server.should_exit = True
+        thread.join(5)
+        sock.close()
+
+
+def _seconds(keep_alive: Any) -> float | None:
+    """Ollama keep_alive (seconds or "10m"-style duration) in seconds; None = default."""
+    if keep_alive is None:
+        return None
+    if isinstance(keep_alive, int | float):
+        return float(keep_alive)
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    for unit in ("ms", "s", "m", "h"):
+        if keep_alive.endswith(unit):
+            return float(keep_alive[: -len(unit)]) * units[unit]
+    return float(keep_alive)
+
+
+def _size(model: str) -> int:
+    return 700_000_000 + int(hashlib.sha256(model.encode()).hexdigest()[:6], 16)
+
+
+def _model_info(model: str) -> dict:
+    family = model.split(":")[0].rstrip("0123456789.")
+    return {
+        "name": model, "model": model, "modified_at": _now(), "size": _size(model),
+        "digest": hashlib.sha256(model.encode()).hexdigest(),
+        "details": {"parent_model": "", "format": "gguf", "family": family,
+                    "families": [family], "parameter_size": model.split(":")[-1].upper(),
+                    "quantization_level": "Q4_K_M"},
+    }
+
+
+def _not_found(model: str) -> JSONResponse:
+    return JSONResponse({"error": f"model '{model}' not found"}, status_code=404)
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+def main() -> None:
+    defaults = SimConfig()
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=11435)
+    p.add_argument("--models", default=",".join(defaults.models),
+                   help="comma-separated model tags to serve")
+    for field in dataclasses.fields(SimConfig):
+        if field.name != "models":
+            p.add_argument(f"--{field.name.replace('_', '-')}", type=type(field.default),
+                           default=field.default)
+    args = p.parse_args()
+    config = SimConfig(models=tuple(args.models.split(",")), **{
+        f.name: getattr(args, f.name) for f in dataclasses.fields(SimConfig) if f.name != "models"
+    })
+    import uvicorn
+
+    uvicorn.run(FakeOllama(config).app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
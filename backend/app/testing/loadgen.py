@@ -0,0 +1,199 @@
+"""Load generator: replay chat / judge traffic at a fixed concurrency and time it.
+
+Traffic is JSON lines of `{"path": "/api/chat/stream", "body": {...}}` (any POST route),
+turns rebuilt from a result store (`--from-store`, see ARENA_RESULT_STORE), or a small
+built-in mix. Requests are replayed round-robin by `--concurrency` workers until
+`--requests` have finished; the report has p50/p95/p99 latency, time to the first token
+event (streams), events/sec and errors, per route and overall:
+
+    python -m app.testing.loadgen --concurrency 8 --requests 200 --out load.json
+    python -m app.testing.loadgen --url http://127.0.0.1:7860 --traffic traffic.jsonl
+
+Without `--url` the app runs in this process under uvicorn on a loopback port (an
+in-memory ASGI transport buffers whole bodies, which would hide TTFT), backed by the
+fake Ollama unless `--live-ollama` keeps ARENA_OLLAMA_HOST.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sqlite3
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from typing import Any
+
+import httpx
+
+from app.testing import report
+
+_MODELS = ("llama3.2:1b", "qwen2.5:0.5b")
+
+
+def builtin_traffic(models: tuple[str, ...] = _MODELS) -> list[dict[str, Any]]:
+    instances = [{"id": f"i{n}", "model": m, "seed": 7} for n, m in enumerate(models)]
+    candidates = [{"label": chr(65 + n), "text": f"Answer {n}: quicksort partitions around "
+                   "a pivot and recurses on both halves."} for n in range(len(models))]
+    return [
+        {"path": "/api/chat/stream", "body": {"message": "Explain quicksort briefly.",
+                                              "model_instances": instances}},
+        {"path": "/api/chat/stream", "body": {
+            "message": "And its worst case?", "model_instances": instances,
+            "history": [{"role": "user", "content": "Explain quicksort briefly."},
+                        {"role": "assistant", "content": "It partitions around a pivot."}]}},
+        {"path": "/api/chat", "body": {"message": "Name three sorting algorithms.",
+                                       "model_instances": instances}},
+        {"path": "/api/judge", "body": {"prompt": "Explain quicksort briefly.",
+                                        "judge_model": models[0], "candidates": candidates}},
+    ]
+
+
+def load_traffic(path: str) -> list[dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def traffic_from_store(path: str, limit: int = 500) -> list[dict[str, Any]]:
+    """Rebuild /chat/stream (and /judge, where judged) requests from stored turns."""
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        turns = db.execute(
+            "SELECT id, prompt, system FROM turns ORDER BY created DESC LIMIT ?", (limit,)
+        ).fetchall()
+        out: list[dict[str, Any]] = []
+        for turn_id, prompt, system in reversed(turns):
+            answers = db.execute(
+                "SELECT instance_id, model, text FROM answers WHERE turn_id = ? "
+                "ORDER BY instance_id", (turn_id,)).fetchall()
+            if not answers:
+                continue
+            out.append({"path": "/api/chat/stream", "body": {
+                "message": prompt, "system": system,
+                "model_instances": [{"id": i, "model": m} for i, m, _ in answers]}})
+            judged = db.execute("SELECT judge_model FROM verdicts WHERE turn_id = ? LIMIT 1",
+                                (turn_id,)).fetchone()
+            if judged and len(answers) >= 2:
+                out.append({"path": "/api/judge", "body": {
+                    "prompt": prompt, "judge_model": judged[0], "candidates": [
+                        {"label": chr(65 + n), "text": text}
+                        for n, (_, _, text) in enumerate(answers[:6])]}})
+        return out
+    finally:
+        db.close()
+
+
+async def _one(client: httpx.AsyncClient, item: dict[str, Any]) -> dict[str, Any]:
+    path = item["path"]
+    t0 = time.perf_counter()
+    first = None
+    events = 0
+    try:
+        async with client.stream("POST", path, json=item["body"]) as r:
+            if path.endswith("/stream"):
+                async for line in r.aiter_lines():
+                    if not line:
+                        continue
+                    events += 1
+                    if first is None and json.loads(line).get("type") == "token":
+                        first = time.perf_counter() - t0
+            else:
+                await r.aread()
+            ok = r.status_code < 400
+    except httpx.HTTPError:
+        ok = False
+    return {"path": path, "ok": ok, "latency": time.perf_counter() - t0, "ttft": first,
+            "events": events}
+
+
+def summarize(samples: list[dict[str, Any]], wall: float) -> dict[str, Any]:
+    ok = [s for s in samples if s["ok"]]
+    events = sum(s["events"] for s in samples)
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "requests_per_s": round(len(samples) / wall, 3) if wall else None,
+        "latency_ms": report.percentiles([s["latency"] for s in ok]),
+        "ttft_ms": report.percentiles([s["ttft"] for s in ok if s["ttft"] is not None]),
+        "events": events,
+        "events_per_s": round(events / wall, 1) if wall else None,
+    }
+
+
+async def run(client: httpx.AsyncClient, traffic: list[dict[str, Any]], concurrency: int = 4,
+              requests: int = 100) -> dict[str, Any]:
+    """Replay `traffic` round-robin until `requests` have finished; returns the report."""
+    if not traffic:
+        raise ValueError("no traffic to replay")
+    feed = itertools.islice(itertools.cycle(traffic), requests)
+    samples: list[dict[str, Any]] = []
+
+    async def worker() -> None:
+        for item in feed:  # shared iterator: each item is taken by exactly one worker
+            samples.append(await _one(client, item))
+
+    t = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, requests)))))
+    wall = time.perf_counter() - t
+    by_path: dict[str, list] = defaultdict(list)
+    for s in samples:
+        by_path[s["path"]].append(s)
+    return {"wall_s": round(wall, 3), **summarize(samples, wall),
+            "by_path": {p: summarize(s, wall) for p, s in sorted(by_path.items())}}
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--url", help="a running arena; default: serve the app in this process")
+    p.add_argument("--traffic", help="JSON lines of {path, body}")
+    p.add_argument("--from-store", help="rebuild traffic from a result store SQLite file")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--requests", type=int, default=100)
+    p.add_argument("--token", help="bearer token (ARENA_AUTH_TOKEN)")
+    p.add_argument("--live-ollama", action="store_true",
+                   help="in-process: use ARENA_OLLAMA_HOST instead of the fake Ollama")
+    p.add_argument("--decode-tps", type=float, default=50.0, help="fake Ollama decode rate")
+    p.add_argument("--load-s", type=float, default=1.0, help="fake Ollama cold load")
+    p.add_argument("--out", help="write the JSON result here too")
+    args = p.parse_args()
+    if args.traffic:
+        traffic = load_traffic(args.traffic)
+    elif args.from_store:
+        traffic = traffic_from_store(args.from_store)
+    else:
+        traffic = builtin_traffic()
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+
+    with ExitStack() as stack:
+        base_url = args.url
+        if base_url is None:
+            from app.main import app
+            from app.services import ollama
+            from app.testing.fake_ollama import FakeOllama, SimConfig, serve_app
+
+            if not args.live_ollama:
+                models = {i["model"] for t in traffic
+                          for i in t["body"].get("model_instances", [])}
+                models |= {t["body"]["judge_model"] for t in traffic if "judge_model" in t["body"]}
+                sim = stack.enter_context(FakeOllama(SimConfig(
+                    models=tuple(sorted(models)), decode_tps=args.decode_tps,
+                    load_s=args.load_s, max_loaded=max(1, len(models)),
+                    parallel=args.concurrency)).serve())
+                ollama._client = ollama._new_client(sim.url)
+            base_url = stack.enter_context(serve_app(app))
+
+        async def go() -> dict[str, Any]:
+            async with httpx.AsyncClient(base_url=base_url, headers=headers,
+                                         timeout=httpx.Timeout(600.0)) as client:
+                return await run(client, traffic, args.concurrency, args.requests)
+
+        results = asyncio.run(go())
+    config = {"target": args.url or "in-process", "concurrency": args.concurrency,
+              "requests": args.requests, "traffic": args.traffic or args.from_store or "builtin",
+              "distinct_requests": len(traffic),
+              "ollama": "live" if args.url or args.live_ollama else
+              {"fake": True, "decode_tps": args.decode_tps, "load_s": args.load_s}}
+    report.write(report.document("loadgen", config, results), args.out)
+
+
+if __name__ == "__main__":
+    main()
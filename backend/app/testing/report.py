@@ -0,0 +1,90 @@
+"""JSON result files for the perf tools, so runs can be compared across commits.
+
+Every file carries the commit, host and Python it was measured on next to the numbers;
+`python -m app.testing.report old.json new.json` prints the relative change of every
+numeric field the two files share.
+"""
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+
+def percentiles(values: list[float], qs: tuple[int, ...] = (50, 95, 99)) -> dict[str, float]:
+    """Nearest-rank percentiles in milliseconds (`values` in seconds)."""
+    if not values:
+        return {f"p{q}": None for q in qs} | {"mean": None}
+    s = sorted(values)
+    out = {f"p{q}": round(s[max(0, math.ceil(q / 100 * len(s)) - 1)] * 1000, 3) for q in qs}
+    out["mean"] = round(sum(s) / len(s) * 1000, 3)
+    return out
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent, timeout=5, check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def document(kind: str, config: dict[str, Any], results: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "kind": kind,
+        "created": round(time.time(), 3),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "config": config,
+        "results": results,
+    }
+
+
+def write(doc: dict[str, Any], out: str | None) -> None:
+    text = json.dumps(doc, indent=2)
+    if out:
+        Path(out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+def _flatten(obj: Any, prefix: str = "") -> dict[str, float]:
+    if isinstance(obj, dict):
+        return {k: v for key, val in obj.items() for k, v in _flatten(val, f"{prefix}{key}.").items()}
+    if isinstance(obj, int | float) and not isinstance(obj, bool):
+        return {prefix.rstrip("."): float(obj)}
+    return {}
+
+
+def compare(old: dict[str, Any], new: dict[str, Any]) -> dict[str, dict[str, float | None]]:
+    """{field: {old, new, change}} for numeric results present in both; change is relative."""
+    a, b = _flatten(old.get("results", {})), _flatten(new.get("results", {}))
+    return {
+        k: {"old": a[k], "new": b[k],
+            "change": round((b[k] - a[k]) / a[k], 4) if a[k] else None}
+        for k in sorted(a.keys() & b.keys())
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Compare two perf result files.")
+    p.add_argument("old")
+    p.add_argument("new")
+    args = p.parse_args()
+    old, new = (json.loads(Path(f).read_text(encoding="utf-8")) for f in (args.old, args.new))
+    if old.get("kind") != new.get("kind"):
+        sys.exit(f"different kinds: {old.get('kind')} vs {new.get('kind')}")
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for field, d in compare(old, new).items():
+        change = "" if d["change"] is None else f"{d['change']:+.1%}"
+        print(f"{field:60} {d['old']:>12.3f} {d['new']:>12.3f} {change:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from app.services import ollama
+from app.testing.fake_ollama import FakeOllama, SimConfig
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "fake_models(tokens, delay_s): what the `fake_models` streams send")
+
+
+class FakeModels:
+    """Stands in for `ollama.chat_stream`: each instance streams `tokens(inst)`, sleeping
+    `delay_s` before every token. Streams cancelled part-way record their id in `closed`."""
+
+    def __init__(self, tokens=lambda inst: [f"{inst.model} says hi"], delay_s: float = 0.0):
+        self.tokens = tokens
+        self.delay_s = delay_s
+        self.closed: list[str] = []
+
+    async def chat_stream(self, inst, messages, priority="interactive"):
+        tokens = self.tokens(inst)
+        try:
+            for tok in tokens:
+                await asyncio.sleep(self.delay_s)
+                yield {"token": tok, "done": False}
+            yield {"token": "", "done": True, "eval_count": len(tokens), "eval_duration": 10**7}
+        except asyncio.CancelledError:
+            self.closed.append(inst.id)  # the upstream stream is unwound, not left running
+            raise
+
+
+@pytest.fixture
+def fake_models(request, monkeypatch):
+    """Canned model output instead of Ollama; `@pytest.mark.fake_models(...)` on the test
+    or module sets `tokens` and `delay_s`."""
+    marker = request.node.get_closest_marker("fake_models")
+    fake = FakeModels(**marker.kwargs) if marker else FakeModels()
+    monkeypatch.setattr(ollama, "chat_stream", fake.chat_stream)
+    return fake
+
+
+@pytest.fixture
+def fake_ollama(monkeypatch):
+    """A simulated Ollama on a free port, with the app's Ollama client pointed at it.
+
+    Delays are scaled to a quarter; tweak `fake_ollama.config` in the test for more.
+    """
+    sim = FakeOllama(SimConfig(load_s=0.2, decode_tps=200, output_tokens=8, pull_s=0.05,
+                               time_scale=0.25))
+    with sim.serve():
+        monkeypatch.setattr(ollama, "_client", ollama._new_client(sim.url))
+        yield sim
@@ -0,0 +1,71 @@
+"""Admission control: per-model / total caps, priority order, and queue-wait accounting."""
+import asyncio
+
+import pytest
+
+from app.services.admission import Admission
+
+
+@pytest.mark.asyncio
+async def test_per_model_cap_does_not_block_other_models():
+    adm = Admission(per_model=1, total=4)
+    await adm.acquire("a")
+    blocked = asyncio.create_task(adm.acquire("a"))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+    assert await adm.acquire("b") == pytest.approx(0, abs=0.01)  # other model goes straight in
+    adm.release("a")
+    assert await blocked >= 0
+    assert adm.inflight("a") == 1 and adm.inflight() == 2
+
+
+@pytest.mark.asyncio
+async def test_interactive_is_admitted_before_batch():
+    adm = Admission(per_model=1, total=1)
+    await adm.acquire("m")
+    order: list[str] = []
+
+    async def wait(tag, prio):
+        await adm.acquire("m", prio)
+        order.append(tag)
+        adm.release("m")
+
+    tasks = [asyncio.create_task(wait("batch", "batch")),
+             asyncio.create_task(wait("judge", "judge")),
+             asyncio.create_task(wait("chat", "interactive"))]
+    await asyncio.sleep(0)
+    assert adm.waiting == 3
+    adm.release("m")
+    await asyncio.gather(*tasks)
+    assert order == ["chat", "judge", "batch"]
+
+
+@pytest.mark.asyncio
+async def test_fifo_policy_ignores_priority():
+    adm = Admission(per_model=1, total=1, policy="fifo")
+    await adm.acquire("m")
+    order: list[str] = []
+
+    async def wait(tag, prio):
+        await adm.acquire("m", prio)
+        order.append(tag)
+        adm.release("m")
+
+    tasks = [asyncio.create_task(wait("batch", "batch")),
+             asyncio.create_task(wait("chat", "interactive"))]
+    await asyncio.sleep(0)
+    adm.release("m")
+    await asyncio.gather(*tasks)
+    assert order == ["batch", "chat"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    adm = Admission(per_model=1, total=1)
+    await adm.acquire("m")
+    gone = asyncio.create_task(adm.acquire("m"))
+    await asyncio.sleep(0)
+    gone.cancel()
+    await asyncio.gather(gone, return_exceptions=True)
+    adm.release("m")
+    assert adm.inflight() == 0 and adm.waiting == 0
@@ -0,0 +1,348 @@
+"""Server-side benchmark pipeline (Ollama + judge stubbed; no live model needed)."""
+import asyncio
+import json
+import random
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.main import app
+from app.routers import benchmark
+from app.schemas import JudgeResult
+from app.services import leaderboard, ollama, store
+from app.services.leaderboard import PairCounts
+from app.services.store import ResultStore
+
+pytestmark = pytest.mark.fake_models(delay_s=0.01)
+
+
+async def _wait(c, job_id):
+    r = await c.get(f"/api/benchmark/{job_id}/stream")  # returns once the run has ended
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+@pytest.mark.asyncio
+async def test_benchmark_generates_and_judges_every_prompt(fake_models, monkeypatch):
+    active = peak = 0
+
+    async def fake_verdict(req, priority="judge", deadline=None):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        return JudgeResult.model_validate(
+            {"verdicts": [{"label": "A", "score": 9}, {"label": "B", "score": 3}], "winner": "A"}
+        )
+
+    monkeypatch.setattr(benchmark, "_verdict", fake_verdict)
+    body = {
+        "prompts": [f"q{i}" for i in range(6)],
+        "model_instances": [{"id": "a", "model": "m1"}, {"id": "b", "model": "m2"}],
+        "judge": {"judge_model": "j"},
+        "judge_concurrency": 2,
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        job = (await c.post("/api/benchmark", json=body)).json()
+        events = await _wait(c, job["id"])
+        r = (await c.get(f"/api/benchmark/{job['id']}")).json()
+
+    assert events[-1]["type"] == "end"
+    assert r["status"] == "done" and r["completed"] == r["judged"] == 6
+    assert r["prompts_per_min"] > 0
+    assert [p["index"] for p in r["results"]] == list(range(6))
+    assert r["results"][0]["mapping"] == {"A": "a", "B": "b"}
+    assert r["results"][0]["answers"]["b"]["text"] == "m2 says hi"
+    assert peak == 2  # judge workers ran side by side
+
+
+@pytest.mark.asyncio
+async def test_benchmark_judge_errors_do_not_stop_the_run(fake_models, monkeypatch):
+    async def failing_verdict(req, priority="judge", deadline=None):
+        raise ValueError("API key required")
+
+    monkeypatch.setattr(benchmark, "_verdict", failing_verdict)
+    body = {
+        "prompts": ["q0", "q1"],
+        "model_instances": [{"id": "a", "model": "m1"}, {"id": "b", "model": "m2"}],
+        "judge": {"judge_model": "j", "provider": "openai"},
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        job = (await c.post("/api/benchmark", json=body)).json()
+        await _wait(c, job["id"])
+        r = (await c.get(f"/api/benchmark/{job['id']}")).json()
+    assert r["status"] == "done" and r["completed"] == 2 and r["judged"] == 0
+    assert r["results"][1]["judge_error"] == "API key required"
+
+
+@pytest.mark.asyncio
+async def test_unknown_benchmark_is_404():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.get("/api/benchmark/nope")
+    assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_model_schedule_loads_each_model_once(fake_ollama):
+    """Three models, one VRAM slot: prompt order reloads per prompt, model order at most once."""
+    fake_ollama.config.models = ("m1", "m2", "m3")
+    fake_ollama.pulled = {"m1", "m2", "m3"}
+    body = {"prompts": [f"q{i}" for i in range(4)], "model_slots": 1,
+            "model_instances": [{"id": m, "model": m} for m in ("m1", "m2", "m3")]}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        loads = {}
+        for schedule in ("prompt", "model"):
+            before = fake_ollama.stats["loads"]
+            job = (await c.post("/api/benchmark", json={**body, "schedule": schedule})).json()
+            await _wait(c, job["id"])
+            r = (await c.get(f"/api/benchmark/{job['id']}")).json()
+            loads[schedule] = fake_ollama.stats["loads"] - before
+            assert [p["index"] for p in r["results"]] == [0, 1, 2, 3]
+            assert all(set(p["answers"]) == {"m1", "m2", "m3"} and
+                       all(a["text"] for a in p["answers"].values()) for p in r["results"])
+    # Prompt order reloads at least two of three models per prompt (which one is still
+    # resident from the last prompt depends on arrival order). The model run starts with
+    # the model the prompt-order run left resident, so it loads only the other two.
+    assert loads["prompt"] >= 8 and loads["model"] == 2
+    report = r["schedule"]
+    assert report["order"][1:] == [m for m in ("m1", "m2", "m3") if m != report["order"][0]]
+    assert report["model_loads"] == 2
+    assert report["naive_model_loads"] >= 11
+    assert report["swaps_saved"] == report["naive_model_loads"] - 2
+    assert report["load_s_saved"] > 0
+
+
+@pytest.mark.asyncio
+async def test_adaptive_judging_stops_once_top_k_is_stable(fake_models, monkeypatch):
+    """m1 > m2 > m3 > m4 with a noisy judge: far fewer calls than prompts, right top 2."""
+    strength = {"m1": 8.0, "m2": 6.0, "m3": 4.0, "m4": 2.0}
+    seen: list[int] = []
+
+    async def fake_verdict(req, priority="judge", deadline=None):
+        seen.append(len(req.candidates))
+        noise = random.Random(req.prompt)
+        return JudgeResult.model_validate({"verdicts": [
+            {"label": c.label, "score": strength[c.text.split()[0]] + noise.uniform(0, 2.5)}
+            for c in req.candidates
+        ]})
+
+    monkeypatch.setattr(benchmark, "_verdict", fake_verdict)
+    body = {
+        "prompts": [f"q{i}" for i in range(200)],
+        "model_instances": [{"id": m[1], "model": m} for m in strength],
+        "judge": {"judge_model": "j"},
+        "judge_concurrency": 2,
+        "adaptive": {"top_k": 2, "confidence": 0.9},
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        job = (await c.post("/api/benchmark", json=body)).json()
+        await _wait(c, job["id"])
+        r = (await c.get(f"/api/benchmark/{job['id']}")).json()
+        missing = await c.post("/api/benchmark", json={**body, "judge": None})
+
+    report = r["adaptive"]
+    assert r["status"] == "done" and r["completed"] == 200
+    assert report["stable"] and report["order"][:2] == ["1", "2"]
+    assert report["judge_calls"] == len(seen) < 100
+    assert report["calls_saved"] == 200 - report["judge_calls"]
+    assert sum(p.get("judge_skipped", False) for p in r["results"]) == report["calls_saved"]
+    assert seen[:4] == [4, 4, 4, 4] and min(seen) == 2  # warm-up on all, then the unsure pair
+    assert missing.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_adaptive_judging_goes_on_when_an_unsure_model_stops_answering(
+        fake_models, monkeypatch):
+    """m2 and m3 are too close to call, then m3 fails on every later prompt: the unsure
+    pair can't be judged again, so rounds fall back to the models that did answer."""
+    strength = {"m1": 9.0, "m2": 5.0, "m3": 5.0}
+
+    async def flaky_stream(inst, messages, priority="interactive"):
+        if inst.model == "m3" and int(messages[-1]["content"][1:]) >= 6:
+            raise RuntimeError("model crashed")
+        async for chunk in fake_models.chat_stream(inst, messages, priority):
+            yield chunk
+
+    async def fake_verdict(req, priority="judge", deadline=None):
+        turn = int(req.prompt[1:]) % 2  # m2 and m3 take turns winning
+        bonus = {"m2": turn, "m3": 1 - turn, "m1": 0}
+        return JudgeResult.model_validate({"verdicts": [
+            {"label": c.label, "score": strength[c.text.split()[0]] + bonus[c.text.split()[0]]}
+            for c in req.candidates
+        ]})
+
+    monkeypatch.setattr(ollama, "chat_stream", flaky_stream)
+    monkeypatch.setattr(benchmark, "_verdict", fake_verdict)
+    body = {
+        "prompts": [f"q{i}" for i in range(30)],
+        "model_instances": [{"id": m[1], "model": m} for m in strength],
+        "judge": {"judge_model": "j"},
+        "adaptive": {"top_k": 3, "confidence": 0.99},
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        job = (await c.post("/api/benchmark", json=body)).json()
+        await asyncio.wait_for(_wait(c, job["id"]), 10)
+        r = (await c.get(f"/api/benchmark/{job['id']}")).json()
+
+    assert r["status"] == "done" and r["completed"] == 30
+    assert not r["adaptive"]["stable"]  # m2 vs m3 never settles, every prompt was judged
+    assert r["adaptive"]["judge_calls"] == 30
+    assert r["results"][-1]["mapping"] == {"A": "1", "B": "2"}
+
+
+@pytest.mark.asyncio
+async def test_benchmark_verdicts_are_stored_like_judge_verdicts(
+        fake_models, monkeypatch, tmp_path):
+    async def fake_verdict(req, priority="judge", deadline=None):
+        return JudgeResult.model_validate(
+            {"verdicts": [{"label": "A", "score": 9}, {"label": "B", "score": 3}], "winner": "A"}
+        )
+
+    rs = ResultStore(tmp_path / "results.sqlite3")
+    monkeypatch.setattr(settings, "result_store", True)
+    monkeypatch.setattr(store, "results", rs)
+    monkeypatch.setattr(leaderboard, "board", PairCounts())
+    monkeypatch.setattr(benchmark, "_verdict", fake_verdict)
+    body = {
+        "prompts": ["q0", "q1"],
+        "model_instances": [{"id": "a", "model": "m1"}, {"id": "b", "model": "m2"}],
+        "judge": {"judge_model": "j"},
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        job = (await c.post("/api/benchmark", json=body)).json()
+        await _wait(c, job["id"])
+    await store.flush()
+    assert [tuple(row) for row in rs.pair_outcomes()] == [("m1", "m2", 2, 0, 0)]
+    _, wins, _, _ = leaderboard.board.snapshot()
+    assert wins.tolist() == [[0, 2], [0, 0]]
+@pytest.fixture
+def checkpoints(monkeypatch, tmp_path):
+    monkeypatch.setattr(benchmark.settings, "benchmark_checkpoints", True)
+    monkeypatch.setattr(benchmark.settings, "benchmark_dir", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_prompt_set_upload_dedups_and_runs_by_id(fake_models, checkpoints):
+    csv = 'id,prompt\n1,"What is 2+2?"\n2,Name a colour\n3,"What is 2+2?"\n4,\n'
+    body = {"model_instances": [{"id": "a", "model": "m1"}]}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        info = (await c.post("/api/benchmark/prompt-sets?format=csv", content=csv)).json()
+        job = (await c.post("/api/benchmark", json={**body, "prompt_set": info["id"]})).json()
+        await _wait(c, job["id"])
+        r = (await c.get(f"/api/benchmark/{job['id']}")).json()
+        both = await c.post("/api/benchmark", json={**body, "prompt_set": info["id"],
+                                                    "prompts": ["x"]})
+        unknown = await c.post("/api/benchmark", json={**body, "prompt_set": "0" * 16})
+        empty = await c.post("/api/benchmark/prompt-sets?format=txt", content="\n \n")
+
+    assert info["prompts"] == 2 and info["rows"] == 4
+    assert info["duplicates"] == 1 and info["empty"] == 1
+    assert [p["prompt"] for p in r["results"]] == ["What is 2+2?", "Name a colour"]
+    assert both.status_code == 400 and unknown.status_code == 404
+    assert empty.status_code == 400
+    assert list((checkpoints / "prompt-sets").iterdir()) == [
+        checkpoints / "prompt-sets" / f"{info['id']}.jsonl"]  # no spooled uploads left
+
+
+@pytest.mark.asyncio
+async def test_resume_only_generates_and_judges_what_the_checkpoint_lacks(
+        fake_models, checkpoints, monkeypatch):
+    calls: list[tuple[str, str]] = []
+    judged: list[str] = []
+    down = {("q1", "a")}  # fails before the interruption, answers after it
+    slow = {("q0", "b")}  # cut off by the deadline before it, finishes after it
+
+    async def counting_stream(inst, messages, priority="interactive"):
+        calls.append((messages[-1]["content"], inst.id))
+        if (messages[-1]["content"], inst.id) in down:
+            raise RuntimeError("model crashed")
+        if (messages[-1]["content"], inst.id) in slow:
+            yield {"token": "partial", "done": False}
+            await asyncio.sleep(5)
+        async for chunk in fake_models.chat_stream(inst, messages, priority):
+            yield chunk
+
+    async def fake_verdict(req, priority="judge", deadline=None):
+        judged.append(req.prompt)
+        return JudgeResult.model_validate(
+            {"verdicts": [{"label": "A", "score": 9}, {"label": "B", "score": 3}], "winner": "A"}
+        )
+
+    monkeypatch.setattr(ollama, "chat_stream", counting_stream)
+    monkeypatch.setattr(benchmark, "_verdict", fake_verdict)
+    body = {
+        "prompts": ["q0", "q1", "q2"],
+        "model_instances": [{"id": "a", "model": "m1"}, {"id": "b", "model": "m2"}],
+        "judge": {"judge_model": "j"},
+        "timeout_s": 0.5,
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        job = (await c.post("/api/benchmark", json=body)).json()
+        await _wait(c, job["id"])
+        # Simulate a crash: q2's answer from `b` and the verdicts on q1 and q2 never made
+        # it to disk, and the last line was torn mid-write.
+        log = checkpoints / f"{job['id']}.jsonl"
+        kept = []
+        for line in log.read_text().splitlines():
+            rec = json.loads(line)
+            if rec.get("index") == 2 and rec["type"] == "answer" and rec["instance_id"] == "b":
+                continue
+            if rec["type"] == "verdict" and rec["index"] != 0:
+                continue
+            kept.append(line)
+        log.write_text("\n".join(kept) + '\n{"type": "answ')
+        del benchmark._jobs[job["id"]]
+        down.clear()
+        slow.clear()
+        calls.clear()
+        judged.clear()
+
+        resumed = (await c.post(f"/api/benchmark/{job['id']}/resume")).json()
+        await _wait(c, job["id"])
+        r = (await c.get(f"/api/benchmark/{job['id']}")).json()
+        first = (sorted(calls), sorted(judged))
+        calls.clear()
+        judged.clear()
+        again = (await c.post(f"/api/benchmark/{job['id']}/resume")).json()
+        await _wait(c, job["id"])
+        missing = await c.post(f"/api/benchmark/{'f' * 12}/resume")
+
+    assert resumed["id"] == job["id"] and resumed["resumed"] == 3
+    # Finished work was not redone; the failed and the truncated generations were retried.
+    assert first == ([("q0", "b"), ("q1", "a"), ("q2", "b")], ["q0", "q1", "q2"])
+    assert r["status"] == "done" and r["completed"] == 3 and r["judged"] == 3
+    assert all(p["winner"] == "A" for p in r["results"])
+    assert again["resumed"] == 6 and calls == [] and judged == []  # nothing left to do
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_shards_split_the_prompts_disjointly(fake_models):
+    prompts = [f"question {i}" for i in range(40)]
+    body = {"prompts": prompts, "model_instances": [{"id": "a", "model": "m1"}],
+            "shard_count": 3}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        runs = []
+        for k in range(3):
+            job = (await c.post("/api/benchmark", json={**body, "shard_index": k})).json()
+            await _wait(c, job["id"])
+            runs.append((await c.get(f"/api/benchmark/{job['id']}")).json())
+        bad = await c.post("/api/benchmark", json={**body, "shard_index": 3})
+
+    seen = [p["index"] for run in runs for p in run["results"]]
+    assert sorted(seen) == list(range(40))  # every prompt exactly once
+    assert all(run["total"] == len(run["results"]) > 0 for run in runs)
+    assert runs[1]["shard"] == "1/3"
+    assert bad.status_code == 400
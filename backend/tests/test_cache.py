@@ -0,0 +1,96 @@
+"""Response cache: LRU/TTL bounds and replay of deterministic generations."""
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.schemas import ModelInstance
+from app.services import ollama
+from app.services.cache import DiskCache, content_key
+
+
+def test_content_key_ignores_dict_order():
+    assert content_key({"a": 1, "b": 2}) == content_key({"b": 2, "a": 1})
+    assert content_key({"a": 1}) != content_key({"a": 2})
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = DiskCache(tmp_path / "c.sqlite3", max_bytes=30)
+    cache.put("old", "x" * 10)
+    cache.put("used", "y" * 10)
+    assert cache.get("old") == "x" * 10  # touch: "used" is now least recent
+    cache.put("new", "z" * 10)  # 3 x 12 bytes > 30 -> evict one
+    assert cache.get("used") is None
+    assert cache.get("old") and cache.get("new")
+
+
+def test_byte_total_tracks_replacements_and_survives_a_reopen(tmp_path):
+    cache = DiskCache(tmp_path / "c.sqlite3", max_bytes=30)
+    cache.put("a", "x" * 10)
+    cache.put("a", "x" * 4)  # replaced: 6 bytes now, not 18
+    cache.put("b", "y" * 10)
+    assert cache.stats()["bytes"] == cache._bytes == 18
+    reopened = DiskCache(tmp_path / "c.sqlite3", max_bytes=30)
+    reopened.put("c", "z" * 10)  # 30 bytes: still fits, nothing evicted
+    assert reopened._bytes == reopened.stats()["bytes"] == 30
+    assert reopened.stats()["entries"] == 3
+
+
+def test_ttl_expires_entries(tmp_path, monkeypatch):
+    cache = DiskCache(tmp_path / "c.sqlite3", max_bytes=1000, ttl_s=10)
+    cache.put("k", {"v": 1})
+    assert cache.get("k") == {"v": 1}
+    monkeypatch.setattr("app.services.cache.time.time", lambda: 10**12)
+    assert cache.get("k") is None
+
+
+class _FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def list(self):
+        return SimpleNamespace(models=[SimpleNamespace(model="m", digest="sha256:1")])
+
+    async def chat(self, **kw):
+        self.calls += 1
+
+        async def gen():
+            for tok in ("Hel", "lo"):
+                yield SimpleNamespace(message=SimpleNamespace(content=tok), done=False)
+            yield SimpleNamespace(message=SimpleNamespace(content=""), done=True,
+                                  eval_count=2, eval_duration=10**8)
+
+        return gen()
+
+
+@pytest.fixture
+def cached_ollama(tmp_path, monkeypatch):
+    client = _FakeClient()
+    monkeypatch.setattr(ollama, "_client", client)
+    monkeypatch.setattr(ollama, "_responses", DiskCache(tmp_path / "r.sqlite3", 2**20))
+    monkeypatch.setattr(ollama, "_digests", {})
+    monkeypatch.setattr(settings, "response_cache", True)
+    return client
+
+
+async def _run(inst):
+    return [ch async for ch in ollama.chat_stream(inst, [{"role": "user", "content": "hi"}])]
+
+
+@pytest.mark.asyncio
+async def test_seeded_generation_is_replayed_from_cache(cached_ollama):
+    inst = ModelInstance(id="x", model="m", seed=7)
+    live = await _run(inst)
+    replay = await _run(inst)
+    assert cached_ollama.calls == 1
+    assert [c["token"] for c in replay] == [c["token"] for c in live] == ["Hel", "lo", ""]
+    assert replay[-1]["cached"] is True and live[-1]["cached"] is False
+    assert replay[-1]["eval_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_random_seed_is_never_cached(cached_ollama):
+    inst = ModelInstance(id="x", model="m", temperature=0.7)
+    await _run(inst)
+    await _run(inst)
+    assert cached_ollama.calls == 2
@@ -0,0 +1,81 @@
+"""Cancelling live generations: per-instance cancel endpoint and client disconnects."""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.main import app
+from app.routers import chat
+from app.schemas import ChatRequest
+
+pytestmark = [
+    pytest.mark.usefixtures("fake_models"),
+    pytest.mark.fake_models(
+        tokens=lambda inst: [f"{i} " for i in range(3 if inst.model == "quick" else 10_000)],
+        delay_s=0.005),
+]
+
+
+class _Connected:
+    async def is_disconnected(self):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_cancel_endpoint_stops_one_instance_only(fake_models):
+    body = {"message": "hi", "request_id": "r1",
+            "model_instances": [{"id": "slow", "model": "slow"}, {"id": "q", "model": "quick"}]}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+
+        async def cancel_soon():
+            while "r1" not in chat._live:
+                await asyncio.sleep(0.005)
+            await asyncio.sleep(0.05)
+            return await c.post("/api/chat/r1/cancel", params={"instance_id": "slow"})
+
+        stream, cancel = await asyncio.gather(
+            c.post("/api/chat/stream", json=body), cancel_soon()
+        )
+    events = [json.loads(line) for line in stream.text.splitlines()]
+    assert cancel.json() == {"cancelled": ["slow"]}
+    assert {"type": "cancelled", "instance_id": "slow"} in events
+    assert any(e["type"] == "done" and e["instance_id"] == "q" for e in events)
+    slow_metrics = next(e for e in events if e["type"] == "metrics" and e["instance_id"] == "slow")
+    assert slow_metrics["metrics"]["cancelled"] is True
+    assert fake_models.closed == ["slow"]
+    assert "r1" not in chat._live
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_every_generation(fake_models):
+    req = ChatRequest(message="hi", model_instances=[{"id": "a", "model": "slow"},
+                                                     {"id": "b", "model": "slow"}])
+    resp = await chat.chat_stream(req, _Connected())
+    body = resp.body_iterator
+    await body.__anext__()  # a few tokens arrive, then the client goes away
+    await body.aclose()
+    assert sorted(fake_models.closed) == ["a", "b"]
+    assert chat._live == {}
+
+
+@pytest.mark.asyncio
+async def test_duplicate_request_id_is_refused_before_the_first_body_starts():
+    req = ChatRequest(message="hi", request_id="dup",
+                      model_instances=[{"id": "q", "model": "quick"}])
+    first = await chat.chat_stream(req, _Connected())
+    with pytest.raises(chat.HTTPException) as err:  # the first body has not run yet
+        await chat.chat_stream(req, _Connected())
+    assert err.value.status_code == 409
+    raw = b"".join([chunk async for chunk in first.body_iterator])
+    assert json.loads(raw.splitlines()[-1])["type"] == "done"
+    assert "dup" not in chat._live
+
+
+@pytest.mark.asyncio
+async def test_cancel_unknown_stream_is_404():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/chat/nope/cancel")
+    assert r.status_code == 404
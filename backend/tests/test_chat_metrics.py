@@ -0,0 +1,23 @@
+"""Compare-card metrics: Ollama load / prefill / decode timings stay separate."""
+from app.routers.chat import _metrics
+
+
+def test_metrics_separate_load_prefill_and_decode():
+    final = {
+        "eval_count": 100, "eval_duration": 2 * 10**9,
+        "load_duration": 3 * 10**9,
+        "prompt_eval_count": 400, "prompt_eval_duration": 10**9 // 2,
+        "total_duration": 6 * 10**9,
+    }
+    m = _metrics(final, first_s=3.6, wall_s=6.1)
+    assert m["tokens_per_sec"] == 50  # decode only
+    assert m["prefill_tokens_per_sec"] == 800
+    assert m["load_s"] == 3 and m["cold_load"] is True
+    assert m["first_token_warm_s"] == 0.6
+    assert m["total_s"] == 6
+
+
+def test_metrics_warm_model_is_not_flagged_cold():
+    m = _metrics({"eval_count": 5, "eval_duration": 10**8, "load_duration": 10**7}, 0.2, 0.3)
+    assert m["cold_load"] is False
+    assert m["prefill_tokens_per_sec"] is None  # not reported -> unknown, not 0
@@ -0,0 +1,108 @@
+"""Cloud judge client pooling + rate-limit-aware retries, against a local stand-in server."""
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.config import settings
+from app.services import cloud
+from app.services.ratelimit import TokenBucket
+
+_OK = json.dumps({"choices": [{"message": {"content": '{"verdicts":[],"winner":"A"}'}}]})
+
+
+class StandIn:
+    """Minimal keep-alive HTTP/1.1 server replaying scripted (status, headers) replies."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.connections = 0
+        self.requests = 0
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/v1"
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await cloud.aclose()
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        while head := await reader.readuntil(b"\r\n\r\n"):
+            length = next((int(line.split(b":")[1]) for line in head.split(b"\r\n")
+                           if line.lower().startswith(b"content-length")), 0)
+            await reader.readexactly(length)
+            self.requests += 1
+            status, headers = self.script.pop(0) if self.script else (200, {})
+            body = (_OK if status == 200 else '{"error":"slow down"}').encode()
+            extra = "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+            writer.write(f"HTTP/1.1 {status} X\r\nContent-Length: {len(body)}\r\n"
+                         f"Content-Type: application/json\r\n{extra}\r\n".encode() + body)
+            await writer.drain()
+
+
+async def _judge(url):
+    return await cloud.openai_compatible_json("m", "sys", "user", {}, "key", url)
+
+
+@pytest.mark.asyncio
+async def test_judge_calls_reuse_one_pooled_connection():
+    async with StandIn([]) as srv:
+        for _ in range(3):
+            assert "winner" in await _judge(srv.url)
+    assert srv.requests == 3
+    assert srv.connections == 1
+
+
+@pytest.mark.asyncio
+async def test_429_is_retried_after_retry_after():
+    async with StandIn([(429, {"Retry-After": "0"}), (503, {"Retry-After": "0"})]) as srv:
+        assert "winner" in await _judge(srv.url)
+    assert srv.requests == 3
+
+
+@pytest.mark.asyncio
+async def test_persistent_429_surfaces_as_rate_limit_error(monkeypatch):
+    monkeypatch.setattr(settings, "cloud_max_retries", 1)
+    async with StandIn([(429, {"Retry-After": "0"})] * 5) as srv:
+        with pytest.raises(cloud.RateLimitError):
+            await _judge(srv.url)
+    assert srv.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_after_burst_and_honours_pause():
+    bucket = TokenBucket(rate_per_s=50, burst=2)
+    t0 = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    assert time.monotonic() - t0 >= 0.03  # 2 free, then 2 x 20 ms
+    bucket.pause(0.05)
+    assert await bucket.acquire() >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_evicted_anthropic_clients_close_once_their_calls_end(monkeypatch):
+    monkeypatch.setattr(cloud, "_MAX_ANTHROPIC_CLIENTS", 2)
+
+    async def use(key):
+        async with cloud._anthropic_client(key) as client:
+            return client
+
+    first, second = await use("k1"), await use("k2")
+    assert await use("k1") is first  # used again: now the newest
+    await use("k3")  # evicts k2, the least recently used, idle: closed now
+    assert second.is_closed() and not first.is_closed()
+
+    async with cloud._anthropic_client("k1") as busy:  # a call in flight on k1...
+        await use("k4")
+        await use("k5")  # ...when k1 is evicted: it stays open for that call
+        assert busy is first and not busy.is_closed()
+        assert first not in cloud._anthropic.values() and len(cloud._anthropic) == 2
+    assert busy.is_closed()  # closed as its last call ended
+    await cloud.aclose()
+    assert not cloud._anthropic and not cloud._anthropic_calls
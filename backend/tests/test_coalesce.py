@@ -0,0 +1,85 @@
+"""Coalescing identical deterministic generations: one upstream call, fanned out."""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.main import app
+from app.services import telemetry
+from app.services.singleflight import StreamFlight
+
+
+async def _stream(body: dict) -> list[dict]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/chat/stream", json=body)
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+def _texts(events: list[dict]) -> dict[str, str]:
+    out: dict[str, str] = {}
+    for e in events:
+        if e["type"] == "token":
+            out[e["instance_id"]] = out.get(e["instance_id"], "") + e["token"]
+    return out
+
+
+@pytest.mark.asyncio
+async def test_same_model_and_seed_twice_runs_once(fake_ollama):
+    before = telemetry.coalesced.value("llama3.2:1b")
+    events = await _stream({"message": "hi", "model_instances": [
+        {"id": "a", "model": "llama3.2:1b", "seed": 3},
+        {"id": "b", "model": "llama3.2:1b", "seed": 3},
+        {"id": "c", "model": "llama3.2:1b"},  # random sampling: always its own run
+    ]})
+    assert fake_ollama.stats["requests"] == 2
+    texts = _texts(events)
+    assert texts["a"] == texts["b"] and len(texts["a"].split()) == 8
+    metrics = {e["instance_id"]: e["metrics"] for e in events if e["type"] == "metrics"}
+    assert sorted(m["shared"] for m in metrics.values()) == [False, False, True]
+    assert telemetry.coalesced.value("llama3.2:1b") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_and_setting_turns_it_off(fake_ollama, monkeypatch):
+    body = {"message": "same", "model_instances": [
+        {"id": "x", "model": "gemma3:1b", "seed": 11}]}
+    await asyncio.gather(_stream(body), _stream(body), _stream(body))
+    assert fake_ollama.stats["requests"] == 1
+    monkeypatch.setattr(settings, "coalesce_generations", False)
+    await asyncio.gather(_stream(body), _stream(body))
+    assert fake_ollama.stats["requests"] == 3
+
+
+@pytest.mark.asyncio
+async def test_subscriber_leaving_keeps_the_flight_until_the_last_one_goes():
+    flights = StreamFlight()
+    produced: list[int] = []
+    closed = asyncio.Event()
+
+    async def upstream():
+        try:
+            for i in range(5):
+                await asyncio.sleep(0.01)
+                produced.append(i)
+                yield i
+        finally:
+            closed.set()
+
+    async def take(n: int | None) -> list[int]:
+        got = []
+        async for item in flights.stream("k", upstream):
+            got.append(item)
+            if len(got) == n:
+                break
+        return got
+
+    early, full = await asyncio.gather(take(2), take(None))
+    assert early == [0, 1] and full == [0, 1, 2, 3, 4]
+    assert (flights.started, flights.joined) == (1, 1)
+
+    assert await take(1) == [0]  # alone: leaving cancels the upstream
+    await asyncio.wait_for(closed.wait(), 1)
+    assert not flights.inflight("k")
@@ -0,0 +1,73 @@
+"""Deadline-aware fan-out: slow instances time out with partial text, fast ones finish."""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.main import app
+from app.routers import judge
+from app.services.singleflight import SingleFlight
+
+pytestmark = [
+    pytest.mark.usefixtures("fake_models"),
+    pytest.mark.fake_models(
+        tokens=lambda inst: [f"{i} " for i in range(3 if inst.model == "quick" else 10_000)],
+        delay_s=0.01),
+]
+
+
+def _body(**extra):
+    return {"message": "hi", "timeout_s": 0.2, **extra,
+            "model_instances": [{"id": "slow", "model": "slow"}, {"id": "q", "model": "quick"}]}
+
+
+@pytest.mark.asyncio
+async def test_chat_returns_partial_text_for_instances_past_the_deadline():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/chat", json=_body())
+    data = r.json()
+    assert data["timed_out"] == ["slow"]
+    slow, quick = data["results"]["slow"], data["results"]["q"]
+    assert slow["timed_out"] and slow["error"] is None and slow["assistant"].startswith("0 1 ")
+    assert slow["metrics"]["timed_out"] is True and slow["metrics"]["eval_tokens"] > 0
+    assert not quick["timed_out"] and quick["assistant"] == "0 1 2 "
+    assert 0 <= data["budget_left_s"] < 0.2
+
+
+@pytest.mark.asyncio
+async def test_instance_timeout_is_capped_by_the_request_budget():
+    body = _body(timeout_s=5)
+    body["model_instances"][0]["timeout_s"] = 0.1
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/chat/stream", json=body)
+    events = [json.loads(line) for line in r.text.splitlines()]
+    done = {e["instance_id"]: e for e in events if e["type"] == "done"}
+    assert done["slow"]["timed_out"] is True
+    assert "timed_out" not in done["q"]
+
+
+@pytest.mark.asyncio
+async def test_judge_past_its_budget_is_504_and_the_shared_call_is_cancelled(monkeypatch):
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def hang(req, priority="judge"):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    monkeypatch.setattr(judge, "_run_judge", hang)
+    monkeypatch.setattr(judge, "_flights", SingleFlight())
+    body = {"prompt": "p", "judge_model": "j", "timeout_s": 0.05,
+            "candidates": [{"label": "A", "text": "a"}, {"label": "B", "text": "b"}]}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/judge", json=body)
+    assert r.status_code == 504
+    assert started.is_set()
+    await asyncio.wait_for(cancelled.wait(), 1)
@@ -0,0 +1,100 @@
+"""The fake-Ollama simulator: latency model, residency, and the app talking to it."""
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.main import app
+from app.schemas import ModelInstance
+from app.services import ollama
+from app.testing.fake_ollama import FakeOllama, SimConfig
+
+
+async def _chat(model: str, text: str = "hi") -> list[dict]:
+    inst = ModelInstance(id=model, model=model, seed=1)
+    return [c async for c in ollama.chat_stream(inst, [{"role": "user", "content": text}])]
+
+
+@pytest.mark.asyncio
+async def test_cold_load_is_paid_once_and_output_is_deterministic(fake_ollama):
+    first, second = await _chat("llama3.2:1b"), await _chat("llama3.2:1b")
+    assert first[-1]["load_duration"] >= 0.04 * 1e9 > second[-1]["load_duration"]
+    text = ["".join(c["token"] for c in run) for run in (first, second)]
+    assert text[0] == text[1] and len(text[0].split()) == 8
+    assert first[-1]["eval_count"] == 8 and fake_ollama.stats["loads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_max_loaded_evicts_the_least_recently_used_idle_model(fake_ollama):
+    fake_ollama.config.max_loaded = 2
+    for model in ("llama3.2:1b", "qwen2.5:0.5b", "llama3.2:1b", "gemma3:1b"):
+        await _chat(model)
+    assert fake_ollama.stats["loads"] == 3 and fake_ollama.stats["evictions"] == 1
+    assert {m["name"] for m in await ollama.loaded()} == {"llama3.2:1b", "gemma3:1b"}
+    await ollama.unload("gemma3:1b")
+    assert [m["name"] for m in await ollama.loaded()] == ["llama3.2:1b"]
+
+
+@pytest.mark.asyncio
+async def test_parallel_slots_bound_concurrency_per_model(fake_ollama):
+    fake_ollama.config.time_scale = 1.0
+    fake_ollama.config.output_tokens = 40  # 200 ms per request at 200 tok/s: well above
+    # the per-request HTTP overhead, which would otherwise blur serial vs parallel
+    await ollama.warm("llama3.2:1b")
+
+    async def wall(n: int) -> float:
+        t = time.perf_counter()
+        await asyncio.gather(*(_chat("llama3.2:1b", str(i)) for i in range(n)))
+        return time.perf_counter() - t
+
+    serial = await wall(4)
+    fake_ollama.config.parallel = 4
+    fake_ollama._slots.clear()
+    assert await wall(4) < serial / 2
+
+
+@pytest.mark.asyncio
+async def test_requests_cancelled_while_loading_or_queued_give_their_slot_back():
+    sim = FakeOllama(SimConfig(load_s=0.2, decode_tps=200, output_tokens=8, time_scale=0.25))
+
+    async def chat(model: str) -> list[dict]:
+        return [json.loads(c) async for c in sim._chat_stream({"model": model})]
+
+    loading = asyncio.create_task(chat("llama3.2:1b"))
+    await asyncio.sleep(0.01)  # mid-load (0.05 s)
+    queued = asyncio.create_task(chat("qwen2.5:0.5b"))  # one resident model, and it's busy
+    await asyncio.sleep(0.01)
+    loading.cancel()
+    queued.cancel()
+    await asyncio.gather(loading, queued, return_exceptions=True)
+    for model in ("llama3.2:1b", "qwen2.5:0.5b", "llama3.2:1b"):  # nothing was leaked
+        assert (await asyncio.wait_for(chat(model), 2))[-1]["done"]
+    assert sim.stats["loads"] == 3 and sim.stats["evictions"] == 2
+    assert [r.active for r in sim._loaded.values()] == [0]
+@pytest.mark.asyncio
+async def test_tags_pull_and_structured_judge_output(fake_ollama):
+    assert "gemma3:1b" in {m["name"] for m in await ollama.list_models()}
+    await ollama.pull("phi4:14b")
+    assert "phi4:14b" in {m["name"] for m in await ollama.list_models()}
+    schema = {"type": "object", "properties": {"winner": {"type": "string"},
+                                                "score": {"type": "integer"}}}
+    assert json.loads(await ollama.chat_json("phi4:14b", [], schema)) == {
+        "winner": "A", "score": 5}
+    with pytest.raises(Exception, match="not found"):
+        await _chat("missing:7b")
+
+
+@pytest.mark.asyncio
+async def test_app_streams_a_turn_end_to_end(fake_ollama):
+    body = {"message": "hello", "model_instances": [
+        {"id": "a", "model": "llama3.2:1b"}, {"id": "b", "model": "qwen2.5:0.5b"}]}
+    fake_ollama.config.max_loaded = 2
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/chat/stream", json=body)
+    events = [json.loads(line) for line in r.text.splitlines()]
+    metrics = {e["instance_id"]: e["metrics"] for e in events if e["type"] == "metrics"}
+    assert set(metrics) == {"a", "b"}
+    assert all(m["eval_tokens"] == 8 and m["load_s"] > 0 for m in metrics.values())
@@ -0,0 +1,70 @@
+"""Token-budget history: estimates, memoization, what gets kept, and reported savings."""
+import json
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.main import app
+from app.schemas import ModelInstance
+from app.services import history, ollama
+
+
+def _msgs(*sizes: int) -> list[dict[str, str]]:
+    roles = ["system"] + ["user", "assistant"] * len(sizes)
+    return [{"role": roles[n], "content": "x" * size} for n, size in enumerate(sizes)]
+
+
+def test_estimate_is_memoized_and_counts_non_ascii_per_character():
+    text = "a" * 400 + "unique-memo-probe"
+    hits = history.estimate.cache_info().hits
+    assert history.estimate(text) == history.estimate(text) == 105 + 4
+    assert history.estimate.cache_info().hits == hits + 1
+    assert history.estimate("日本語テキスト") == 7 + 4
+
+
+def test_fit_keeps_system_and_newest_turns_within_the_budget():
+    # system, u, a, u(huge log), a, u, a, u(new): 4-token framing each
+    msgs = _msgs(40, 40, 40, 40_000, 40, 40, 40, 40)
+    kept, dropped, tokens = history.fit(msgs, 200)
+    assert [len(m["content"]) for m in kept] == [40, 40, 40, 40]
+    assert (dropped, tokens) == (4, 3 * 14 + 10_004)
+    assert history.fit(msgs, 10**6) == (msgs, 0, 0)
+    # Never opens on an orphaned assistant reply: u(big) a u -> system, u
+    kept, dropped, _ = history.fit(_msgs(4, 4000, 4, 4), 30)
+    assert [m["role"] for m in kept] == ["system", "user"] and dropped == 2
+
+
+def test_budget_uses_per_model_context_minus_reply(monkeypatch):
+    monkeypatch.setattr(settings, "history_context_by_model", {"big": 32768})
+    assert history.budget(ModelInstance(id="a", model="big", num_predict=1000)) == 31768
+    assert history.budget(ModelInstance(id="b", model="small")) == 4096 - 512
+
+
+@pytest.mark.asyncio
+async def test_token_mode_trims_per_model_and_reports_prefill_saved(monkeypatch):
+    seen: dict[str, int] = {}
+
+    async def fake(inst, messages, priority="interactive"):
+        seen[inst.model] = len(messages)
+        yield {"token": "ok", "done": False}
+        yield {"token": "", "done": True, "eval_count": 1, "eval_duration": 10**6}
+
+    monkeypatch.setattr(ollama, "chat_stream", fake)
+    monkeypatch.setattr(settings, "history_mode", "tokens")
+    monkeypatch.setattr(settings, "history_context_by_model", {"small": 1024, "big": 65536})
+    log = "ERROR at line 7\n" * 1000  # ~4k tokens
+    body = {"message": "why did it fail?", "history": [
+        {"role": "user", "content": log}, {"role": "assistant", "content": "Looks like OOM."},
+        {"role": "user", "content": "and now?"}, {"role": "assistant", "content": "Fixed."}],
+        "model_instances": [{"id": "s", "model": "small"}, {"id": "b", "model": "big"}]}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/chat/stream", json=body)
+        plain = (await c.post("/api/chat", json=body)).json()
+    metrics = {e["instance_id"]: e["metrics"] for e in map(json.loads, r.text.splitlines())
+               if e["type"] == "metrics"}
+    assert seen == {"small": 4, "big": 6}
+    assert metrics["s"]["history_dropped"] == 2 and metrics["s"]["prefill_tokens_saved"] > 4000
+    assert metrics["b"]["prefill_tokens_saved"] == 0
+    assert plain["results"]["s"]["metrics"]["history_dropped"] == 2
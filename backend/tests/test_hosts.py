@@ -0,0 +1,88 @@
+"""Multi-host Ollama: merged catalog, model-aware routing and failover (simulated hosts)."""
+import asyncio
+import socket
+from contextlib import ExitStack
+
+import httpx
+import pytest
+
+from app.main import app
+from app.schemas import ModelInstance
+from app.services import ollama
+from app.services.hosts import HostPool
+from app.testing.fake_ollama import FakeOllama, SimConfig
+
+
+def _dead_url() -> str:
+    with socket.socket() as s:  # bound then closed: nothing listens there
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+@pytest.fixture
+def hosts(monkeypatch):
+    """Two simulated hosts: `a` serves m1 + shared, `b` serves m2 + shared."""
+    sims = {name: FakeOllama(SimConfig(models=models, load_s=0.05, decode_tps=500,
+                                       output_tokens=4, max_loaded=2))
+            for name, models in (("a", ("m1", "shared")), ("b", ("m2", "shared")))}
+    with ExitStack() as stack:
+        for sim in sims.values():
+            stack.enter_context(sim.serve())
+
+        def use(*urls: str) -> HostPool:
+            pool = HostPool(list(urls), ollama._new_client)
+            monkeypatch.setattr(ollama, "pool", pool)
+            return pool
+
+        yield sims, use
+
+
+async def _chat(model: str) -> str:
+    inst = ModelInstance(id=model, model=model)
+    chunks = [c async for c in ollama.chat_stream(inst, [{"role": "user", "content": "q"}])]
+    return "".join(c["token"] for c in chunks)
+
+
+@pytest.mark.asyncio
+async def test_models_merge_catalogs_and_route_to_the_host_that_has_the_model(hosts):
+    sims, use = hosts
+    use(sims["a"].url, sims["b"].url)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        models = {m["name"]: m["hosts"] for m in (await c.get("/api/models")).json()["models"]}
+    assert models == {"m1": [sims["a"].url], "m2": [sims["b"].url],
+                      "shared": [sims["a"].url, sims["b"].url]}
+    await asyncio.gather(_chat("m1"), _chat("m2"))
+    assert sims["a"].stats["requests"] == sims["b"].stats["requests"] == 1
+    assert {m["host"] for m in await ollama.loaded()} == {sims["a"].url, sims["b"].url}
+
+
+@pytest.mark.asyncio
+async def test_resident_host_first_then_fewest_outstanding(hosts):
+    sims, use = hosts
+    pool = use(sims["a"].url, sims["b"].url)
+    await ollama.warm("shared")  # tie -> first host; now resident there
+    await pool.refresh()
+    assert pool.candidates("shared")[0].url == sims["a"].url
+    await _chat("shared")
+    assert sims["a"].stats["requests"] == 1 and sims["b"].stats["requests"] == 0
+
+    sims["a"].config.output_tokens = sims["b"].config.output_tokens = 40
+    pool.hosts[1].resident.add("shared")  # both resident: spread by outstanding
+    await asyncio.gather(*(_chat("shared") for _ in range(4)))
+    assert sims["a"].stats["requests"] == 3 and sims["b"].stats["requests"] == 2
+
+
+@pytest.mark.asyncio
+async def test_unreachable_host_fails_over_and_is_marked_down(hosts):
+    sims, use = hosts
+    pool = use(_dead_url(), sims["b"].url)
+    assert await _chat("m2")
+    assert not pool.hosts[0].healthy and pool.hosts[1].healthy
+    await pool.refresh()  # polls agree; routing now skips the dead host outright
+    assert [h.url for h in pool.candidates("m2")] == [sims["b"].url, pool.hosts[0].url]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        health = (await c.get("/api/health")).json()
+    assert health["ollama_reachable"] is True
+    assert [h["healthy"] for h in health["ollama_hosts"]] == [False, True]
@@ -1,10 +1,18 @@
 """Judge endpoint validation + result parsing (no live model needed)."""
+import asyncio
+import json
+from types import SimpleNamespace
+
 import httpx
 import pytest
 
+from app.config import settings
 from app.main import app
+from app.routers import judge
 from app.routers.judge import _build_user_prompt
 from app.schemas import JudgeRequest, JudgeResult
+from app.services import cloud, ollama
+from app.services.cache import DiskCache
 
 
 @pytest.mark.asyncio
@@ -16,6 +24,16 @@ async def test_judge_requires_two_candidates():
     assert r.status_code == 422  # need >= 2 to compare
 
 
+@pytest.mark.asyncio
+async def test_judge_rejects_a_negative_seed():
+    transport = httpx.ASGITransport(app=app)
+    body = {"prompt": "hi", "judge_model": "m", "seed": -1,
+            "candidates": [{"label": "A", "text": "x"}, {"label": "B", "text": "y"}]}
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/judge", json=body)
+    assert r.status_code == 422  # as ModelInstance.seed
+
+
 def test_judge_result_parses_and_bounds_score():
     res = JudgeResult.model_validate(
         {"verdicts": [{"label": "A", "score": 9, "reason": "clear"}], "winner": "A"}
@@ -57,3 +75,257 @@ def test_judge_prompt_fences_untrusted_candidate_text():
     assert "ARENA_CANDIDATE" in prompt
     # the injection sits after a START fence and before an END fence (i.e. fenced as data)
     assert prompt.index("B START") < prompt.index(inj) < prompt.index("B END")
+
+
+def _two_candidates(judge_model: str = "m") -> JudgeRequest:
+    return JudgeRequest(
+        prompt="q", judge_model=judge_model,
+        candidates=[{"label": "A", "text": "x"}, {"label": "B", "text": "y"}],
+    )
+
+
+_RAW = '{"verdicts":[{"label":"A","score":8,"reason":"ok"},{"label":"B","score":4}],"winner":"A"}'
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_judge_calls_are_coalesced(monkeypatch):
+    calls = 0
+
+    async def fake_run(req, priority="judge"):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return _RAW
+
+    monkeypatch.setattr(judge, "_run_judge", fake_run)
+    results = await asyncio.gather(*(judge._verdict(_two_candidates()) for _ in range(5)))
+    assert calls == 1
+    assert {r.winner for r in results} == {"A"}
+    assert results[0] is not results[1]  # each caller gets its own copy
+
+
+@pytest.mark.asyncio
+async def test_verdict_cache_serves_repeat_requests(monkeypatch, tmp_path):
+    calls = 0
+
+    async def fake_run(req, priority="judge"):
+        nonlocal calls
+        calls += 1
+        return _RAW
+
+    monkeypatch.setattr(judge, "_run_judge", fake_run)
+    monkeypatch.setattr(judge, "_verdicts", DiskCache(tmp_path / "v.sqlite3", 2**20, 60))
+    monkeypatch.setattr(settings, "verdict_cache", True)
+    first = await judge._verdict(_two_candidates())
+    again = await judge._verdict(_two_candidates())
+    other = await judge._verdict(_two_candidates(judge_model="other"))
+    assert calls == 2
+    assert not first.cached and again.cached and not other.cached
+    assert again.winner == "A"
+
+
+@pytest.mark.asyncio
+async def test_panel_stops_once_the_majority_is_locked_in(monkeypatch):
+    finished: list[int | None] = []
+
+    async def fake_run(req, priority="judge"):
+        await asyncio.sleep(0.01 if (req.seed or 0) < 3 else 5)  # seeds 3, 4 are slow
+        finished.append(req.seed)
+        return _RAW
+
+    monkeypatch.setattr(judge, "_run_judge", fake_run)
+    body = {**_two_candidates().model_dump(), "samples": 5}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = (await c.post("/api/judge", json=body)).json()
+    panel = r["panel"]
+    assert r["winner"] == "A" and sorted(finished, key=str) == [1, 2, None]
+    assert panel["completed"] == 3 and panel["skipped"] == 2 and panel["votes"] == {"A": 3}
+    assert panel["unanimous"] and panel["agreement"] == 1.0
+    assert [b["skipped"] for b in panel["ballots"]] == [False] * 3 + [True] * 2
+
+
+@pytest.mark.asyncio
+async def test_panel_aggregates_split_votes_and_failures(monkeypatch):
+    raws = {
+        "j1": '{"verdicts":[{"label":"A","score":9},{"label":"B","score":5}],"winner":"A"}',
+        "j2": '{"verdicts":[{"label":"A","score":5},{"label":"B","score":6}],"winner":"B"}',
+    }
+
+    async def fake_run(req, priority="judge"):
+        if req.judge_model not in raws:
+            raise ValueError("API key required")
+        return raws[req.judge_model]
+
+    monkeypatch.setattr(judge, "_run_judge", fake_run)
+    body = {**_two_candidates("j1").model_dump(),
+            "panel": [{"judge_model": "j2"}, {"judge_model": "j3", "provider": "openai"}]}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = (await c.post("/api/judge", json=body)).json()
+        failed = await c.post("/api/judge", json={**body, "judge_model": "j3", "panel": [
+            {"judge_model": "j4"}]})
+    panel = r["panel"]
+    # One vote each: the tie goes to the higher mean score (A: 7.0 vs B: 5.5).
+    assert r["winner"] == "A" and [v["score"] for v in r["verdicts"]] == [7.0, 5.5]
+    assert panel["votes"] == {"A": 1, "B": 1} and panel["agreement"] == 0.5
+    assert panel["failed"] == 1 and panel["ballots"][2]["error"] == "API key required"
+    assert failed.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_panel_never_counts_one_call_as_several_votes(monkeypatch):
+    calls: list[tuple[str, int | None]] = []
+
+    async def fake_run(req, priority="judge"):
+        calls.append((req.judge_model, req.seed))
+        return _RAW
+
+    monkeypatch.setattr(judge, "_run_judge", fake_run)
+    body = {**_two_candidates("j1").model_dump(), "samples": 2,
+            "panel": [{"judge_model": "j1"}, {"judge_model": "j1", "samples": 2},
+                      {"judge_model": "j2"}]}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = (await c.post("/api/judge", json=body)).json()
+    seeds = [(b["judge_model"], b["seed"]) for b in r["panel"]["ballots"]]
+    assert seeds == [("j1", None), ("j1", 1), ("j1", 2), ("j1", 3), ("j1", 4), ("j2", None)]
+    assert sorted(calls, key=str) == sorted(seeds, key=str)  # every vote its own call
+
+
+_DOC = ('{"verdicts":[{"label":"A","score":7,"reason":"brace } in \\"text\\""},'
+        '["B", 9, "list form"],{"label":"Q","score":1}],"winner":"Z"}')
+
+
+@pytest.mark.asyncio
+async def test_judge_stream_emits_each_verdict_then_the_result(monkeypatch):
+    seen: dict = {}
+
+    class FakeClient:
+        async def chat(self, **kw):
+            seen.update(kw)
+
+            async def pieces():
+                for k in range(0, len(_DOC), 7):
+                    yield SimpleNamespace(message=SimpleNamespace(content=_DOC[k:k + 7]))
+            return pieces()
+
+    monkeypatch.setattr(ollama, "_client", FakeClient())
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/judge/stream", json=_two_candidates().model_dump())
+        panel = await c.post("/api/judge/stream",
+                             json={**_two_candidates().model_dump(), "samples": 3})
+    events = [json.loads(line) for line in r.text.splitlines()]
+    assert seen["stream"] is True and seen["format"] == judge._JUDGE_SCHEMA
+    assert [(e["type"], e.get("label"), e.get("score")) for e in events] == [
+        ("verdict", "A", 7.0), ("verdict", "B", 9.0), ("result", None, None)]
+    assert events[0]["reason"] == 'brace } in "text"'
+    assert events[-1]["winner"] == "B"  # "Z" isn't a candidate: falls back to the top score
+    assert panel.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_judge_stream_deadline_covers_the_judge_not_the_reader(monkeypatch):
+    async def fake_stream(req):
+        for k in range(0, len(_DOC), 7):
+            yield _DOC[k:k + 7]
+
+    async def stuck_stream(req):
+        yield _DOC[:_DOC.index("},") + 2]  # the first verdict, then nothing
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(judge, "_stream_judge", fake_stream)
+    req = JudgeRequest.model_validate({**_two_candidates().model_dump(), "timeout_s": 0.05})
+    body = (await judge.judge_stream(req)).body_iterator
+    first = json.loads(await anext(body))
+    await asyncio.sleep(0.1)  # a slow reader, well past the judge's deadline
+    rest = [json.loads(line) async for line in body]
+    assert first["type"] == "verdict" and [e["type"] for e in rest] == ["verdict", "result"]
+
+    monkeypatch.setattr(judge, "_stream_judge", stuck_stream)
+    events = [json.loads(line) async for line in (await judge.judge_stream(req)).body_iterator]
+    assert [e["type"] for e in events] == ["verdict", "error"]
+    assert events[-1]["status"] == 504
+@pytest.mark.asyncio
+async def test_judge_stream_over_openai_compatible_sse(monkeypatch):
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        if request.headers["authorization"] != "Bearer good":
+            return httpx.Response(401, json={"error": "bad key"})
+        deltas = [_DOC[k:k + 11] for k in range(0, len(_DOC), 11)]
+        sse = "".join(f"data: {json.dumps({'choices': [{'delta': {'content': d}}]})}\n\n"
+                      for d in deltas)
+        return httpx.Response(200, text=": keep-alive\n\n" + sse + "data: [DONE]\n\n")
+
+    base = "http://judge.test/v1"
+    monkeypatch.setitem(cloud._http, ("openai", base),
+                        httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    body = {**_two_candidates().model_dump(), "provider": "openai", "base_url": base}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        ok = await c.post("/api/judge/stream", json={**body, "api_key": "good"})
+        bad = await c.post("/api/judge/stream", json={**body, "api_key": "bad"})
+    events = [json.loads(line) for line in ok.text.splitlines()]
+    assert bodies[0]["stream"] is True
+    assert [e["type"] for e in events] == ["verdict", "verdict", "result"]
+    assert events[-1]["winner"] == "B"
+    assert json.loads(bad.text) == {
+        "type": "error", "status": 502, "error": "judge failed — see server logs for details."}
+
+
+@pytest.mark.asyncio
+async def test_judge_batch_streams_in_completion_order_and_resumes(monkeypatch):
+    active = {"local": 0, "anthropic": 0}
+    peak = dict(active)
+
+    async def fake_run(req, priority="judge"):
+        active[req.provider] += 1
+        peak[req.provider] = max(peak[req.provider], active[req.provider])
+        await asyncio.sleep(0.1 if req.prompt == "q0" else 0.01)
+        active[req.provider] -= 1
+        if req.prompt == "q2":
+            raise ValueError("API key required")
+        return _RAW
+
+    monkeypatch.setattr(judge, "_run_judge", fake_run)
+    monkeypatch.setattr(settings, "judge_batch_provider_limits", {"anthropic": 1})
+    items = [{**_two_candidates().model_dump(), "prompt": f"q{i}",
+              "provider": "anthropic" if i >= 3 else "local"} for i in range(6)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/judge/batch", json={"items": items, "concurrency": 4})
+        resumed = await c.post("/api/judge/batch", json={"items": items, "offset": 4})
+        neither = await c.post("/api/judge/batch", json={})
+    events = [json.loads(line) for line in r.text.splitlines()]
+    *done, end = events
+    assert sorted(e["index"] for e in done) == list(range(6)) and done[-1]["index"] == 0
+    assert all(e["resume_offset"] == 0 for e in done[:-1]) and done[-1]["resume_offset"] == 6
+    assert done[0]["result"]["winner"] == "A"
+    assert [e["error"] for e in done if "error" in e] == ["API key required"]
+    assert end == {"type": "end", "total": 6, "judged": 5, "failed": 1, "skipped": 0,
+                   "resume_offset": 6}
+    assert peak["anthropic"] == 1
+    assert [json.loads(line).get("index") for line in resumed.text.splitlines()] in (
+        [4, 5, None], [5, 4, None])
+    assert neither.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_judge_batch_tasks_scale_with_concurrency_not_items(monkeypatch):
+    alive: list[int] = []
+
+    async def fake_run(req, priority="judge"):
+        alive.append(len(asyncio.all_tasks()))
+        await asyncio.sleep(0)
+        return _RAW
+
+    monkeypatch.setattr(judge, "_run_judge", fake_run)
+    items = [{**_two_candidates().model_dump(), "prompt": f"q{i}"} for i in range(300)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/judge/batch", json={"items": items, "concurrency": 3})
+    assert json.loads(r.text.splitlines()[-1])["judged"] == 300
+    assert len(alive) == 300 and max(alive) < 20
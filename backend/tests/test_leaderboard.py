@@ -0,0 +1,96 @@
+"""Leaderboard: pairwise counts, Bradley-Terry fit, bootstrap CIs, and the endpoint."""
+import json
+import time
+
+import httpx
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.main import app
+from app.routers import judge
+from app.services import leaderboard
+from app.services.leaderboard import PairCounts, ratings
+
+
+def test_counts_fold_in_every_pair_of_a_judged_turn():
+    c = PairCounts()
+    c.add_scores({"a": 9, "b": 5, "c": 5})
+    models, wins, ties, version = c.snapshot()
+    assert models == ["a", "b", "c"] and version == 3
+    assert wins[0, 1] == wins[0, 2] == 1 and wins[1:, 0].sum() == 0
+    assert ties[1, 2] == ties[2, 1] == 1
+
+
+def test_ratings_order_models_and_bound_them():
+    c = PairCounts()
+    c.add("strong", "mid", wins=70, losses=30)
+    c.add("mid", "weak", wins=70, losses=30)
+    c.add("strong", "weak", wins=85, losses=15, ties=10)
+    board = ratings(c, bootstrap=500)
+    assert [r["model"] for r in board["models"]] == ["strong", "mid", "weak"]
+    assert board["comparisons"] == 310
+    for r in board["models"]:
+        assert r["ci_low"] < r["rating"] < r["ci_high"]
+    strong, mid, _ = board["models"]
+    assert strong["ci_low"] > mid["rating"]  # 155:55 over two opponents is not noise
+
+
+def test_fifty_models_and_a_million_comparisons_is_a_small_problem():
+    rng = np.random.default_rng(0)
+    c = PairCounts()
+    for k in range(50):
+        c._slot(f"m{k}")
+    c.wins[:50, :50] = rng.multinomial(1_000_000, np.full(2500, 1 / 2500)).reshape(50, 50)
+    np.fill_diagonal(c.wins, 0)
+    ratings(c, bootstrap=settings.leaderboard_bootstrap)
+    # The refit the endpoint does after each new verdict, at the configured bootstrap.
+    elapsed = []
+    for k in range(5):
+        c.add_scores({"m1": 9, "m2": 5, "m3": 5, f"new{k}": 1})
+        t0 = time.perf_counter()
+        board = ratings(c, bootstrap=settings.leaderboard_bootstrap)
+        elapsed.append(time.perf_counter() - t0)
+    assert min(elapsed) < 0.1
+    assert len(board["models"]) == 55
+    assert board["comparisons"] == int(c.wins.sum() + c.ties.sum() // 2)
+    assert all(r["ci_low"] <= r["rating"] <= r["ci_high"] for r in board["models"])
+    # Topped-up resamples are still Poisson around the counts they now stand for.
+    _, wins, ties, _ = c.snapshot()
+    boot_wins, boot_ties = c.resampled(wins, ties, settings.leaderboard_bootstrap, 0)
+    n = len(c.models)
+    assert np.allclose(boot_wins.mean(0), c.wins[:n, :n], rtol=0.05, atol=1)
+    assert (boot_ties == boot_ties.transpose(0, 2, 1)).all() and boot_ties[:, 2, 3].sum() > 0
+
+
+def test_a_refit_only_resamples_the_new_comparisons():
+    c = PairCounts()
+    c.add("a", "b", wins=40, losses=20)
+    c.add("b", "c", wins=30, losses=30, ties=5)
+    before = c.resampled(*c.snapshot()[1:3], 100, 0)
+    c.add("a", "c", wins=1)
+    _, wins, ties, _ = c.snapshot()
+    after = c.resampled(wins, ties, 100, 0)
+    changed = [tuple(ix) for ix in np.argwhere((after[0] != before[0]).any(0))]
+    assert changed == [(0, 2)] and (after[1] == before[1]).all()
+    assert (c.resampled(wins, ties, 100, 1)[0] != after[0]).any()  # a new seed redraws
+@pytest.mark.asyncio
+async def test_judge_verdicts_update_the_leaderboard(monkeypatch):
+    async def fake_run(req, priority="judge"):
+        return json.dumps({"verdicts": [{"label": "A", "score": 9, "reason": ""},
+                                        {"label": "B", "score": 2, "reason": ""}],
+                           "winner": "A"})
+
+    monkeypatch.setattr(judge, "_run_judge", fake_run)
+    monkeypatch.setattr(leaderboard, "board", PairCounts())
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        for k in range(3):
+            await c.post("/api/judge", json={
+                "prompt": f"q{k}", "judge_model": "j",
+                "candidates": [{"label": "A", "text": "a", "model": "llama"},
+                               {"label": "B", "text": "b", "model": "qwen"}]})
+        board = (await c.get("/api/leaderboard", params={"bootstrap": 0})).json()
+    assert [(r["model"], r["wins"], r["losses"]) for r in board["models"]] == [
+        ("llama", 3, 0), ("qwen", 0, 3)]
+    assert "ci_low" not in board["models"][0]
@@ -0,0 +1,59 @@
+"""Model warm-up / unload / resident view and per-instance keep_alive (Ollama stubbed)."""
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.main import app
+from app.schemas import ModelInstance
+from app.services import ollama
+
+
+class _FakeClient:
+    def __init__(self):
+        self.generated: list[tuple[str, object]] = []
+
+    async def generate(self, model, prompt, keep_alive=None):
+        if model == "missing":
+            raise RuntimeError("model 'missing' not found")
+        self.generated.append((model, keep_alive))
+        return SimpleNamespace(load_duration=2 * 10**9)
+
+    async def ps(self):
+        return SimpleNamespace(models=[SimpleNamespace(
+            model="m1", size=10, size_vram=8, expires_at=datetime(2030, 1, 1, tzinfo=UTC))])
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = _FakeClient()
+    monkeypatch.setattr(ollama, "_client", client)
+    return client
+
+
+def test_keep_alive_unitless_values_become_seconds():
+    assert ollama.keep_alive_value("10m") == "10m"
+    assert ollama.keep_alive_value("-1") == -1
+    assert ollama.keep_alive_value(None) is None
+
+
+def test_keep_alive_rejects_garbage():
+    with pytest.raises(ValueError):
+        ModelInstance(id="x", model="m", keep_alive="forever")
+
+
+@pytest.mark.asyncio
+async def test_warm_loads_models_in_parallel_and_reports_failures(fake_client):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/models/warm",
+                         json={"models": ["m1", "missing"], "keep_alive": "30m"})
+        loaded = await c.get("/api/models/loaded")
+        gone = await c.post("/api/models/unload", json={"models": ["m1"]})
+    by_name = {m["model"]: m for m in r.json()["models"]}
+    assert by_name["m1"] == {"model": "m1", "load_s": 2.0, "error": None}
+    assert "not found" in by_name["missing"]["error"]
+    assert loaded.json()["models"][0]["size_vram"] == 8
+    assert gone.json()["unloaded"] == ["m1"]
+    assert fake_client.generated == [("m1", "30m"), ("m1", 0)]
@@ -0,0 +1,50 @@
+"""Perf tooling: microbenchmark harness, percentile maths and the load generator."""
+import httpx
+import pytest
+
+from app.main import app
+from app.services.store import ResultStore
+from app.testing import bench, loadgen, report
+from app.testing.fake_ollama import serve_app
+
+
+def test_bench_runs_every_case():
+    results = bench.run(number=3, repeat=2)
+    assert set(results) == set(bench.cases())
+    assert all(r["best_us"] > 0 and r["median_us"] >= r["best_us"] for r in results.values())
+
+
+def test_percentiles_are_nearest_rank_in_ms_and_compare_is_relative():
+    p = report.percentiles([i / 1000 for i in range(1, 101)])
+    assert (p["p50"], p["p95"], p["p99"], p["mean"]) == (50, 95, 99, 50.5)
+    old = {"results": {"x": {"p50": 10.0}, "label": "a"}}
+    new = {"results": {"x": {"p50": 12.0}, "label": "b"}}
+    assert report.compare(old, new) == {"x.p50": {"old": 10.0, "new": 12.0, "change": 0.2}}
+
+
+@pytest.mark.asyncio
+async def test_loadgen_replays_traffic_against_the_app(fake_ollama):
+    fake_ollama.config.max_loaded = 2
+    with serve_app(app) as url:
+        async with httpx.AsyncClient(base_url=url) as client:
+            out = await loadgen.run(client, loadgen.builtin_traffic(), concurrency=3,
+                                    requests=8)
+    assert out["requests"] == 8 and out["errors"] == 0
+    stream = out["by_path"]["/api/chat/stream"]
+    assert stream["requests"] == 4 and stream["ttft_ms"]["p50"] is not None
+    assert stream["events"] > 0 and out["by_path"]["/api/judge"]["ttft_ms"]["p50"] is None
+    assert out["latency_ms"]["p99"] >= out["latency_ms"]["p50"] > 0
+
+
+def test_traffic_is_rebuilt_from_the_result_store(tmp_path):
+    store = ResultStore(tmp_path / "r.sqlite3")
+    store.put_turn("t1", "why?", "sys")
+    for iid, model in (("a", "m1"), ("b", "m2")):
+        store.put_answer("t1", iid, model, "done", f"because {model}", None, {})
+    store.put_verdict("t1", "why?", "local", "judge", "A", False, [])
+    store.put_turn("t2", "unanswered", "")
+    chat, judge = loadgen.traffic_from_store(str(tmp_path / "r.sqlite3"))
+    assert chat["body"]["model_instances"] == [{"id": "a", "model": "m1"},
+                                               {"id": "b", "model": "m2"}]
+    assert judge["path"] == "/api/judge" and judge["body"]["judge_model"] == "judge"
+    assert [c["text"] for c in judge["body"]["candidates"]] == ["because m1", "because m2"]
@@ -0,0 +1,149 @@
+"""Result store: persistence from /chat/stream and /judge, indexed + paginated queries."""
+import json
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.main import app
+from app.routers import judge
+from app.services import leaderboard, store
+from app.services.leaderboard import PairCounts
+from app.services.store import ResultStore
+
+pytestmark = pytest.mark.fake_models(tokens=lambda inst: ["hello ", inst.model])
+
+
+@pytest.fixture
+def results(fake_models, monkeypatch, tmp_path):
+    rs = ResultStore(tmp_path / "results.sqlite3")
+    monkeypatch.setattr(settings, "result_store", True)
+    monkeypatch.setattr(store, "results", rs)
+    return rs
+
+
+def test_pages_are_newest_first_and_filter_by_model(tmp_path):
+    rs = ResultStore(tmp_path / "r.sqlite3")
+    for i in range(5):
+        rs.put_turn(f"t{i}", f"prompt {i}", "sys")
+        rs.put_answer(f"t{i}", "x", "llama" if i % 2 else "qwen", "done", "ok", None, {})
+    first = rs.turns(limit=2)
+    assert [t["id"] for t in first["items"]] == ["t4", "t3"]
+    second = rs.turns(limit=2, cursor=first["next_cursor"])
+    assert [t["id"] for t in second["items"]] == ["t2", "t1"]
+    last = rs.turns(limit=2, cursor=second["next_cursor"])
+    assert [t["id"] for t in last["items"]] == ["t0"] and last["next_cursor"] is None
+    assert [a["turn_id"] for a in rs.answers(model="llama")["items"]] == ["t3", "t1"]
+    assert [t["id"] for t in rs.turns(model="qwen")["items"]] == ["t4", "t2", "t0"]
+
+
+@pytest.mark.asyncio
+async def test_stream_and_judge_are_persisted_and_queryable(results, monkeypatch):
+    async def fake_run(req, priority="judge"):
+        return json.dumps({"verdicts": [{"label": "A", "score": 8, "reason": "ok"},
+                                        {"label": "B", "score": 3, "reason": "meh"}],
+                           "winner": "A"})
+
+    monkeypatch.setattr(judge, "_run_judge", fake_run)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        for m in ("llama", "qwen"):  # the UI streams one request per model
+            await c.post("/api/chat/stream", json={
+                "message": "hi", "turn_id": "turn1", "session_id": "s1",
+                "model_instances": [{"id": f"{m}-1", "model": m}]})
+        await c.post("/api/judge", json={
+            "prompt": "hi", "judge_model": "j", "turn_id": "turn1",
+            "candidates": [{"label": "A", "text": "hello llama", "model": "llama"},
+                           {"label": "B", "text": "hello qwen", "model": "qwen"}]})
+        await store.flush()
+        turns = (await c.get("/api/results/turns", params={"session_id": "s1"})).json()
+        verdicts = (await c.get("/api/results/verdicts", params={"model": "qwen"})).json()
+        turn = (await c.get("/api/results/turns/turn1")).json()
+
+    assert len(turns["items"]) == 1
+    answers = {a["model"]: a for a in turns["items"][0]["answers"]}
+    assert answers["llama"]["text"] == "hello llama" and answers["llama"]["status"] == "done"
+    assert answers["qwen"]["metrics"]["eval_tokens"] == 2
+    [v] = verdicts["items"]
+    assert v["winner"] == "A" and v["turn_id"] == "turn1"
+    assert {s["model"]: s["score"] for s in v["scores"]} == {"llama": 8, "qwen": 3}
+    assert turn["verdicts"][0]["seq"] == v["seq"]
+
+
+@pytest.mark.asyncio
+async def test_queries_are_404_when_the_store_is_off():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.get("/api/results/turns")
+    assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_stored_turns_can_be_rejudged_in_bulk(results, monkeypatch):
+    judged = []
+
+    async def fake_run(req, priority="judge"):
+        judged.append((req.judge_model, [c.text for c in req.candidates]))
+        return json.dumps({"verdicts": [{"label": "A", "score": 4}, {"label": "B", "score": 9}],
+                           "winner": "B"})
+
+    monkeypatch.setattr(judge, "_run_judge", fake_run)
+    for i, models in enumerate((["llama", "qwen"], ["llama"], ["llama", "qwen"])):
+        results.put_turn(f"t{i}", f"prompt {i}", "sys")
+        for m in models:
+            results.put_answer(f"t{i}", m, m, "done", f"{m} on {i}", None, {})
+    body = {"stored": {"model": "llama"}, "judge": {"judge_model": "new-judge"}}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/judge/batch", json=body)
+        tail = await c.post("/api/judge/batch", json={**body, "offset": 2})
+        page = await c.post("/api/judge/batch",
+                            json={**body, "stored": {"model": "llama", "limit": 1}, "offset": 1})
+        await store.flush()
+        stored = (await c.get("/api/results/verdicts",
+                              params={"judge_model": "new-judge"})).json()
+
+    events = {e["index"]: e for e in map(json.loads, r.text.splitlines()) if "index" in e}
+    assert events[1]["skipped"] == "fewer than two finished answers"
+    assert events[0]["result"]["winner"] == events[2]["result"]["winner"] == "B"
+    assert [json.loads(line).get("index") for line in tail.text.splitlines()] == [2, None]
+    assert [json.loads(line).get("index") for line in page.text.splitlines()] == [1, None]
+    assert judged[0] == ("new-judge", ["llama on 0", "qwen on 0"])
+    assert sorted(v["turn_id"] for v in stored["items"]) == ["t0", "t2", "t2"]
+    assert {s["model"]: s["score"] for s in stored["items"][0]["scores"]} == {
+        "llama": 4, "qwen": 9}
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_reloaded_from_the_store_matches_the_live_one(results, monkeypatch):
+    raws = [
+        [("A", 8), ("B", 3), ("C", 5)],  # llama under two labels: counted once, as C
+        [("A", 4), ("B", 4), ("C", 9)],
+        [("A", 2), ("B", 7), ("C", 7)],
+    ]
+
+    async def fake_run(req, priority="judge"):
+        scores = raws[int(req.prompt[1:])]
+        return json.dumps({"verdicts": [{"label": lbl, "score": s, "reason": ""}
+                                        for lbl, s in scores], "winner": "A"})
+
+    monkeypatch.setattr(judge, "_run_judge", fake_run)
+    monkeypatch.setattr(leaderboard, "board", PairCounts())
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        for k in range(3):
+            await c.post("/api/judge", json={
+                "prompt": f"q{k}", "judge_model": "j",
+                "candidates": [{"label": "A", "text": "a", "model": "llama"},
+                               {"label": "B", "text": "b", "model": "qwen"},
+                               {"label": "C", "text": "c", "model": "llama"}]})
+    await store.flush()
+    reloaded = PairCounts()
+    reloaded.load(results.pair_outcomes())
+
+    def outcomes(counts):
+        return {(r["model"], r["wins"], r["losses"], r["ties"])
+                for r in leaderboard.ratings(counts, bootstrap=0)["models"]}
+
+    assert outcomes(reloaded) == outcomes(leaderboard.board) == {
+        ("llama", 2, 0, 1), ("qwen", 0, 2, 1)}
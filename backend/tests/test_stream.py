@@ -0,0 +1,49 @@
+"""/chat/stream NDJSON framing: per-token default, coalescing, and the text echo."""
+import json
+
+import httpx
+import pytest
+
+from app.main import app
+
+_TOKENS = [f"t{i} " for i in range(50)]
+
+
+pytestmark = [
+    pytest.mark.usefixtures("fake_models"),
+    pytest.mark.fake_models(tokens=lambda inst: _TOKENS, delay_s=0.001),
+]
+
+
+async def _events(**opts):
+    body = {"message": "hi", "model_instances": [{"id": "a", "model": "m"}], **opts}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/chat/stream", json=body)
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+@pytest.mark.asyncio
+async def test_default_stream_sends_one_event_per_token():
+    events = await _events()
+    assert [e["token"] for e in events if e["type"] == "token"] == _TOKENS
+    assert [e["type"] for e in events[-2:]] == ["metrics", "done"]
+    assert events[-1]["text"] == "".join(_TOKENS)
+
+
+@pytest.mark.asyncio
+async def test_coalescing_merges_tokens_without_losing_text():
+    events = await _events(coalesce_ms=1000, echo_text=False)
+    tokens = [e["token"] for e in events if e["type"] == "token"]
+    assert len(tokens) == 1  # one window covers the whole (fast) generation
+    assert "".join(tokens) == "".join(_TOKENS)
+    assert [e["type"] for e in events[-2:]] == ["metrics", "done"]
+    assert "text" not in events[-1]
+
+
+@pytest.mark.asyncio
+async def test_coalescing_byte_cap_flushes_early():
+    events = await _events(coalesce_ms=1000, coalesce_bytes=40)
+    tokens = [e["token"] for e in events if e["type"] == "token"]
+    assert 1 < len(tokens) < len(_TOKENS)
+    assert "".join(tokens) == "".join(_TOKENS)
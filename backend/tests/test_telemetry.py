@@ -0,0 +1,47 @@
+"""Telemetry: histogram/counter exposition and what /api/metrics records per model."""
+import httpx
+import pytest
+
+from app.main import app
+from app.services import ollama, telemetry
+from app.services.telemetry import Histogram
+
+
+def test_histogram_buckets_are_cumulative_with_inf_sum_and_count():
+    h = Histogram("t_seconds", "help", (0.1, 1.0), ("model",))
+    for v in (0.05, 0.1, 0.5, 7):
+        h.observe(v, 'we"ird')
+    lines = h.render()
+    assert lines[:2] == ["# HELP t_seconds help", "# TYPE t_seconds histogram"]
+    assert lines[2:] == [
+        't_seconds_bucket{model="we\\"ird",le="0.1"} 2',
+        't_seconds_bucket{model="we\\"ird",le="1"} 3',
+        't_seconds_bucket{model="we\\"ird",le="+Inf"} 4',
+        't_seconds_sum{model="we\\"ird"} 7.65',
+        't_seconds_count{model="we\\"ird"} 4',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_generations_by_model(monkeypatch):
+    async def fake(inst, messages, priority="interactive"):
+        if inst.model == "broken":
+            raise RuntimeError("model not found")
+        yield {"token": "hi", "done": False}
+        yield {"token": "", "done": True, "eval_count": 4, "eval_duration": 2 * 10**8,
+               "load_duration": 10**8}
+
+    monkeypatch.setattr(ollama, "chat_stream", fake)
+    before = telemetry.ttft.count("tele-ok")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        await c.post("/api/chat", json={"message": "x", "model_instances": [
+            {"id": "a", "model": "tele-ok"}, {"id": "b", "model": "broken"}]})
+        r = await c.get("/api/metrics")
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert telemetry.ttft.count("tele-ok") == before + 1
+    assert 'arena_decode_tokens_per_second_bucket{model="tele-ok",le="20"} ' in body
+    assert 'arena_ollama_errors_total{model="broken"} 1' in body
+    assert 'arena_generations_total{model="tele-ok",status="done"}' in body
+    assert "arena_active_streams 0" in body
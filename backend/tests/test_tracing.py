@@ -0,0 +1,77 @@
+"""Request tracing: spans for a streamed turn and a judge call, JSONL export."""
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.main import app
+from app.routers import judge
+from app.services import ollama, tracing
+
+
+class _FakeClient:
+    async def chat(self, **kw):
+        async def gen():
+            for tok in ("Hel", "lo"):
+                yield SimpleNamespace(message=SimpleNamespace(content=tok), done=False)
+            yield SimpleNamespace(message=SimpleNamespace(content=""), done=True,
+                                  eval_count=2, eval_duration=10**8)
+
+        return gen()
+
+
+@pytest.fixture
+def traced(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "tracing", True)
+    monkeypatch.setattr(settings, "trace_file", str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(ollama, "_client", _FakeClient())
+    yield tmp_path / "traces.jsonl"
+    tracing.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_trace_has_the_turn_timeline(traced):
+    body = {"message": "hi", "request_id": "traced1",
+            "model_instances": [{"id": "a", "model": "m1"}, {"id": "b", "model": "m2"}]}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        await c.post("/api/chat/stream", json=body)
+        trace = (await c.get("/api/traces/traced1")).json()
+        listed = (await c.get("/api/traces")).json()["traces"]
+    names = [s["name"] for s in trace["spans"]]
+    assert names[0] == "messages"
+    for name in ("queue_wait", "ollama.first_chunk", "ollama.last_chunk"):
+        assert sorted(s["model"] for s in trace["spans"] if s["name"] == name) == ["m1", "m2"]
+    [ser] = [s for s in trace["spans"] if s["name"] == "serialize"]
+    assert ser["events"] >= 6  # tokens + metrics + done, per model
+    assert trace["models"] == ["m1", "m2"] and trace["duration_ms"] > 0
+    assert listed[0]["id"] == "traced1"
+    tracing.close()  # flush the writer thread
+    [line] = traced.read_text().splitlines()
+    assert json.loads(line)["id"] == "traced1"
+
+
+@pytest.mark.asyncio
+async def test_judge_trace_splits_call_and_parse(traced, monkeypatch):
+    async def fake_run(req, priority="judge"):
+        return '{"verdicts":[{"label":"A","score":7,"reason":""}],"winner":"A"}'
+
+    monkeypatch.setattr(judge, "_run_judge", fake_run)
+    body = {"prompt": "trace me", "judge_model": "j",
+            "candidates": [{"label": "A", "text": "a"}, {"label": "B", "text": "b"}]}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.post("/api/judge", json=body)
+        trace = (await c.get(f"/api/traces/{r.headers['X-Trace-Id']}")).json()
+    assert [s["name"] for s in trace["spans"]] == ["judge.prompt", "judge.call", "judge.parse"]
+
+
+@pytest.mark.asyncio
+async def test_no_trace_id_when_tracing_is_off():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        r = await c.get("/api/traces/nope")
+    assert r.status_code == 404
+    assert tracing.current() is None
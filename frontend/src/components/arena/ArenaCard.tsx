@@ -89,9 +89,17 @@ export function ArenaCard({
               <Zap size={11} /> {m ? `${m.tokens_per_sec}` : "—"}
             </span>
           </Tip>
-          <Tip content="Time to first token (latency)">
+          <Tip
+            content={
+              m?.load_s != null
+                ? `Time to first token — load ${m.load_s}s · prefill ${m.prefill_s ?? 0}s` +
+                  (m.prefill_tokens_per_sec ? ` (${m.prefill_tokens_per_sec} tok/s)` : "")
+                : "Time to first token (latency)"
+            }
+          >
             <span className="inline-flex cursor-help items-center gap-1">
               <Clock size={11} /> {m?.first_token_s != null ? `${m.first_token_s}s` : "—"}
+              {m?.cold_load && <span className="text-ember">cold</span>}
             </span>
           </Tip>
           <Tip content="Total tokens generated">
@@ -60,6 +60,7 @@ export function ComparisonView() {
         let fastestId = "";
         let best = -1;
         for (const id of ordered) {
+          if (turn.responses[id]?.metrics?.cached) continue; // replayed, not a speed result
           const tps = turn.responses[id]?.metrics?.tokens_per_sec ?? -1;
           if (tps > best) [best, fastestId] = [tps, id];
         }
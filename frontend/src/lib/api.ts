@@ -1,4 +1,11 @@
-import type { ChatRequest, JudgeRequest, JudgeResult, Metrics, ModelInfo } from "./types";
+import type {
+  Board,
+  ChatRequest,
+  JudgeRequest,
+  JudgeResult,
+  Metrics,
+  ModelInfo,
+} from "./types";
 
 export interface ChatResults {
   results: Record<
@@ -79,3 +86,43 @@ export async function deleteModel(name: string): Promise<void> {
   });
   if (!r.ok) throw new Error(`delete ${name} -> ${r.status}`);
 }
+
+// Preload models (zero-token generation) so the first compare turn skips load time.
+export async function warmModels(
+  models: string[],
+  keepAlive?: string,
+): Promise<{ model: string; load_s: number | null; error: string | null }[]> {
+  const r = await fetch("/api/models/warm", {
+    method: "POST",
+    headers: headers(),
+    body: JSON.stringify({ models, keep_alive: keepAlive }),
+  });
+  if (!r.ok) throw new Error(`warm -> ${r.status}`);
+  return (await r.json()).models;
+}
+
+export async function unloadModels(models: string[]): Promise<void> {
+  const r = await fetch("/api/models/unload", {
+    method: "POST",
+    headers: headers(),
+    body: JSON.stringify({ models }),
+  });
+  if (!r.ok) throw new Error(`unload -> ${r.status}`);
+}
+
+// Models currently resident in Ollama memory (`ollama ps`).
+export async function loadedModels(): Promise<
+  { name: string; size: number; size_vram: number; expires_at: string | null }[]
+> {
+  const r = await fetch("/api/models/loaded", { headers: headers() });
+  if (!r.ok) throw new Error(`GET /api/models/loaded -> ${r.status}`);
+  return (await r.json()).models;
+}
+
+// Judge-verdict ratings across every session the backend has seen, with CIs.
+export async function leaderboard(bootstrap?: number): Promise<Board> {
+  const q = bootstrap === undefined ? "" : `?bootstrap=${bootstrap}`;
+  const r = await fetch(`/api/leaderboard${q}`, { headers: headers() });
+  if (!r.ok) throw new Error(`GET /api/leaderboard -> ${r.status}`);
+  return r.json();
+}
@@ -9,6 +9,8 @@ export interface ModelInstance {
   repeat_penalty?: number; // 1.0–2.0
   num_predict?: number; // -1–4096
   seed?: number; // 0+ (0 = random)
+  keep_alive?: string; // Ollama duration ("10m") or seconds ("-1" = stay loaded)
+  timeout_s?: number; // per-instance budget, capped by the request's
 }
 
 export interface ChatMessage {
@@ -21,19 +23,40 @@ export interface ChatRequest {
   history: ChatMessage[];
   system?: string;
   model_instances: ModelInstance[];
+  coalesce_ms?: number; // /chat/stream: merge tokens over this window into one event
+  coalesce_bytes?: number;
+  echo_text?: boolean; // false: `done` omits the full text
+  timeout_s?: number; // turn budget; late instances end with partial text + timed_out
+  turn_id?: string; // result store: groups the per-model requests of one turn
+  session_id?: string;
 }
 
 export interface Metrics {
   eval_tokens: number;
   duration_s: number;
   first_token_s: number | null;
-  tokens_per_sec: number;
+  tokens_per_sec: number; // decode rate
+  first_token_warm_s?: number | null; // TTFT minus model load time
+  load_s?: number;
+  cold_load?: boolean; // the model had to be loaded for this turn
+  prefill_tokens?: number;
+  prefill_s?: number;
+  prefill_tokens_per_sec?: number | null;
+  total_s?: number;
+  queue_wait_s?: number; // time waiting for a backend admission slot (not latency)
+  cached?: boolean; // replayed from the response cache — not a real speed measurement
+  shared?: boolean; // joined an identical deterministic generation already running
+  history_dropped?: number; // ARENA_HISTORY_MODE=tokens: older messages left out
+  prefill_tokens_saved?: number; // ...and their estimated tokens
+  cancelled?: boolean;
+  timed_out?: boolean; // hit the deadline — partial text, partial metrics
 }
 
 export type StreamEvent =
   | { type: "token"; instance_id: string; token: string }
   | { type: "metrics"; instance_id: string; metrics: Metrics }
-  | { type: "done"; instance_id: string; text: string }
+  | { type: "done"; instance_id: string; text?: string; timed_out?: boolean }
+  | { type: "cancelled"; instance_id: string }
   | { type: "error"; instance_id: string; error: string };
 
 export interface ModelInfo {
@@ -41,6 +64,7 @@ export interface ModelInfo {
   size: number | null;
   family: string | null;
   params: string | null;
+  hosts?: string[]; // multi-host ARENA_OLLAMA_HOST: which hosts have it pulled
 }
 
 // ---- LLM-as-judge ----
@@ -49,10 +73,23 @@ export type JudgeProvider = "local" | "anthropic" | "openai" | "openrouter";
 export interface JudgeRequest {
   prompt: string;
   judge_model: string;
-  candidates: { label: string; text: string }[];
+  candidates: { label: string; text: string; model?: string }[]; // model: store only
   provider: JudgeProvider;
   api_key?: string;
   base_url?: string;
+  timeout_s?: number; // verdict budget (504 when exceeded)
+  turn_id?: string;
+  seed?: number; // local judge sampling seed
+  samples?: number; // votes from this judge (self-consistency)
+  panel?: PanelJudge[]; // more judges voting at once
+}
+
+export interface PanelJudge {
+  judge_model: string;
+  provider: JudgeProvider;
+  api_key?: string;
+  base_url?: string;
+  samples?: number;
 }
 
 export interface Verdict {
@@ -64,4 +101,74 @@ export interface Verdict {
 export interface JudgeResult {
   verdicts: Verdict[];
   winner: string;
+  cached?: boolean; // served from the backend verdict cache
+  panel?: PanelStats; // present when several judges voted
+}
+
+// NDJSON events from POST /api/judge/stream
+export type JudgeStreamEvent =
+  | ({ type: "verdict" } & Verdict) // one candidate, as soon as the judge finished it
+  | ({ type: "result" } & JudgeResult) // same as /api/judge; final scores may differ
+  | { type: "error"; status: number; error: string };
+
+// NDJSON events from POST /api/judge/batch (items arrive in completion order)
+export type JudgeBatchEvent =
+  | {
+      type: "item";
+      index: number;
+      resume_offset: number; // every item below this is done: resend with offset=this
+      result?: JudgeResult;
+      error?: string;
+      status?: number;
+      skipped?: string;
+    }
+  | {
+      type: "end";
+      total: number;
+      judged: number;
+      failed: number;
+      skipped: number;
+      resume_offset: number;
+    };
+
+export interface Ballot {
+  judge_model: string;
+  provider: string;
+  seed: number | null;
+  winner: string;
+  cached: boolean;
+  error: string | null;
+  skipped: boolean; // cancelled once the winner was locked in
+}
+
+export interface PanelStats {
+  judges: number;
+  completed: number;
+  failed: number;
+  skipped: number; // judge calls saved by stopping early
+  votes: Record<string, number>;
+  agreement: number;
+  unanimous: boolean;
+  ballots: Ballot[];
+}
+
+// ---- Server-side leaderboard (GET /api/leaderboard) ----
+export interface BoardRow {
+  rank: number;
+  model: string;
+  rating: number; // Bradley-Terry on the Elo scale
+  ci_low?: number; // bootstrap interval (absent when bootstrap=0)
+  ci_high?: number;
+  wins: number;
+  losses: number;
+  ties: number;
+  matches: number;
+}
+
+export interface Board {
+  models: BoardRow[];
+  comparisons: number;
+  bootstrap: number;
+  version: number;
+  elapsed_ms: number;
 }
@@ -11,6 +11,15 @@ export interface Metrics {
   duration_s: number;
   first_token_s: number | null;
   tokens_per_sec: number;
+  first_token_warm_s?: number | null;
+  load_s?: number;
+  cold_load?: boolean;
+  prefill_tokens?: number;
+  prefill_s?: number;
+  prefill_tokens_per_sec?: number | null;
+  total_s?: number;
+  queue_wait_s?: number;
+  cached?: boolean;
 }
 export interface Response {
   text: string;
@@ -185,14 +194,26 @@ export const useArena = create<ArenaState>()(
         const ctrl = new AbortController();
         controllers.set(ckey(turnId, inst.id), ctrl);
         const history = historyFor(s, inst.id, upto);
-        streamChat({ message: prompt, history, system: s.system, model_instances: [inst] }, ctrl.signal)
+        streamChat(
+          {
+            message: prompt,
+            history,
+            system: s.system,
+            model_instances: [inst],
+            coalesce_ms: 30, // batch tokens into ~30 ms frames; text accumulates client-side
+            echo_text: false,
+            turn_id: turnId, // one stored turn across the per-model requests
+            session_id: s.id,
+          },
+          ctrl.signal,
+        )
           .then((res) =>
             readNdjson(res, (e) => {
               if (e.type === "token")
                 patchResponse(turnId, inst.id, (r) => ({ ...r, text: r.text + e.token }));
               else if (e.type === "metrics")
                 patchResponse(turnId, inst.id, (r) => ({ ...r, metrics: e.metrics }));
-              else if (e.type === "done")
+              else if (e.type === "done" || e.type === "cancelled")
                 patchResponse(turnId, inst.id, (r) => ({ ...r, streaming: false }));
               else if (e.type === "error")
                 patchResponse(turnId, inst.id, (r) => ({ ...r, streaming: false, error: e.error }));
@@ -398,13 +419,14 @@ export const useArena = create<ArenaState>()(
             ...present.filter((id) => !base.includes(id)),
           ];
           const LETTERS = "ABCDEFGH".split("");
-          const candidates: { label: string; text: string }[] = [];
+          const candidates: { label: string; text: string; model?: string }[] = [];
           const mapping: Record<string, string> = {};
           ordered.forEach((id, i) => {
             const r = turn.responses[id];
             if (!r || !r.text || r.error) return;
             const label = blindActive ? s.blind.labels[id] ?? `Model ${LETTERS[i]}` : LETTERS[i];
-            candidates.push({ label, text: r.text });
+            const model = s.instances.find((i) => i.id === id)?.model; // store only, not judged
+            candidates.push({ label, text: r.text, model });
             mapping[label] = id;
           });
 
@@ -427,6 +449,7 @@ export const useArena = create<ArenaState>()(
             // (and the rest) use the backend's correct default.
             base_url: cfg.provider === "openai" ? cfg.baseUrl || undefined : undefined,
             candidates,
+            turn_id: turnId,
           })
             .then((res) =>
               setJudge({ loading: false, mapping, by, verdicts: res.verdicts, winner: res.winner }),